@@ -3,9 +3,11 @@ Admin API endpoints for Flask AI service
 Provides direct admin access to all AI collections
 """
 
-from flask import Blueprint, request, jsonify, send_file, make_response
+from flask import Blueprint, Response, request, jsonify, send_file, make_response, stream_with_context
 from datetime import datetime, timedelta
+import csv
 import json
+import logging
 import pandas as pd
 import io
 import hmac
@@ -15,8 +17,13 @@ import os
 from functools import wraps
 from bson import ObjectId
 from ..db.mongo import db
+from ..db.indexes import collscan_report
+from ..services.user_context_resolver import invalidate_user_context
+from ..services.user_info_service import resolve_users_info, fallback_user_info
+from ..services import dashboard_stats
 
 admin_bp = Blueprint('admin', __name__)
+logger = logging.getLogger(__name__)
 
 # Auth configuration
 SECRET = os.getenv("INTERNAL_HMAC_SECRET", "JOu0USVT1q5kN1wkclAttRKWA8LaxMzW")
@@ -78,56 +85,24 @@ def serialize_doc(doc):
 
 def get_user_info(user_id):
     """Get user information by user ID"""
-    try:
-        db = get_db_connection()
-        users_collection = db['users']
-        
-        # Try to find user by different fields
-        user = (users_collection.find_one({"_id": user_id}) or 
-                users_collection.find_one({"username": user_id}) or
-                users_collection.find_one({"email": user_id}))
-        
-        if user:
-            username = user.get('username', '')
-            email = user.get('email', '')
-            full_name = user.get('fullName') or user.get('name') or ''
-            
-            # Create display name priority: fullName > username > email > 'Unknown User'
-            display_name = full_name or username or email.split('@')[0] if email else 'Unknown User'
-            
-            return {
-                'username': username,
-                'email': email,
-                'fullName': full_name,
-                'name': display_name
-            }
-        
-        # If no user found, return user_id as fallback
-        return {
-            'username': user_id if user_id else 'Unknown',
-            'email': '',
-            'fullName': '',
-            'name': user_id if user_id else 'Unknown User'
-        }
-    except Exception as e:
-        # Error in get_user_info - using fallback
-        return {
-            'username': user_id if user_id else 'Unknown',
-            'email': '',
-            'fullName': '',
-            'name': user_id if user_id else 'Unknown User'
-        }
+    return get_users_info([user_id]).get(user_id) or fallback_user_info(user_id)
+
+def get_users_info(user_ids):
+    """User information for many user IDs in one query (cached briefly)"""
+    db = get_db_connection()
+    return resolve_users_info(db['users'], user_ids)
 
 def enrich_with_user_info(records):
     """Enrich records with user information"""
     enriched_records = []
+    users = get_users_info([record.get('userId') for record in records])
     
     for record in records:
         enriched_record = record.copy()
         user_id = record.get('userId')
         
         if user_id:
-            user_info = get_user_info(user_id)
+            user_info = users.get(user_id) or fallback_user_info(user_id)
             enriched_record.update({
                 'username': user_info['username'],
                 'userEmail': user_info['email'],
@@ -489,84 +464,11 @@ def get_all_user_context():
 @admin_bp.route('/dashboard-stats', methods=['GET'])
 @require_internal_auth
 def get_dashboard_stats():
-    """Get aggregated dashboard statistics"""
+    """Get aggregated dashboard statistics (cached briefly; ?refresh=true recomputes)"""
     try:
         db = get_db_connection()
-        
-        # Get counts from all collections
-        history_collection = db['ai_history']
-        user_context_collection = db['user_context']
-        health_reports_collection = db['health_risk_reports']
-        meal_analysis_collection = db['meal_analysis']
-        weekly_plans_collection = db['weekly_plans']
-        
-        # Count different types of AI interactions
-        total_interactions = history_collection.count_documents({})
-        
-        # Count by type field (preferred) and action field (fallback)
-        chat_count = (history_collection.count_documents({"type": "chat"}) + 
-                     history_collection.count_documents({"action": "chat"}))
-        
-        # Count from dedicated collections first, then fallback to ai_history
-        meal_analysis_count = (meal_analysis_collection.count_documents({}) + 
-                              history_collection.count_documents({"type": "meal_analysis"}) +
-                              history_collection.count_documents({"action": "meal_analysis"}))
-        
-        weekly_plans_count = (weekly_plans_collection.count_documents({}) +
-                             history_collection.count_documents({"type": "weekly_plan"}) +
-                             history_collection.count_documents({"action": "weekly_plan"}))
-        
-        health_reports_count = (health_reports_collection.count_documents({}) +
-                               history_collection.count_documents({"type": "health_risk_report"}) +
-                               history_collection.count_documents({"action": "health_risk_report"}))
-        
-        user_context_count = user_context_collection.count_documents({})
-        
-        # Calculate time-based statistics
-        now = datetime.utcnow()
-        seven_days_ago = now - timedelta(days=7)
-        thirty_days_ago = now - timedelta(days=30)
-        
-        # Count recent interactions (try both ISO string and datetime formats)
-        recent_7_days = (history_collection.count_documents({
-            "createdAt": {"$gte": seven_days_ago.isoformat()}
-        }) + history_collection.count_documents({
-            "createdAt": {"$gte": seven_days_ago}
-        }))
-        
-        recent_30_days = (history_collection.count_documents({
-            "createdAt": {"$gte": thirty_days_ago.isoformat()}
-        }) + history_collection.count_documents({
-            "createdAt": {"$gte": thirty_days_ago}
-        }))
-        
-        stats = {
-            'aiInteractions': {
-                'total': total_interactions,
-                'byType': {
-                    'chat': chat_count,
-                    'meal_analysis': meal_analysis_count,
-                    'weekly_plan': weekly_plans_count,
-                    'health_risk_report': health_reports_count
-                },
-                'last7Days': recent_7_days,
-                'last30Days': recent_30_days
-            },
-            'chatActivity': {
-                'totalMessages': chat_count,
-                'averageLength': 150  # Placeholder
-            },
-            'weeklyPlans': {
-                'total': weekly_plans_count
-            },
-            'healthReports': {
-                'total': health_reports_count
-            },
-            'userContext': {
-                'total': user_context_count
-            },
-            'generatedAt': datetime.utcnow().isoformat()
-        }
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        stats = dashboard_stats.get_dashboard_stats(db, refresh=refresh)
         
         return jsonify({
             'success': True,
@@ -579,6 +481,21 @@ def get_dashboard_stats():
             'error': f'Failed to get dashboard stats: {str(e)}'
         }), 500
 
+@admin_bp.route('/query-report', methods=['GET'])
+@require_internal_auth
+def query_report():
+    """Explain plans for known and recorded slow queries, flagging collection scans"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': collscan_report(get_db_connection())
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to build query report: {str(e)}'
+        }), 500
+
 @admin_bp.route('/delete-record', methods=['DELETE'])
 @require_internal_auth
 def delete_record():
@@ -610,11 +527,21 @@ def delete_record():
         collection = db[actual_collection]
         
         # Delete the record
-        result = collection.delete_one({"_id": ObjectId(record_id)})
+        deleted = collection.find_one_and_delete(
+            {"_id": ObjectId(record_id)},
+            {"userId": 1, "type": 1, "action": 1, "createdAt": 1}
+        )
         
-        if result.deleted_count == 0:
+        if deleted is None:
             return jsonify({'error': 'Record not found'}), 404
         
+        if actual_collection == 'ai_history':
+            dashboard_stats.record_history_deleted(collection, deleted)
+        
+        # Drop the cached resolution so the user is re-fetched
+        if actual_collection == 'user_context' and deleted.get('userId'):
+            invalidate_user_context(deleted['userId'])
+        
         return jsonify({
             'success': True,
             'message': 'Record deleted successfully'
@@ -626,151 +553,184 @@ def delete_record():
             'error': f'Failed to delete record: {str(e)}'
         }), 500
 
+# 🔹 Export sections: request name -> (output name, sources). Sources are
+# (collection, filter, sort field) read in order; a record already
+# exported by an earlier source (same _id) is skipped.
+
+def _action_or_type(*names):
+    """ai_history rows carry the kind in either `action` or `type`"""
+    return {"$or": [{field: name} for name in names for field in ("action", "type")]}
+
+EXPORT_SECTIONS = {
+    'ai-history': ('ai_history', [
+        ('ai_history', None, 'createdAt')
+    ]),
+    'health-reports': ('health_reports', [
+        ('health_risk_reports', None, 'createdAt'),
+        ('ai_history', _action_or_type('health_risk_report', 'health_report', 'health_assessment'), 'createdAt')
+    ]),
+    'meal-analysis': ('meal_analysis', [
+        ('meal_analysis', None, 'createdAt'),
+        ('ai_history', _action_or_type(
+            'meal_analysis', 'analyze_meal', 'analyze_meals', 'nutrition_analysis',
+            'nutrition_summary', 'nutrition_impact_summary'
+        ), 'createdAt')
+    ]),
+    'weekly-plans': ('weekly_plans', [
+        ('weekly_plans', None, 'createdAt'),
+        ('ai_history', _action_or_type(
+            'weekly_plan', 'generate_weekly_plan', 'meal_plan', 'weekly_plan_v3',
+            'meal_planning', 'Summarize weekly meal'
+        ), 'createdAt')
+    ]),
+    'chat-history': ('chat_history', [
+        ('ai_history', _action_or_type('chat', 'conversation', 'nutritionist_chat'), 'createdAt')
+    ]),
+    'user-context': ('user_context', [
+        ('user_context', None, 'updatedAt')
+    ])
+}
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 500))
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXCEL_SHEET_ROWS = 1000  # Excel export keeps at most this many rows per sheet
+
+CSV_COLUMNS = [
+    'ID', 'User ID', 'Username', 'Display Name', 'Email', 'Full Name',
+    'Action', 'Type', 'Created At', 'Updated At', 'Data Preview'
+]
+
+def _export_batches(db, section):
+    """Raw documents of one export section, EXPORT_BATCH_SIZE at a time"""
+    sources = EXPORT_SECTIONS[section][1]
+    for i, (collection, query, sort_field) in enumerate(sources):
+        cursor = (
+            db[collection].find(query or {})
+            .sort(sort_field, -1)
+            .batch_size(EXPORT_BATCH_SIZE)
+        )
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield _drop_exported(db, sources[:i], batch)
+                batch = []
+        if batch:
+            yield _drop_exported(db, sources[:i], batch)
+
+def _drop_exported(db, earlier_sources, batch):
+    """Drop documents an earlier source of the section already yielded"""
+    if not earlier_sources:
+        return batch
+    ids = [doc['_id'] for doc in batch]
+    seen = set()
+    for collection, query, _ in earlier_sources:
+        seen.update(
+            doc['_id'] for doc in
+            db[collection].find({"$and": [query or {}, {"_id": {"$in": ids}}]}, {"_id": 1})
+        )
+    return [doc for doc in batch if doc['_id'] not in seen]
+
+def iter_export_records(db, section):
+    """Serialized, user-enriched records of one export section, read in batches"""
+    for batch in _export_batches(db, section):
+        yield from enrich_with_user_info([serialize_doc(doc) for doc in batch])
+
+def _export_row(record):
+    return {
+        'ID': str(record.get('_id', '')),
+        'User ID': record.get('userId', ''),
+        'Username': record.get('username', ''),
+        'Display Name': record.get('userName', ''),
+        'Email': record.get('userEmail', ''),
+        'Full Name': record.get('userFullName', ''),
+        'Action': record.get('action', ''),
+        'Type': record.get('type', ''),
+        'Created At': record.get('createdAt', ''),
+        'Updated At': record.get('updatedAt', '')
+    }
+
+def _stream_export(db, sections, export_format, collection_name):
+    """
+    NDJSON (one record per line, tagged with its collection) or CSV,
+    written to a chunked response while the cursors are read, so memory
+    stays flat whatever the collection size.
+    """
+    combined = collection_name == 'all'
+
+    def generate():
+        buffer = io.StringIO()
+        if export_format == 'csv':
+            writer = csv.DictWriter(
+                buffer,
+                fieldnames=(['Collection'] if combined else []) + CSV_COLUMNS,
+                lineterminator='\n'
+            )
+            writer.writeheader()
+
+        try:
+            for section in sections:
+                output_name = EXPORT_SECTIONS[section][0]
+                for record in iter_export_records(db, section):
+                    if export_format == 'ndjson':
+                        buffer.write(json.dumps({'collection': output_name, **record}, default=str))
+                        buffer.write('\n')
+                    else:
+                        row = _export_row(record)
+                        row['Data Preview'] = str(record.get('data', {}))[:100] + '...' if record.get('data') else ''
+                        if combined:
+                            row['Collection'] = output_name.replace('_', ' ').title()
+                        writer.writerow(row)
+
+                    if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+        except Exception as e:
+            # Headers are already sent. NDJSON readers get a final error line;
+            # re-raising then drops the connection before the terminating
+            # chunk, so CSV (and NDJSON) clients see an incomplete download
+            logger.error(f"export stream failed: {e}")
+            if export_format == 'ndjson':
+                buffer.write(json.dumps({'error': f'Failed to export data: {str(e)}'}) + '\n')
+            yield buffer.getvalue()
+            raise
+
+        yield buffer.getvalue()
+
+    extension = 'ndjson' if export_format == 'ndjson' else 'csv'
+    filename = f'smartbite-ai-{collection_name}-{datetime.utcnow().strftime("%Y%m%d")}.{extension}'
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson' if export_format == 'ndjson' else 'text/csv',
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @admin_bp.route('/export-data', methods=['POST'])
 @require_internal_auth
 def export_data():
-    """Export AI data for admin"""
+    """
+    Export AI data for admin. `format`: excel (default), csv, ndjson or
+    json. CSV and NDJSON stream from the cursors; Excel keeps the first
+    EXCEL_SHEET_ROWS rows per sheet.
+    """
     try:
         data = request.get_json()
         collection_name = data.get('collection', 'all')
         export_format = data.get('format', 'excel')
         
         db = get_db_connection()
-        
-        # Prepare export data with user enrichment
-        export_data = {}
-        
-        if collection_name == 'all' or collection_name == 'ai-history':
-            history_collection = db['ai_history']
-            ai_history = list(history_collection.find().sort("createdAt", -1))
-            serialized_history = [serialize_doc(doc) for doc in ai_history]
-            export_data['ai_history'] = enrich_with_user_info(serialized_history)
-        
-        if collection_name == 'all' or collection_name == 'health-reports':
-            # Get from health_risk_reports collection first, then ai_history as fallback
-            health_reports_collection = db['health_risk_reports']
-            health_reports = list(health_reports_collection.find().sort("createdAt", -1))
-            
-            # Also get from ai_history with comprehensive filters
-            history_collection = db['ai_history']
-            history_reports = list(history_collection.find({
-                "$or": [
-                    {"action": "health_risk_report"},
-                    {"type": "health_risk_report"},
-                    {"action": "health_report"},
-                    {"type": "health_report"},
-                    {"action": "health_assessment"},
-                    {"type": "health_assessment"}
-                ]
-            }).sort("createdAt", -1))
-            
-            # Combine and remove duplicates
-            all_reports = health_reports + history_reports
-            seen_ids = set()
-            unique_reports = []
-            for report in all_reports:
-                report_id = str(report.get('_id'))
-                if report_id not in seen_ids:
-                    seen_ids.add(report_id)
-                    unique_reports.append(report)
-            
-            serialized_reports = [serialize_doc(doc) for doc in unique_reports]
-            export_data['health_reports'] = enrich_with_user_info(serialized_reports)
-        
-        if collection_name == 'all' or collection_name == 'meal-analysis':
-            # Get from meal_analysis collection first, then ai_history as fallback
-            meal_analysis_collection = db['meal_analysis']
-            meal_analysis = list(meal_analysis_collection.find().sort("createdAt", -1))
-            
-            # Also get from ai_history with comprehensive filters
-            history_collection = db['ai_history']
-            history_analysis = list(history_collection.find({
-                "$or": [
-                    {"action": "meal_analysis"},
-                    {"type": "meal_analysis"},
-                    {"action": "analyze_meal"},
-                    {"type": "analyze_meal"},
-                    {"action": "analyze_meals"},
-                    {"type": "analyze_meals"},
-                    {"action": "nutrition_analysis"},
-                    {"type": "nutrition_analysis"},
-                    {"action": "nutrition_summary"},
-                    {"type": "nutrition_summary"},
-                    {"action": "nutrition_impact_summary"},
-                    {"type": "nutrition_impact_summary"}
-                ]
-            }).sort("createdAt", -1))
-            
-            # Combine and remove duplicates
-            all_analysis = meal_analysis + history_analysis
-            seen_ids = set()
-            unique_analysis = []
-            for analysis in all_analysis:
-                analysis_id = str(analysis.get('_id'))
-                if analysis_id not in seen_ids:
-                    seen_ids.add(analysis_id)
-                    unique_analysis.append(analysis)
-            
-            serialized_analysis = [serialize_doc(doc) for doc in unique_analysis]
-            export_data['meal_analysis'] = enrich_with_user_info(serialized_analysis)
-        
-        if collection_name == 'all' or collection_name == 'weekly-plans':
-            # Get from weekly_plans collection first, then ai_history as fallback
-            weekly_plans_collection = db['weekly_plans']
-            weekly_plans = list(weekly_plans_collection.find().sort("createdAt", -1))
-            
-            # Also get from ai_history with comprehensive filters
-            history_collection = db['ai_history']
-            history_plans = list(history_collection.find({
-                "$or": [
-                    {"action": "weekly_plan"},
-                    {"type": "weekly_plan"},
-                    {"action": "generate_weekly_plan"},
-                    {"type": "generate_weekly_plan"},
-                    {"action": "meal_plan"},
-                    {"type": "meal_plan"},
-                    {"type": "weekly_plan_v3"},
-                    {"action": "weekly_plan_v3"},
-                    {"action": "meal_planning"},
-                    {"type": "meal_planning"},
-                    {"action": "Summarize weekly meal"},
-                    {"type": "Summarize weekly meal"}
-                ]
-            }).sort("createdAt", -1))
-            
-            # Combine and remove duplicates
-            all_plans = weekly_plans + history_plans
-            seen_ids = set()
-            unique_plans = []
-            for plan in all_plans:
-                plan_id = str(plan.get('_id'))
-                if plan_id not in seen_ids:
-                    seen_ids.add(plan_id)
-                    unique_plans.append(plan)
-            
-            serialized_plans = [serialize_doc(doc) for doc in unique_plans]
-            export_data['weekly_plans'] = enrich_with_user_info(serialized_plans)
-        
-        if collection_name == 'all' or collection_name == 'chat-history':
-            history_collection = db['ai_history']
-            chat_history = list(history_collection.find({
-                "$or": [
-                    {"action": "chat"},
-                    {"type": "chat"},
-                    {"action": "conversation"},
-                    {"type": "conversation"},
-                    {"action": "nutritionist_chat"},
-                    {"type": "nutritionist_chat"}
-                ]
-            }).sort("createdAt", -1))
-            serialized_chats = [serialize_doc(doc) for doc in chat_history]
-            export_data['chat_history'] = enrich_with_user_info(serialized_chats)
-        
-        if collection_name == 'all' or collection_name == 'user-context':
-            user_context_collection = db['user_context']
-            user_context = list(user_context_collection.find().sort("updatedAt", -1))
-            serialized_context = [serialize_doc(doc) for doc in user_context]
-            export_data['user_context'] = enrich_with_user_info(serialized_context)
+
+        if collection_name == 'all':
+            sections = list(EXPORT_SECTIONS)
+        else:
+            sections = [collection_name] if collection_name in EXPORT_SECTIONS else []
+
+        if export_format in ('csv', 'ndjson'):
+            return _stream_export(db, sections, export_format, collection_name)
         
         if export_format == 'excel':
             
@@ -778,6 +738,22 @@ def export_data():
             output = io.BytesIO()
             
             with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                # Count with the server, and only read (and enrich) what the sheet shows.
+                # An _id repeated across a section's sources is counted once per source.
+                sheets = {}
+                for section in sections:
+                    count = sum(
+                        db[collection].count_documents(query or {})
+                        for collection, query, _ in EXPORT_SECTIONS[section][1]
+                    )
+                    kept = []
+                    for batch in _export_batches(db, section):
+                        kept.extend(batch[:EXCEL_SHEET_ROWS - len(kept)])
+                        if len(kept) >= EXCEL_SHEET_ROWS:
+                            break
+                    records = enrich_with_user_info([serialize_doc(doc) for doc in kept])
+                    sheets[EXPORT_SECTIONS[section][0]] = (records, count)
+
                 # Summary sheet
                 summary_data = {
                     'Collection': [],
@@ -785,33 +761,21 @@ def export_data():
                     'Export Date': []
                 }
                 
-                for collection, records in export_data.items():
+                for collection, (records, count) in sheets.items():
                     summary_data['Collection'].append(collection.replace('_', ' ').title())
-                    summary_data['Record Count'].append(len(records))
+                    summary_data['Record Count'].append(count)
                     summary_data['Export Date'].append(datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
                 
                 summary_df = pd.DataFrame(summary_data)
                 summary_df.to_excel(writer, sheet_name='Summary', index=False)
                 
                 # Individual collection sheets
-                for collection, records in export_data.items():
+                for collection, (records, count) in sheets.items():
                     if records:
-                        # Create a comprehensive DataFrame for each collection
                         df_data = []
-                        for record in records[:1000]:  # Limit to 1000 records per sheet
-                            row = {
-                                'ID': str(record.get('_id', '')),
-                                'User ID': record.get('userId', ''),
-                                'Username': record.get('username', ''),
-                                'Display Name': record.get('userName', ''),
-                                'Email': record.get('userEmail', ''),
-                                'Full Name': record.get('userFullName', ''),
-                                'Action': record.get('action', ''),
-                                'Type': record.get('type', ''),
-                                'Created At': record.get('createdAt', ''),
-                                'Updated At': record.get('updatedAt', ''),
-                                'Data Size': len(str(record.get('data', {})))
-                            }
+                        for record in records:
+                            row = _export_row(record)
+                            row['Data Size'] = len(str(record.get('data', {})))
                             df_data.append(row)
                         
                         df = pd.DataFrame(df_data)
@@ -829,70 +793,12 @@ def export_data():
                 download_name=filename
             )
         
-        elif export_format == 'csv':
-                
-            # Create CSV content
-            csv_data = []
-            
-            # Combine all collections into one CSV or create separate CSVs
-            if collection_name == 'all':
-                # Create a combined CSV with collection type column
-                for collection, records in export_data.items():
-                    for record in records:
-                        row = {
-                            'Collection': collection.replace('_', ' ').title(),
-                            'ID': str(record.get('_id', '')),
-                            'User ID': record.get('userId', ''),
-                            'Username': record.get('username', ''),
-                            'Display Name': record.get('userName', ''),
-                            'Email': record.get('userEmail', ''),
-                            'Full Name': record.get('userFullName', ''),
-                            'Action': record.get('action', ''),
-                            'Type': record.get('type', ''),
-                            'Created At': record.get('createdAt', ''),
-                            'Updated At': record.get('updatedAt', ''),
-                            'Data Preview': str(record.get('data', {}))[:100] + '...' if record.get('data') else ''
-                        }
-                        csv_data.append(row)
-            else:
-                # Single collection CSV
-                records = list(export_data.values())[0] if export_data else []
-                for record in records:
-                    row = {
-                        'ID': str(record.get('_id', '')),
-                        'User ID': record.get('userId', ''),
-                        'Username': record.get('username', ''),
-                        'Display Name': record.get('userName', ''),
-                        'Email': record.get('userEmail', ''),
-                        'Full Name': record.get('userFullName', ''),
-                        'Action': record.get('action', ''),
-                        'Type': record.get('type', ''),
-                        'Created At': record.get('createdAt', ''),
-                        'Updated At': record.get('updatedAt', ''),
-                        'Data Preview': str(record.get('data', {}))[:100] + '...' if record.get('data') else ''
-                    }
-                    csv_data.append(row)
-            
-            # Convert to DataFrame and then to CSV
-            df = pd.DataFrame(csv_data)
-            
-            # Create CSV content as bytes
-            output = io.BytesIO()
-            csv_content = df.to_csv(index=False, encoding='utf-8')
-            output.write(csv_content.encode('utf-8'))
-            output.seek(0)
-            
-            filename = f'smartbite-ai-{collection_name}-{datetime.utcnow().strftime("%Y%m%d")}.csv'
-            
-            return send_file(
-                output,
-                mimetype='text/csv',
-                as_attachment=True,
-                download_name=filename
-            )
-        
         else:
-            # Return JSON format
+            # Return JSON format (one document; use ndjson for large exports)
+            export_data = {
+                EXPORT_SECTIONS[section][0]: list(iter_export_records(db, section))
+                for section in sections
+            }
             return jsonify({
                 'success': True,
                 'data': export_data,
@@ -908,4 +814,4 @@ def export_data():
         return jsonify({
             'success': False,
             'error': f'Failed to export data: {str(e)}'
-        }), 500
\ No newline at end of file
+        }), 500
@@ -5,6 +5,11 @@ import time
 from flask import Blueprint, request, jsonify
 from app.db.mongo import user_collection
 from app.services.user_context_service import upsert_user_context
+from app.services.user_context_resolver import invalidate_user_context
+from app.services.user_info_service import invalidate_user_info
+from app.services.normalize import normalize_payload
+from app.services.faiss_service import get_meal_index, meal_text, content_hash, meal_attributes
+from app.models.schemas import MealPayload
 
 internal_api = Blueprint("internal_api", __name__)
 
@@ -53,6 +58,7 @@ def delete_user_context(user_id):
         }), 401
     
     user_collection.delete_one({"user.id": user_id})
+    invalidate_user_context(user_id)
 
     return jsonify({
         "success": True,
@@ -80,8 +86,80 @@ def sync_user():
         }), 400
 
     upsert_user_context(user_id, data)
+    invalidate_user_context(user_id)
+    invalidate_user_info(user_id)
 
     return jsonify({
         "success": True,
         "message": "User context synced successfully"
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+@internal_api.route("/internal/meal-index/sync", methods=["POST"])
+def sync_meal_index():
+    """Add or update catalog meals (MealPayload) in the meal vector index"""
+    valid, error = verify_hmac(request)
+
+    if not valid:
+        return jsonify({
+            "success": False,
+            "message": error
+        }), 401
+
+    body = request.json
+    try:
+        MealPayload(**body)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Invalid payload: {e}"
+        }), 400
+
+    # Embeds only meals without a usable vector (index hit or supplied),
+    # and indexes the ones it embedded
+    normalize_payload(body)
+
+    # Upsert the rest once, skipping meals indexed from the same text with
+    # the same attributes: on HNSW every re-upsert leaves a tombstone
+    meal_index = get_meal_index()
+    changed = []
+    for meal in {meal["id"]: meal for meal in body["data"]}.values():  # last entry per id wins
+        text_hash = content_hash(meal_text(meal))
+        attributes = meal_attributes(meal)
+        if not meal_index.is_current(meal["id"], text_hash, attributes):
+            changed.append((meal, text_hash, attributes))
+
+    if changed:
+        meal_index.upsert_many(
+            [meal["id"] for meal, _, _ in changed],
+            [meal["embedding"] for meal, _, _ in changed],
+            [text_hash for _, text_hash, _ in changed],
+            [attributes for _, _, attributes in changed]
+        )
+
+    return jsonify({
+        "success": True,
+        "message": f"{len(body['data'])} meals indexed"
+    }), 200
+
+
+@internal_api.route("/internal/meal-index/<meal_id>", methods=["DELETE"])
+def delete_meal_from_index(meal_id):
+    valid, error = verify_hmac(request)
+
+    if not valid:
+        return jsonify({
+            "success": False,
+            "message": error
+        }), 401
+
+    if not get_meal_index().delete(meal_id):
+        return jsonify({
+            "success": False,
+            "message": f"Meal {meal_id} not indexed"
+        }), 404
+
+    return jsonify({
+        "success": True,
+        "message": f"Meal {meal_id} removed from index"
+    })
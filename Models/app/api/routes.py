@@ -1,20 +1,22 @@
-import requests
-import os
-from flask import Blueprint, request
+import json
+from flask import Blueprint, Response, request, stream_with_context
 from app.services.user_context_service import upsert_user_context
 from app.services.nutrition_engine import analyze_meals_service
 from app.services.risk_analyzer import health_risk_report
 from app.services.groq_service import chat_ai
-from app.services.history_service import save_history, fetch_history
-from app.db.mongo import history_collection
+from app.services.llm_client import groq_chat
+from app.services.embedding_service import embed
+from app.services.semantic_cache import semantic_chat_cache, SEMANTIC_CACHE_ENABLED
+from app.services.history_service import save_history, fetch_history, InvalidCursor
 from app.models.schemas import MealPayload
-from app.services.user_context_resolver import resolve_user_context
-from app.services.ai_meal_generator import generate_meals
+from app.services.user_context_resolver import resolve_user, invalidate_user_context
+from app.services.ai_meal_generator import generate_meals_concurrently
 from app.services.normalize import normalize_payload
-from app.utils.response import success
+from app.services.faiss_service import get_meal_index
+from app.utils.response import success, failure, accepted
+from app.services.job_queue import register_task, submit_job, get_job, valid_webhook_url
 from app.services.weekly_summary_service import generate_weekly_summary
-from app.utils.user_context import normalize_user_context
-from app.utils.user_helpers import extract_username
+from app.utils.user_context import normalize_user_context, node_payload
 from app.services.nutrition_impact_service import generate_nutrition_impact
 from app.constants.prompts import CHAT_SYSTEM_PROMPT
 from app.constants.chat_prompts import (
@@ -39,6 +41,7 @@ def sync_user_context():
         return {"success": False}, 400
 
     upsert_user_context(user_id, node_data)
+    invalidate_user_context(user_id)
 
     return {"success": True}
 
@@ -56,40 +59,11 @@ def analyze():
             "data": None
         }, 400
 
-    # Try to get user context, with fallback to Node.js API
-    raw_user_ctx = None
-    username = None
-    
-    try:
-        # First try to resolve from stored context
-        raw_user_ctx = resolve_user_context(user_id)
-        if raw_user_ctx:
-            username = extract_username(raw_user_ctx)
-    except Exception:
-        pass
+    # Resolve user context + username (cached; Mongo, then Node)
+    raw_user_ctx, username = resolve_user(user_id)
 
-    # If no username found, try to get from Node.js API
-    if not username:
-        try:
-            node_response = requests.get(
-                f"{os.getenv('NODE_BACKEND_URL')}/api/v1/users/internal/ai/user-context/{user_id}",
-                headers={
-                    "x-internal-key": os.getenv("INTERNAL_HMAC_SECRET")
-                },
-                timeout=10
-            )
-            
-            if node_response.status_code == 200:
-                node_data = node_response.json()
-                if node_data.get("success") and node_data.get("data"):
-                    raw_user_ctx = node_data["data"]
-                    username = extract_username(raw_user_ctx)
-        except Exception:
-            pass
-
-    # Use userId as fallback username if still not found
-    if not username:
-        username = user_id
+    # Use userId as fallback username if not found
+    username = username or user_id
 
     # Use raw_user_ctx if available, otherwise create minimal context
     user_data = raw_user_ctx if raw_user_ctx else {"nodeData": {}}
@@ -105,14 +79,8 @@ def analyze():
     return success(result)
 
 
-@api.route("/generate-weekly-plan", methods=["POST"])
-def generate_weekly_plan_v3():
-    """Generate weekly meal plan with optimized performance and timeout handling"""
-    import time
-    start_time = time.time()
-    
-    body = request.json
-
+def _prepare_weekly_plan(body):
+    """Distribution, calorie plan, username and meal budgets for a weekly plan request"""
     profile = body["profile"]
     targets = body["targets"]
     user_id = body["userId"]
@@ -133,56 +101,115 @@ def generate_weekly_plan_v3():
     # Lazy load weekly optimizer to prevent startup memory issues
     try:
         from app.services.weekly_optimizer import optimize_week
-        weekly_cals = optimize_week(targets["dailyCalorieTarget"])
+        weekly_cals = optimize_week(
+            targets["dailyCalorieTarget"],
+            day_targets=targets.get("dayTargets"),
+            cooking_days=targets.get("cookingDays"),
+            weekly_budget=targets.get("weeklyCalorieBudget")
+        )
     except Exception:
         # Fallback to simple daily target if optimizer fails
         daily_target = targets["dailyCalorieTarget"]
         weekly_cals = [daily_target] * 7
 
-    # Try to get user context, with fallback to Node.js API
-    raw_user_ctx = None
-    username = None
-    
+    # Resolve user context + username (cached; Mongo, then Node)
+    raw_user_ctx, username = resolve_user(user_id)
+
+    # Use userId as fallback username if not found
+    username = username or user_id
+
+    # cookingDays / maxCookTime live under the Node payload's constraints
+    user_ctx = normalize_user_context(node_payload(raw_user_ctx)) if raw_user_ctx else {}
+
+    # Per-meal calorie + macro budgets so the LLM gets exact numbers
     try:
-        # First try to resolve from stored context
-        raw_user_ctx = resolve_user_context(user_id)
-        if raw_user_ctx:
-            username = extract_username(raw_user_ctx)
+        from app.services.weekly_optimizer import plan_week_macros
+        meal_budgets = plan_week_macros(
+            distribution,
+            targets,
+            weekly_cals,
+            cooking_days=user_ctx.get("cookingDays"),
+            max_cook_time=user_ctx.get("maxCookTime"),
+            user_id=user_id
+        )
     except Exception:
-        pass
+        meal_budgets = None
 
-    # If no username found, try to get from Node.js API
-    if not username:
-        try:
-            node_response = requests.get(
-                f"{os.getenv('NODE_BACKEND_URL')}/api/v1/users/internal/ai/user-context/{user_id}",
-                headers={
-                    "x-internal-key": os.getenv("INTERNAL_HMAC_SECRET")
-                },
-                timeout=10
-            )
-            
-            if node_response.status_code == 200:
-                node_data = node_response.json()
-                if node_data.get("success") and node_data.get("data"):
-                    raw_user_ctx = node_data["data"]
-                    username = extract_username(raw_user_ctx)
-        except Exception:
-            pass
+    return distribution, weekly_cals, username, meal_budgets
+
+
+def _invalid_targets(body):
+    """400 message for targets the weekly optimizer cannot use, else None"""
+    from app.services.weekly_optimizer import InvalidTargets, validate_targets
+    try:
+        validate_targets((body or {}).get("targets"))
+    except InvalidTargets as e:
+        return str(e)
+    return None
+
+
+def _wants_job():
+    """?async=true runs the endpoint as a background job"""
+    return request.args.get("async", "").lower() in ("1", "true")
+
+
+def _enqueue(task, body):
+    """Queue `task` for body and answer 202 with the job id"""
+    webhook_url = body.pop("webhookUrl", None)
+    if webhook_url and not valid_webhook_url(webhook_url):
+        return {
+            "success": False,
+            "message": "Invalid webhookUrl",
+            "data": None
+        }, 400
+
+    job = submit_job(task, body, webhook_url)
+    job["statusUrl"] = f"/jobs/{job['jobId']}"
+    return accepted(job)
+
+
+@api.route("/jobs/<job_id>")
+def job_status(job_id):
+    """Status (and result once finished) of a background job"""
+    job = get_job(job_id)
+    if not job:
+        return failure("Job not found", 404)
+    return success(job)
+
+
+@api.route("/generate-weekly-plan", methods=["POST"])
+def generate_weekly_plan_v3():
+    """Generate weekly meal plan with optimized performance and timeout handling"""
+    body = request.json
+
+    error = _invalid_targets(body)
+    if error:
+        return failure(error, 400)
 
-    # Use userId as fallback username if still not found
-    if not username:
-        username = user_id
+    if _wants_job():
+        return _enqueue("weekly_plan", body)
 
-    user_ctx = normalize_user_context(raw_user_ctx) if raw_user_ctx else {}
+    return success(_weekly_plan_result(body))
+
+
+def _weekly_plan_result(body):
+    import time
+    start_time = time.time()
+
+    profile = body["profile"]
+
+    distribution, weekly_cals, username, meal_budgets = _prepare_weekly_plan(body)
 
     # Use batch generation for better performance (single API call instead of 7)
     try:
         from app.services.batch_meal_generator import generate_weekly_meals_batch
-        weekly_plan = generate_weekly_meals_batch(distribution, profile, weekly_cals)
+        weekly_plan = generate_weekly_meals_batch(distribution, profile, weekly_cals, meal_budgets)
     except Exception:
-        # Fallback to individual day generation if batch fails
-        weekly_plan = {}
+        weekly_plan = None
+
+    if weekly_plan is None:
+        # Batch call failed: per-day generation, days requested concurrently
+        day_requests = []
         for i, day in enumerate(["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]):
             # Add day-specific context to ensure variety
             day_context = {
@@ -193,19 +220,22 @@ def generate_weekly_plan_v3():
             
             # Calculate daily macros
             daily_cals = weekly_cals[i] if i < len(weekly_cals) else weekly_cals[0]
-            daily_macros = {
-                'breakfast': round(daily_cals * distribution['breakfast'] / 100),
-                'lunch': round(daily_cals * distribution['lunch'] / 100),
-                'dinner': round(daily_cals * distribution['dinner'] / 100),
-                'snacks': round(daily_cals * distribution['snacks'] / 100)
-            }
-            
-            try:
-                weekly_plan[day] = generate_meals(daily_macros, profile, day_context)
-            except Exception:
-                # Use fallback if individual generation also fails
-                from app.services.batch_meal_generator import generate_fallback_meals
-                weekly_plan[day] = generate_fallback_meals(daily_macros, day_context)
+            if meal_budgets:
+                daily_macros = {
+                    slot: round(budget['calories'])
+                    for slot, budget in meal_budgets[day].items()
+                }
+            else:
+                daily_macros = {
+                    'breakfast': round(daily_cals * distribution['breakfast'] / 100),
+                    'lunch': round(daily_cals * distribution['lunch'] / 100),
+                    'dinner': round(daily_cals * distribution['dinner'] / 100),
+                    'snacks': round(daily_cals * distribution['snacks'] / 100)
+                }
+            day_requests.append((daily_macros, day_context))
+
+        # Each day falls back on its own if its request fails or runs late
+        weekly_plan = generate_meals_concurrently(day_requests, profile)
 
     # Save history using username
     try:
@@ -216,12 +246,73 @@ def generate_weekly_plan_v3():
     # Log generation time for monitoring
     generation_time = round(time.time() - start_time, 2)
     
-    return success({
+    return {
         "userId": body["userId"],
         "weeklyPlan": weekly_plan,
         "generationTime": generation_time,
         "generatedAt": time.time()
-    })
+    }
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@api.route("/generate-weekly-plan/stream", methods=["POST"])
+def generate_weekly_plan_stream():
+    """
+    Server-sent-event variant of /generate-weekly-plan: emits a "day"
+    event as each day finishes generating, then a "done" event with the
+    full plan in the same shape as the blocking endpoint.
+    """
+    import time
+    start_time = time.time()
+
+    body = request.json
+
+    error = _invalid_targets(body)
+    if error:
+        return failure(error, 400)
+
+    profile = body["profile"]
+
+    distribution, weekly_cals, username, meal_budgets = _prepare_weekly_plan(body)
+
+    def generate():
+        from app.services.batch_meal_generator import DAYS, stream_weekly_meals_batch
+
+        weekly_plan = {}
+        for day, plan, source in stream_weekly_meals_batch(
+            distribution, profile, weekly_cals, meal_budgets
+        ):
+            weekly_plan[day] = plan
+            yield _sse("day", {
+                "day": day,
+                "plan": plan,
+                "source": source,
+                "elapsed": round(time.time() - start_time, 2)
+            })
+
+        weekly_plan = {day: weekly_plan[day] for day in DAYS}
+
+        # Save history using username
+        try:
+            save_history(username, "weekly_plan", weekly_plan)
+        except Exception:
+            pass
+
+        yield _sse("done", {
+            "userId": body["userId"],
+            "weeklyPlan": weekly_plan,
+            "generationTime": round(time.time() - start_time, 2),
+            "generatedAt": time.time()
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @api.route("/health-risk-report", methods=["POST"])
 def risk():
@@ -237,40 +328,11 @@ def risk():
             "data": None
         }, 400
 
-    # Try to get user context, with fallback to Node.js API
-    raw_user_ctx = None
-    username = None
-    
-    try:
-        # First try to resolve from stored context
-        raw_user_ctx = resolve_user_context(user_id)
-        if raw_user_ctx:
-            username = extract_username(raw_user_ctx)
-    except Exception:
-        pass
-
-    # If no username found, try to get from Node.js API
-    if not username:
-        try:
-            node_response = requests.get(
-                f"{os.getenv('NODE_BACKEND_URL')}/api/v1/users/internal/ai/user-context/{user_id}",
-                headers={
-                    "x-internal-key": os.getenv("INTERNAL_HMAC_SECRET")
-                },
-                timeout=10
-            )
-            
-            if node_response.status_code == 200:
-                node_data = node_response.json()
-                if node_data.get("success") and node_data.get("data"):
-                    raw_user_ctx = node_data["data"]
-                    username = extract_username(raw_user_ctx)
-        except Exception:
-            pass
+    # Resolve user context + username (cached; Mongo, then Node)
+    raw_user_ctx, username = resolve_user(user_id)
 
-    # Use userId as fallback username if still not found
-    if not username:
-        username = user_id
+    # Use userId as fallback username if not found
+    username = username or user_id
 
     # Use raw_user_ctx if available, otherwise create minimal context
     user_data = raw_user_ctx if raw_user_ctx else {"nodeData": {}}
@@ -290,6 +352,61 @@ def risk():
     return success(report)
 
 
+@api.route("/meals/similar", methods=["POST"])
+def similar_meals():
+    """
+    Nearest catalog meals to `mealId` or a free-text `query`, restricted
+    to `filters` ({excludeAllergens, mealType, cuisine, costLevel}).
+    With `userId`, the user's allergies are always excluded.
+    """
+    body = request.json or {}
+    meal_id = body.get("mealId")
+    query = body.get("query")
+    filters = dict(body.get("filters") or {})
+
+    try:
+        k = max(1, min(int(body.get("k", 10)), 100))
+    except (TypeError, ValueError):
+        return {
+            "success": False,
+            "message": "k must be an integer",
+            "data": None
+        }, 400
+
+    if not meal_id and not query:
+        return {
+            "success": False,
+            "message": "mealId or query is required",
+            "data": None
+        }, 400
+
+    if body.get("userId"):
+        raw_user_ctx, _ = resolve_user(body["userId"])
+        user_ctx = normalize_user_context(node_payload(raw_user_ctx))
+        filters["excludeAllergens"] = list(filters.get("excludeAllergens") or []) + list(user_ctx["allergies"] or [])
+
+    meal_index = get_meal_index()
+    if meal_id:
+        vector = meal_index.get_vector(meal_id)
+        if vector is None:
+            return {
+                "success": False,
+                "message": f"Meal {meal_id} not indexed",
+                "data": None
+            }, 404
+    else:
+        vector = embed([query])[0]
+
+    # One extra so the source meal can be dropped
+    results = meal_index.search(vector, k + 1 if meal_id else k, filters=filters or None)
+    results = [(m, d) for m, d in results if m != meal_id][:k]
+
+    return success({
+        "meals": [{"mealId": m, "distance": d} for m, d in results],
+        "filters": filters
+    })
+
+
 @api.route("/chat/generateResponse", methods=["POST"])
 def generate_response():
     data = request.json or {}
@@ -311,43 +428,12 @@ def generate_response():
             "message": "Empty message"
         }, 400
 
-    # 2️⃣ Try to get user info from Node.js API if context not available
-    raw_user_ctx = None
-    username = None
-    user_ctx = {}
-    
-    try:
-        # First try to resolve from stored context
-        raw_user_ctx = resolve_user_context(user_id)
-        if raw_user_ctx:
-            username = extract_username(raw_user_ctx)
-            user_ctx = normalize_user_context(raw_user_ctx) or {}
-    except Exception:
-        pass
-
-    # If no username found, try to get from Node.js API
-    if not username:
-        try:
-            node_response = requests.get(
-                f"{os.getenv('NODE_BACKEND_URL')}/api/v1/users/internal/ai/user-context/{user_id}",
-                headers={
-                    "x-internal-key": os.getenv("INTERNAL_HMAC_SECRET")
-                },
-                timeout=10
-            )
-            
-            if node_response.status_code == 200:
-                node_data = node_response.json()
-                if node_data.get("success") and node_data.get("data"):
-                    raw_user_ctx = node_data["data"]
-                    username = extract_username(raw_user_ctx)
-                    user_ctx = normalize_user_context(raw_user_ctx) or {}
-        except Exception:
-            pass
+    # 2️⃣ Resolve user context + username (cached; Mongo, then Node)
+    raw_user_ctx, username = resolve_user(user_id)
 
-    # Use userId as fallback username if still not found
-    if not username:
-        username = user_id
+    # Use userId as fallback username if not found
+    username = username or user_id
+    user_ctx = (normalize_user_context(node_payload(raw_user_ctx)) or {}) if raw_user_ctx else {}
 
     # 3️⃣ Language instruction
     language_instruction = LANGUAGE_PROMPTS.get(
@@ -392,25 +478,30 @@ You are SmartBite AI.
         "max_tokens": 600
     }
 
-    # 6️⃣ Call GROQ safely
+    # 6️⃣ Semantic cache: reuse the answer to a near-identical past question
+    cache_key = semantic_chat_cache.partition_key(language, user_ctx)
+    question_vector = None
+    reply = None
+    if SEMANTIC_CACHE_ENABLED:
+        try:
+            question_vector = embed([message])[0]
+            reply = semantic_chat_cache.lookup(question_vector, cache_key)
+        except Exception:
+            question_vector = None
+
+    # 7️⃣ Call GROQ safely
     try:
-        groq_response = requests.post(
-            os.getenv("GROQ_API_URL"),
-            headers={
-                "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}",
-                "Content-Type": "application/json"
-            },
-            json=payload,
-            timeout=30
-        )
+        if reply is None:
+            result = groq_chat(payload, endpoint="chat")
 
-        result = groq_response.json()
+            reply = (
+                result.get("choices", [{}])[0]
+                .get("message", {})
+                .get("content")
+            )
 
-        reply = (
-            result.get("choices", [{}])[0]
-            .get("message", {})
-            .get("content")
-        )
+            if reply and question_vector is not None:
+                semantic_chat_cache.store(message, question_vector, reply, cache_key)
 
         if not reply:
             reply = (
@@ -424,7 +515,7 @@ You are SmartBite AI.
     except Exception:
         reply = "Unable to generate response at the moment."
 
-    # 7️⃣ Save history using USERNAME
+    # 8️⃣ Save history using USERNAME
     try:
         save_history(
             username,
@@ -444,174 +535,67 @@ You are SmartBite AI.
     }
 
 
+def _history_page(user_id, action=None):
+    """
+    One page of a user's history. Query params: limit, cursor (from
+    pagination.nextCursor) and summary=true to leave out `data`.
+    """
+    # Resolve user context + username (cached; Mongo, then Node)
+    raw_user_ctx, username = resolve_user(user_id)
+
+    # Use userId as fallback username if not found
+    username = username or user_id
+
+    entries, pagination = fetch_history(
+        username,
+        action=action,
+        cursor=request.args.get("cursor"),
+        limit=request.args.get("limit", type=int),
+        summary=request.args.get("summary", "").lower() in ("1", "true")
+    )
+
+    body, status = success(entries)
+    body["pagination"] = pagination
+    return body, status
+
+
+def _history_error(message):
+    return {
+        "success": False,
+        "message": message,
+        "data": []
+    }
+
+
 @api.route("/history/<userId>")
 def history(userId):
     """Get AI history for a specific user"""
     try:
-        # Try to get user context to find username
-        raw_user_ctx = None
-        username = None
-        
-        try:
-            # First try to resolve from stored context
-            raw_user_ctx = resolve_user_context(userId)
-            if raw_user_ctx:
-                username = extract_username(raw_user_ctx)
-        except Exception:
-            pass
-
-        # If no username found, try to get from Node.js API
-        if not username:
-            try:
-                node_response = requests.get(
-                    f"{os.getenv('NODE_BACKEND_URL')}/api/v1/users/internal/ai/user-context/{userId}",
-                    headers={
-                        "x-internal-key": os.getenv("INTERNAL_HMAC_SECRET")
-                    },
-                    timeout=10
-                )
-                
-                if node_response.status_code == 200:
-                    node_data = node_response.json()
-                    if node_data.get("success") and node_data.get("data"):
-                        raw_user_ctx = node_data["data"]
-                        username = extract_username(raw_user_ctx)
-            except Exception:
-                pass
-
-        # Use userId as fallback username if still not found
-        if not username:
-            username = userId
-
-        # Fetch history using username
-        history_data = fetch_history(username)
-        
-        return success(history_data)
-        
+        return _history_page(userId)
+    except InvalidCursor as e:
+        return _history_error(str(e)), 400
     except Exception as e:
-        return {
-            "success": False,
-            "message": f"Failed to fetch history: {str(e)}",
-            "data": []
-        }, 500
+        return _history_error(f"Failed to fetch history: {str(e)}"), 500
 
 @api.route("/weekly-plans/<userId>")
 def get_weekly_plans(userId):
-    """Get all weekly plans for a specific user"""
+    """Get weekly plans for a specific user"""
     try:
-        # Try to get user context to find username
-        raw_user_ctx = None
-        username = None
-        
-        try:
-            # First try to resolve from stored context
-            raw_user_ctx = resolve_user_context(userId)
-            if raw_user_ctx:
-                username = extract_username(raw_user_ctx)
-        except Exception:
-            pass
-
-        # If no username found, try to get from Node.js API
-        if not username:
-            try:
-                node_response = requests.get(
-                    f"{os.getenv('NODE_BACKEND_URL')}/api/v1/users/internal/ai/user-context/{userId}",
-                    headers={
-                        "x-internal-key": os.getenv("INTERNAL_HMAC_SECRET")
-                    },
-                    timeout=10
-                )
-                
-                if node_response.status_code == 200:
-                    node_data = node_response.json()
-                    if node_data.get("success") and node_data.get("data"):
-                        raw_user_ctx = node_data["data"]
-                        username = extract_username(raw_user_ctx)
-            except Exception:
-                pass
-
-        # Use userId as fallback username if still not found
-        if not username:
-            username = userId
-
-        # Fetch weekly plans from history
-        weekly_plans = list(
-            history_collection.find(
-                {
-                    "username": username,
-                    "action": "weekly_plan"
-                },
-                {"_id": 0}
-            ).sort("createdAt", -1)  # Sort by newest first
-        )
-        
-        return success(weekly_plans)
-        
+        return _history_page(userId, action="weekly_plan")
+    except InvalidCursor as e:
+        return _history_error(str(e)), 400
     except Exception as e:
-        return {
-            "success": False,
-            "message": f"Failed to fetch weekly plans: {str(e)}",
-            "data": []
-        }, 500
+        return _history_error(f"Failed to fetch weekly plans: {str(e)}"), 500
 
 @api.route("/health-risk-reports/<userId>")
 def get_health_risk_reports(userId):
-    """Get all health risk reports for a specific user"""
+    """Get health risk reports for a specific user"""
     try:
-        # Try to get user context to find username
-        raw_user_ctx = None
-        username = None
-        
-        try:
-            # First try to resolve from stored context
-            raw_user_ctx = resolve_user_context(userId)
-            if raw_user_ctx:
-                username = extract_username(raw_user_ctx)
-        except Exception:
-            pass
-
-        # If no username found, try to get from Node.js API
-        if not username:
-            try:
-                node_response = requests.get(
-                    f"{os.getenv('NODE_BACKEND_URL')}/api/v1/users/internal/ai/user-context/{userId}",
-                    headers={
-                        "x-internal-key": os.getenv("INTERNAL_HMAC_SECRET")
-                    },
-                    timeout=10
-                )
-                
-                if node_response.status_code == 200:
-                    node_data = node_response.json()
-                    if node_data.get("success") and node_data.get("data"):
-                        raw_user_ctx = node_data["data"]
-                        username = extract_username(raw_user_ctx)
-            except Exception:
-                pass
-
-        # Use userId as fallback username if still not found
-        if not username:
-            username = userId
-
-        # Fetch health risk reports from history
-        health_risk_reports = list(
-            history_collection.find(
-                {
-                    "username": username,
-                    "action": "health_risk_report"
-                },
-                {"_id": 0}
-            ).sort("createdAt", -1)  # Sort by newest first
-        )
-        
-        return success(health_risk_reports)
-        
+        return _history_page(userId, action="health_risk_report")
+    except InvalidCursor as e:
+        return _history_error(str(e)), 400
     except Exception as e:
-        return {
-            "success": False,
-            "message": f"Failed to fetch health risk reports: {str(e)}",
-            "data": []
-        }, 500
+        return _history_error(f"Failed to fetch health risk reports: {str(e)}"), 500
 
 @api.route("/summarize-weekly-meal", methods=["POST"])
 def summarize_weekly_meal():
@@ -627,44 +611,25 @@ def summarize_weekly_meal():
             "data": None
         }, 400
 
-    # Try to get user context, with fallback to Node.js API (same as other endpoints)
-    raw_user_ctx = None
-    username = None
-    
-    try:
-        # First try to resolve from stored context
-        raw_user_ctx = resolve_user_context(user_id)
-        if raw_user_ctx:
-            username = extract_username(raw_user_ctx)
-    except Exception:
-        pass
+    if _wants_job():
+        return _enqueue("weekly_summary", body)
+
+    return success(_weekly_summary_result(body))
 
-    # If no username found, try to get from Node.js API
-    if not username:
-        try:
-            node_response = requests.get(
-                f"{os.getenv('NODE_BACKEND_URL')}/api/v1/users/internal/ai/user-context/{user_id}",
-                headers={
-                    "x-internal-key": os.getenv("INTERNAL_HMAC_SECRET")
-                },
-                timeout=10
-            )
-            
-            if node_response.status_code == 200:
-                node_data = node_response.json()
-                if node_data.get("success") and node_data.get("data"):
-                    raw_user_ctx = node_data["data"]
-                    username = extract_username(raw_user_ctx)
-        except Exception:
-            pass
 
-    # Use userId as fallback username if still not found
-    if not username:
-        username = user_id
+def _weekly_summary_result(body):
+    user_id = body.get("userId")
+    weekly_plan = body.get("weeklyPlan")
+
+    # Resolve user context + username (cached; Mongo, then Node)
+    raw_user_ctx, username = resolve_user(user_id)
+
+    # Use userId as fallback username if not found
+    username = username or user_id
 
     # Use raw_user_ctx if available, otherwise create minimal context
     if raw_user_ctx:
-        user_ctx = normalize_user_context(raw_user_ctx)
+        user_ctx = normalize_user_context(node_payload(raw_user_ctx))
     else:
         # Create minimal context when no user context is available
         user_ctx = {
@@ -696,9 +661,9 @@ def summarize_weekly_meal():
     except Exception:
         pass
 
-    return success({
+    return {
         "summary": summary
-    })
+    }
 
 @api.route("/nutrition-impact-summary", methods=["POST"])
 def nutrition_impact_summary():
@@ -713,44 +678,26 @@ def nutrition_impact_summary():
     if not weekly_plan or not health_risk:
         return {"success": False, "message": "weeklyPlan and healthRiskReport are required"}, 400
 
-    # Try to get user context, with fallback to Node.js API (same as other endpoints)
-    raw_user_ctx = None
-    username = None
-    
-    try:
-        # First try to resolve from stored context
-        raw_user_ctx = resolve_user_context(user_id)
-        if raw_user_ctx:
-            username = extract_username(raw_user_ctx)
-    except Exception:
-        pass
+    if _wants_job():
+        return _enqueue("nutrition_impact", body)
 
-    # If no username found, try to get from Node.js API
-    if not username:
-        try:
-            node_response = requests.get(
-                f"{os.getenv('NODE_BACKEND_URL')}/api/v1/users/internal/ai/user-context/{user_id}",
-                headers={
-                    "x-internal-key": os.getenv("INTERNAL_HMAC_SECRET")
-                },
-                timeout=10
-            )
-            
-            if node_response.status_code == 200:
-                node_data = node_response.json()
-                if node_data.get("success") and node_data.get("data"):
-                    raw_user_ctx = node_data["data"]
-                    username = extract_username(raw_user_ctx)
-        except Exception:
-            pass
+    return success(_nutrition_impact_result(body))
+
+
+def _nutrition_impact_result(body):
+    user_id = body.get("userId")
+    weekly_plan = body.get("weeklyPlan")
+    health_risk = body.get("healthRiskReport")
 
-    # Use userId as fallback username if still not found
-    if not username:
-        username = user_id
+    # Resolve user context + username (cached; Mongo, then Node)
+    raw_user_ctx, username = resolve_user(user_id)
+
+    # Use userId as fallback username if not found
+    username = username or user_id
 
     # Use raw_user_ctx if available, otherwise create minimal context
     if raw_user_ctx:
-        user_ctx = normalize_user_context(raw_user_ctx)
+        user_ctx = normalize_user_context(node_payload(raw_user_ctx))
     else:
         # Create minimal context when no user context is available
         user_ctx = {
@@ -786,4 +733,10 @@ def nutrition_impact_summary():
     except Exception:
         pass
 
-    return success(summary)
\ No newline at end of file
+    return summary
+
+
+# 🔹 Endpoints that can run as background jobs (?async=true)
+register_task("weekly_plan", _weekly_plan_result)
+register_task("weekly_summary", _weekly_summary_result)
+register_task("nutrition_impact", _nutrition_impact_result)
@@ -0,0 +1,345 @@
+"""
+Declared Mongo indexes, created idempotently at startup, plus a
+slow-query monitor that explains slow query shapes and flags the ones
+running as collection scans.
+
+Report from a shell (Models/ directory):
+    python -m app.db.indexes            # ensure indexes, then explain the known query shapes
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from pymongo import ASCENDING, DESCENDING, IndexModel, monitoring
+from pymongo.errors import OperationFailure, PyMongoError
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+MONGO_SLOW_QUERY_MS = int(os.getenv("MONGO_SLOW_QUERY_MS", 100))
+MONGO_SLOW_SHAPES_MAX = 50
+# A collection whose indexes failed is retried at most this often
+MONGO_INDEX_RETRY_SECONDS = int(os.getenv("MONGO_INDEX_RETRY_SECONDS", 60))
+
+# 🔹 collection -> indexes its queries need
+INDEXES = {
+    "ai_history": [
+        # /weekly-plans/<userId>, /health-risk-reports/<userId>: username + action, keyset on (createdAt, _id)
+        IndexModel([("username", ASCENDING), ("action", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)],
+                   name="username_action_createdAt_id"),
+        # /history/<userId>: username, keyset on (createdAt, _id)
+        IndexModel([("username", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)],
+                   name="username_createdAt_id"),
+        # admin $or filters and counts: one index per $or branch field
+        IndexModel([("action", ASCENDING), ("createdAt", DESCENDING)], name="action_createdAt"),
+        IndexModel([("type", ASCENDING), ("createdAt", DESCENDING)], name="type_createdAt", sparse=True),
+        # admin listings and recent-activity counts
+        IndexModel([("createdAt", DESCENDING)], name="createdAt"),
+        # analytics per-user lookups
+        IndexModel([("userId", ASCENDING), ("createdAt", DESCENDING)], name="userId_createdAt", sparse=True)
+    ],
+    "user_context": [
+        IndexModel([("userId", ASCENDING)], name="userId_unique", unique=True),
+        IndexModel([("updatedAt", DESCENDING)], name="updatedAt")
+    ],
+    "meal_analysis": [
+        IndexModel([("createdAt", DESCENDING)], name="createdAt")
+    ],
+    "health_risk_reports": [
+        IndexModel([("createdAt", DESCENDING)], name="createdAt"),
+        IndexModel([("userId", ASCENDING)], name="userId")
+    ],
+    "weekly_plans": [
+        IndexModel([("createdAt", DESCENDING)], name="createdAt"),
+        IndexModel([("userId", ASCENDING)], name="userId")
+    ],
+    "ai_jobs": [
+        IndexModel([("inputHash", ASCENDING)], name="inputHash_unique", unique=True),
+        IndexModel([("expiresAt", ASCENDING)], name="expiresAt_ttl", expireAfterSeconds=0)
+    ],
+    "llm_cache": [
+        IndexModel([("expiresAt", ASCENDING)], name="expiresAt_ttl", expireAfterSeconds=0)
+    ]
+}
+
+# 🔹 Query shapes explained by the report (collection, filter, sort)
+QUERY_SHAPES = [
+    ("ai_history", {"username": "u"}, [("createdAt", DESCENDING), ("_id", DESCENDING)]),
+    ("ai_history", {"username": "u", "action": "weekly_plan"}, [("createdAt", DESCENDING), ("_id", DESCENDING)]),
+    ("ai_history", {"$or": [{"action": "weekly_plan"}, {"type": "weekly_plan"}]}, [("createdAt", DESCENDING)]),
+    ("ai_history", {}, [("createdAt", DESCENDING)]),
+    ("ai_history", {"createdAt": {"$gte": "1970-01-01"}}, None),
+    ("ai_history", {"userId": "u"}, None),
+    ("user_context", {"userId": "u"}, None),
+    ("user_context", {}, [("updatedAt", DESCENDING)])
+]
+
+_ensured = set()
+_failures = {}  # collection -> {"indexes": {name: error}, "at": monotonic time}
+_ensure_lock = threading.Lock()  # guards _ensured and _failures; never held during a build
+_build_locks = {name: threading.Lock() for name in INDEXES}  # one build per collection at a time
+
+
+def _due(name) -> bool:
+    """Caller holds _ensure_lock"""
+    if name in _ensured:
+        return False
+    failed = _failures.get(name)
+    return not failed or time.monotonic() - failed["at"] >= MONGO_INDEX_RETRY_SECONDS
+
+
+def ensure_indexes(db, collections=None) -> dict:
+    """
+    Creates the declared indexes (all collections, or just `collections`).
+    Safe to call repeatedly. An index that conflicts with an existing one
+    or fails to build (e.g. duplicate userIds under a unique index) is
+    logged, reported by index_failures() and retried after
+    MONGO_INDEX_RETRY_SECONDS; only a collection whose indexes all exist
+    is skipped from then on. A caller waits only for a build of the same
+    collection already in progress, never for other collections.
+    Returns {collection: [created or confirmed names]}.
+    """
+    done = {}
+    for name, models in INDEXES.items():
+        if collections is not None and name not in collections:
+            continue
+        with _ensure_lock:
+            if not _due(name):
+                continue
+        with _build_locks[name]:
+            # Settled by the build we may have waited for
+            with _ensure_lock:
+                if not _due(name):
+                    continue
+            created, errors = [], {}
+            for model in models:
+                index_name = model.document["name"]
+                try:
+                    created += db[name].create_indexes([model])
+                except OperationFailure as e:
+                    hint = " (existing documents violate uniqueness; dedupe them first)" if e.code == 11000 else ""
+                    logger.error(f"index {name}.{index_name} not created: {e}{hint}")
+                    errors[index_name] = f"{e}{hint}"
+            with _ensure_lock:
+                if errors:
+                    _failures[name] = {"indexes": errors, "at": time.monotonic()}
+                else:
+                    _failures.pop(name, None)
+                    _ensured.add(name)
+        done[name] = created
+    return done
+
+
+def index_failures() -> dict:
+    """{collection: {index name: error}} for declared indexes that could not be created"""
+    with _ensure_lock:
+        return {name: dict(f["indexes"]) for name, f in _failures.items()}
+
+
+def ensure_indexes_in_background(db):
+    """
+    Startup hook: index builds on large collections must not hold up
+    serving. The thread keeps retrying every MONGO_INDEX_RETRY_SECONDS
+    until every declared index exists (failed builds, Mongo unreachable).
+    """
+    if not MONGO_ENSURE_INDEXES:
+        return
+
+    def run():
+        while True:
+            try:
+                start = time.monotonic()
+                done = ensure_indexes(db)
+                if done:
+                    logger.info(
+                        f"mongo indexes ensured on {len(done)} collections "
+                        f"in {time.monotonic() - start:.2f}s"
+                    )
+            except PyMongoError as e:
+                logger.warning(f"mongo index setup failed, retrying in {MONGO_INDEX_RETRY_SECONDS}s: {e}")
+
+            with _ensure_lock:
+                if _ensured.issuperset(INDEXES):
+                    return
+            time.sleep(MONGO_INDEX_RETRY_SECONDS)
+
+    threading.Thread(target=run, name="mongo-indexes", daemon=True).start()
+
+
+# 🔹 Plans
+
+def _plan_stages(plan, stages=None, indexes=None):
+    stages = stages if stages is not None else set()
+    indexes = indexes if indexes is not None else set()
+    stages.add(plan.get("stage"))
+    if plan.get("indexName"):
+        indexes.add(plan["indexName"])
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            _plan_stages(child, stages, indexes)
+    return stages, indexes
+
+
+def explain_query(db, collection, query, sort=None) -> dict:
+    """Winning plan summary for a find: COLLSCAN flag and indexes used"""
+    cursor = db[collection].find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    planner = cursor.explain().get("queryPlanner", {})
+    stages, indexes = _plan_stages(planner.get("winningPlan", {}))
+    return {
+        "collection": collection,
+        "filter": _shape(query),
+        "sort": sort,
+        "collscan": "COLLSCAN" in stages,
+        "inMemorySort": "SORT" in stages,
+        "indexes": sorted(indexes)
+    }
+
+
+# 🔹 Slow queries
+
+def _shape(value):
+    """Filter with values replaced by their type, so shapes group and nothing leaks"""
+    if isinstance(value, dict):
+        return {k: _shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_shape(v) for v in value[:3]]
+    return type(value).__name__
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """
+    Records find/count/aggregate/update/delete commands slower than
+    MONGO_SLOW_QUERY_MS, grouped by (collection, command, filter shape).
+    The last filter of each shape is kept, so the report can explain it.
+    """
+
+    COMMANDS = {"find", "count", "aggregate", "distinct", "update", "delete", "findAndModify"}
+
+    def __init__(self, threshold_ms=MONGO_SLOW_QUERY_MS):
+        self.threshold_ms = threshold_ms
+        self._pending = {}
+        self._shapes = OrderedDict()
+        self._lock = threading.Lock()
+        self.slow = 0
+
+    @staticmethod
+    def _query(name, command):
+        if name == "find":
+            return command.get("filter", {}), command.get("sort")
+        if name in ("count", "distinct"):
+            return command.get("query", {}), None
+        if name == "aggregate":
+            first = (command.get("pipeline") or [{}])[0]
+            return first.get("$match", {}), None
+        if name == "findAndModify":
+            return command.get("query", {}), command.get("sort")
+        statements = command.get("updates") or command.get("deletes") or [{}]
+        return statements[0].get("q", {}), None
+
+    def started(self, event):
+        if event.command_name not in self.COMMANDS:
+            return
+        with self._lock:
+            if len(self._pending) > 10000:
+                self._pending.clear()
+            self._pending[event.request_id] = (event.command.get(event.command_name), event.command)
+
+    def succeeded(self, event):
+        with self._lock:
+            pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return
+        ms = event.duration_micros / 1000
+        if ms < self.threshold_ms:
+            return
+
+        collection, command = pending
+        query, sort = self._query(event.command_name, command)
+        shape = _shape(query)
+        key = (event.database_name, collection, event.command_name, repr(shape), repr(sort))
+        with self._lock:
+            self.slow += 1
+            entry = self._shapes.pop(key, None) or {
+                "database": event.database_name,
+                "collection": collection,
+                "command": event.command_name,
+                "filter": shape,
+                "sort": sort,
+                "count": 0,
+                "maxMs": 0.0
+            }
+            entry["count"] += 1
+            entry["maxMs"] = max(entry["maxMs"], round(ms, 1))
+            entry["_lastQuery"] = query
+            self._shapes[key] = entry
+            while len(self._shapes) > MONGO_SLOW_SHAPES_MAX:
+                self._shapes.popitem(last=False)
+        logger.warning(f"slow mongo {event.command_name} on {collection} ({ms:.0f}ms): {shape}")
+
+    def failed(self, event):
+        with self._lock:
+            self._pending.pop(event.request_id, None)
+
+    def shapes(self):
+        with self._lock:
+            return [dict(e) for e in self._shapes.values()]
+
+    def stats(self) -> dict:
+        with self._lock:
+            top = sorted(self._shapes.values(), key=lambda e: e["count"], reverse=True)[:10]
+            return {
+                "thresholdMs": self.threshold_ms,
+                "slowQueries": self.slow,
+                "shapes": len(self._shapes),
+                "top": [{k: v for k, v in e.items() if not k.startswith("_")} for e in top]
+            }
+
+
+slow_query_listener = SlowQueryListener()
+metrics.register("mongo_slow_queries", slow_query_listener.stats)
+metrics.register("mongo_index_failures", index_failures)
+
+
+def collscan_report(db) -> dict:
+    """
+    Explains the known query shapes and every recorded slow shape (find
+    and count filters), flagging the ones that run as collection scans.
+    """
+    known, slow = [], []
+    for collection, query, sort in QUERY_SHAPES:
+        try:
+            known.append(explain_query(db, collection, query, sort))
+        except PyMongoError as e:
+            known.append({"collection": collection, "filter": _shape(query), "error": str(e)})
+
+    for entry in slow_query_listener.shapes():
+        query = entry.pop("_lastQuery", {})
+        if entry["database"] != db.name or entry["command"] not in ("find", "count", "aggregate"):
+            slow.append(entry)
+            continue
+        try:
+            plan = explain_query(db, entry["collection"], query, entry["sort"])
+            entry.update(collscan=plan["collscan"], inMemorySort=plan["inMemorySort"], indexes=plan["indexes"])
+        except PyMongoError as e:
+            entry["error"] = str(e)
+        slow.append(entry)
+
+    return {
+        "knownQueries": known,
+        "slowQueries": slow,
+        "collscans": [q for q in known + slow if q.get("collscan")],
+        "indexFailures": index_failures()
+    }
+
+
+if __name__ == "__main__":
+    import json
+    from app.db.mongo import db
+
+    print(json.dumps(ensure_indexes(db), indent=2))
+    print(json.dumps(collscan_report(db), indent=2, default=str))
@@ -1,12 +1,18 @@
 from pymongo import MongoClient
 import os
+from app.db.indexes import slow_query_listener
 
 MONGO_URI = os.getenv("MONGODB_URI")
 
 if not MONGO_URI:
     raise RuntimeError("MONGODB_URI not set")
 
-client = MongoClient(MONGO_URI)
+# Pool sized for the gevent worker's concurrent requests; slow commands are recorded
+client = MongoClient(
+    MONGO_URI,
+    maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", 100)),
+    event_listeners=[slow_query_listener]
+)
 
 # ✅ MUST MATCH ATLAS DATABASE NAME
 db = client["Mined_Sprint"]
@@ -14,3 +20,4 @@ db = client["Mined_Sprint"]
 history_collection = db["ai_history"]
 meal_analysis_collection = db["meal_analysis"]
 user_collection = db["user_context"]
+jobs_collection = db["ai_jobs"]
@@ -9,6 +9,9 @@ import os
 from app.api.internal import internal_api
 from app.api.analytics import analytics_bp
 from app.api.admin import admin_bp
+from app.utils import metrics
+from app.db.mongo import db
+from app.db.indexes import ensure_indexes_in_background, index_failures
 import logging
 
 # Setup logging
@@ -40,9 +43,12 @@ def create_app():
             logger.error(f"Database health check failed: {e}")
             db_status = "disconnected"
         
+        failed_indexes = index_failures()
+        
         return jsonify({
-            'status': 'healthy',
+            'status': 'degraded' if failed_indexes else 'healthy',
             'database': db_status,
+            'indexFailures': failed_indexes,
             'services': {
                 'ai_api': 'active',
                 'admin_api': 'active', 
@@ -50,6 +56,7 @@ def create_app():
                 'internal_api': 'active'
             },
             'version': '1.0.0',
+            'serving_mode': os.getenv('SERVING_MODE', 'gevent'),
             'cors_origin': cors_origin
         })
     
@@ -69,6 +76,12 @@ def create_app():
             'routes': sorted(routes, key=lambda x: x['rule'])
         })
     
+    # Pool, retry, latency and cache counters
+    @app.route('/metrics', methods=['GET'])
+    def service_metrics():
+        """Counters from the HTTP clients and in-process caches"""
+        return jsonify(metrics.snapshot())
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -85,6 +98,9 @@ def create_app():
     app.register_blueprint(analytics_bp, url_prefix='/analytics')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     
+    # Declared Mongo indexes (idempotent; off the startup path)
+    ensure_indexes_in_background(db)
+    
     logger.info("Flask AI Service initialized successfully")
     logger.info(f"CORS enabled for: {cors_origin}")
     
@@ -1,7 +1,25 @@
 import os
+import time
+import threading
 import requests
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from app.constants.prompts import MEAL_GEN_PROMPT
+from app.services.llm_client import groq_post
+
+# Concurrent week generation
+MEAL_GEN_CONCURRENCY = int(os.getenv("MEAL_GEN_CONCURRENCY", 4))
+MEAL_GEN_TIMEOUT = float(os.getenv("MEAL_GEN_TIMEOUT", 5))
+MEAL_GEN_DEADLINE = float(os.getenv("MEAL_GEN_DEADLINE", 12))
+
+# Hedging: duplicate a day's request once it runs past the observed p95
+MEAL_GEN_HEDGE = os.getenv("MEAL_GEN_HEDGE", "true").lower() == "true"
+MEAL_GEN_MAX_HEDGES = int(os.getenv("MEAL_GEN_MAX_HEDGES", 2))
+HEDGE_MIN_SAMPLES = 20
+
+_latencies = deque(maxlen=200)
+_latency_lock = threading.Lock()
 
 def remove_calories_from_response(response):
     """Remove calorie counts from meal plan response while keeping the rest intact"""
@@ -10,7 +28,8 @@ def remove_calories_from_response(response):
     cleaned = re.sub(r'\s*\d+\s*calories?', '', cleaned)
     return cleaned
 
-def generate_meals(macros, profile, day_context=None):
+def build_day_payload(macros, profile, day_context=None):
+    """Groq chat payload for a single day's meals"""
     # Create day-specific prompt additions for variety
     day_info = ""
     if day_context:
@@ -51,29 +70,139 @@ Make this day's meals UNIQUE and DIFFERENT from other days while maintaining the
         ],
         "temperature": temperature
     }
+    return payload
+
+
+def request_day_meals(payload, timeout=None, retries=None):
+    """Calls Groq for one day; raises on timeout or a non-200 response"""
+    res = groq_post(payload, endpoint="meal_day", timeout=timeout, retries=retries)
+    if res.status_code != 200:
+        raise requests.HTTPError(f"Groq returned {res.status_code}", response=res)
+
+    ai_response = res.json()["choices"][0]["message"]["content"]
+    # Remove calories from the response while keeping the rest
+    return remove_calories_from_response(ai_response)
+
+
+def generate_meals(macros, profile, day_context=None):
+    payload = build_day_payload(macros, profile, day_context)
 
     try:
-        res = requests.post(
-            os.getenv("GROQ_API_URL"),
-            headers={"Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"},
-            json=payload,
-            timeout=5  # 5 second timeout per request
-        )
-        
-        if res.status_code == 200:
-            ai_response = res.json()["choices"][0]["message"]["content"]
-            # Remove calories from the response while keeping the rest
-            cleaned_response = remove_calories_from_response(ai_response)
-            return cleaned_response
-        else:
-            # Return fallback meal plan if API fails
-            return generate_fallback_meals(macros, day_context)
-            
+        return request_day_meals(payload)  # 5 second timeout per request
     except Exception:
         # Return fallback meal plan if request fails or times out
         return generate_fallback_meals(macros, day_context)
 
 
+def _record_latency(seconds):
+    with _latency_lock:
+        _latencies.append(seconds)
+
+
+def hedge_delay():
+    """p95 of recent successful day requests, or None until enough samples exist"""
+    with _latency_lock:
+        samples = sorted(_latencies)
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+
+
+def _timed_request(payload, timeout):
+    start = time.monotonic()
+    # No retries here: a slow or failed day is covered by hedging / fallback
+    content = request_day_meals(payload, timeout, retries=0)
+    _record_latency(time.monotonic() - start)
+    return content
+
+
+def generate_meals_concurrently(day_requests, profile,
+                                concurrency=None, deadline=None, hedge=None):
+    """
+    Generates several days in parallel. day_requests is a list of
+    (macros, day_context); returns {day: plan} in input order.
+
+    At most `concurrency` primary requests are in flight. A day still
+    running past the p95 latency gets one hedged duplicate (first answer
+    wins). A day whose attempts all fail, or that is unfinished at the
+    deadline, falls back on its own without holding up the others.
+    """
+    concurrency = max(int(concurrency or MEAL_GEN_CONCURRENCY), 1)
+    deadline = time.monotonic() + (MEAL_GEN_DEADLINE if deadline is None else deadline)
+    hedge = MEAL_GEN_HEDGE if hedge is None else hedge
+    max_hedges = MEAL_GEN_MAX_HEDGES if hedge else 0
+    delay = hedge_delay() if hedge else None
+
+    payloads = [build_day_payload(macros, profile, ctx) for macros, ctx in day_requests]
+    queue = deque(range(len(day_requests)))
+    results = {}
+    in_flight = {}      # future -> day index
+    attempts = {}       # day index -> live attempt count
+    started = {}        # day index -> launch time of the primary
+    hedged = set()
+
+    executor = ThreadPoolExecutor(max_workers=concurrency + max_hedges)
+
+    def launch(i):
+        future = executor.submit(_timed_request, payloads[i], MEAL_GEN_TIMEOUT)
+        in_flight[future] = i
+        attempts[i] = attempts.get(i, 0) + 1
+
+    def fallback(i):
+        macros, ctx = day_requests[i]
+        results[i] = generate_fallback_meals(macros, ctx)
+
+    try:
+        while queue or in_flight:
+            # 🔹 Admit primaries up to the concurrency limit
+            while queue and len(started) - len(results) < concurrency:
+                i = queue.popleft()
+                started[i] = time.monotonic()
+                launch(i)
+
+            now = time.monotonic()
+            if now >= deadline:
+                break
+
+            # 🔹 Hedge days running longer than p95
+            next_hedge = None
+            if delay is not None:
+                for i, t0 in started.items():
+                    if i in results or i in hedged or len(hedged) >= max_hedges:
+                        continue
+                    due = t0 + delay
+                    if due <= now:
+                        hedged.add(i)
+                        launch(i)
+                    elif next_hedge is None or due < next_hedge:
+                        next_hedge = due
+
+            wake = min(deadline, next_hedge) if next_hedge else deadline
+            done, _ = wait(list(in_flight), timeout=max(wake - now, 0),
+                           return_when=FIRST_COMPLETED)
+
+            for future in done:
+                i = in_flight.pop(future)
+                attempts[i] -= 1
+                if i in results:
+                    continue
+                try:
+                    results[i] = future.result()
+                except Exception:
+                    # Only fall back once no other attempt for the day is pending
+                    if attempts[i] == 0:
+                        fallback(i)
+    finally:
+        # Late attempts finish within their own HTTP timeout
+        executor.shutdown(wait=False)
+
+    for i in range(len(day_requests)):
+        if i not in results:
+            fallback(i)
+
+    return {day_requests[i][1]["day"]: results[i] for i in range(len(day_requests))}
+
+
 def generate_fallback_meals(macros, day_context=None):
     """Generate a simple fallback meal plan when AI service is unavailable"""
     day_name = day_context['day'] if day_context else "Day"
@@ -1,7 +1,17 @@
-import os
-import requests
+import json
 import re
 from app.constants.prompts import MEAL_GEN_PROMPT
+from app.services.llm_client import groq_post
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# A line that opens a day section, e.g. "**Monday (Day 1 - start)**" or "### Monday"
+DAY_HEADER_RE = re.compile(
+    r"^[ \t]*(?:#{1,6}[ \t]*[^\n]*?|(?:#{1,6}[ \t]*)?\*\*[^*\n]*)\b("
+    + "|".join(DAYS)
+    + r")\b",
+    re.IGNORECASE | re.MULTILINE
+)
 
 def remove_calories_from_response(response):
     """Remove calorie counts from meal plan response while keeping the rest intact"""
@@ -10,24 +20,50 @@ def remove_calories_from_response(response):
     cleaned = re.sub(r'\s*\d+\s*calories?', '', cleaned)
     return cleaned
 
-def generate_weekly_meals_batch(distribution, profile, weekly_cals):
-    """Generate all 7 days of meals in a single API call for better performance"""
-    
+def format_meal_budget(budget):
+    """One prompt line of per-meal macro budgets"""
+    return (
+        f"{round(budget['calories'])} calories, "
+        f"{round(budget['protein'])}g protein, "
+        f"{round(budget['carbs'])}g carbs, "
+        f"{round(budget['fats'])}g fat, "
+        f"max {round(budget['sodium'])}mg sodium, "
+        f"max {round(budget['sugar'])}g sugar"
+    )
+
+
+def build_weekly_payload(distribution, profile, weekly_cals, meal_budgets=None):
+    """Groq chat payload asking for all 7 days in one completion"""
+
     # Create the weekly meal request
     weekly_request = ""
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    
+    days = DAYS
+
     for i, day in enumerate(days):
         daily_cals = weekly_cals[i] if i < len(weekly_cals) else weekly_cals[0]
         
+        week_position = "start" if i < 2 else "middle" if i < 5 else "weekend"
+
+        # Exact per-meal macro budgets from the weekly optimizer
+        if meal_budgets and day in meal_budgets:
+            budgets = meal_budgets[day]
+            weekly_request += f"""
+**{day} (Day {i+1} - {week_position})**
+Meal Budgets:
+- Breakfast: {format_meal_budget(budgets['breakfast'])}
+- Lunch: {format_meal_budget(budgets['lunch'])}
+- Dinner: {format_meal_budget(budgets['dinner'])}
+- Snack: {format_meal_budget(budgets['snacks'])}
+
+"""
+            continue
+        
         # Calculate daily macros based on distribution
         breakfast_cals = round(daily_cals * distribution['breakfast'] / 100)
         lunch_cals = round(daily_cals * distribution['lunch'] / 100)
         dinner_cals = round(daily_cals * distribution['dinner'] / 100)
         snack_cals = round(daily_cals * distribution['snacks'] / 100)
         
-        week_position = "start" if i < 2 else "middle" if i < 5 else "weekend"
-        
         weekly_request += f"""
 **{day} (Day {i+1} - {week_position})**
 Target Calories:
@@ -72,14 +108,20 @@ Generate the complete weekly meal plan now:
         "temperature": 0.7,
         "max_tokens": 4000  # Increased for full week generation
     }
+    return payload
+
+
+def generate_weekly_meals_batch(distribution, profile, weekly_cals, meal_budgets=None):
+    """
+    Generate all 7 days of meals in a single API call for better performance.
+    Returns None if the call fails, so the caller can fall back per day.
+    """
+    days = DAYS
+    payload = build_weekly_payload(distribution, profile, weekly_cals, meal_budgets)
 
     try:
-        res = requests.post(
-            os.getenv("GROQ_API_URL"),
-            headers={"Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}"},
-            json=payload,
-            timeout=15  # Longer timeout for batch generation
-        )
+        # Longer timeout for batch generation
+        res = groq_post(payload, endpoint="meal_week")
         
         if res.status_code == 200:
             weekly_content = res.json()["choices"][0]["message"]["content"]
@@ -87,10 +129,10 @@ Generate the complete weekly meal plan now:
             cleaned_content = remove_calories_from_response(weekly_content)
             return parse_weekly_response(cleaned_content, days, distribution, weekly_cals)
         else:
-            return generate_fallback_weekly_plan(distribution, weekly_cals)
-            
+            return None
+
     except Exception:
-        return generate_fallback_weekly_plan(distribution, weekly_cals)
+        return None
 
 
 def parse_weekly_response(content, days, distribution, weekly_cals):
@@ -134,22 +176,138 @@ def parse_weekly_response(content, days, distribution, weekly_cals):
     # Fill in any missing days with fallback
     for i, day in enumerate(days):
         if day not in weekly_plan:
-            daily_cals = weekly_cals[i] if i < len(weekly_cals) else weekly_cals[0]
-            macros = {
-                'breakfast': round(daily_cals * distribution['breakfast'] / 100),
-                'lunch': round(daily_cals * distribution['lunch'] / 100),
-                'dinner': round(daily_cals * distribution['dinner'] / 100),
-                'snacks': round(daily_cals * distribution['snacks'] / 100)
-            }
-            day_context = {'day': day, 'day_number': i + 1}
-            weekly_plan[day] = generate_fallback_meals(macros, day_context)
+            weekly_plan[day] = fallback_day_plan(i, distribution, weekly_cals)
     
     return weekly_plan
 
 
+def fallback_day_plan(day_index, distribution, weekly_cals):
+    """Template plan for a single day the AI did not deliver"""
+    daily_cals = weekly_cals[day_index] if day_index < len(weekly_cals) else weekly_cals[0]
+    macros = {
+        'breakfast': round(daily_cals * distribution['breakfast'] / 100),
+        'lunch': round(daily_cals * distribution['lunch'] / 100),
+        'dinner': round(daily_cals * distribution['dinner'] / 100),
+        'snacks': round(daily_cals * distribution['snacks'] / 100)
+    }
+    day_context = {'day': DAYS[day_index], 'day_number': day_index + 1}
+    return generate_fallback_meals(macros, day_context)
+
+
+class WeeklyPlanStreamParser:
+    """
+    Incremental day splitter for a streamed weekly plan. A day is complete
+    once the next day's header line arrives (or the stream ends); text
+    before the first header is dropped, as in parse_weekly_response.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._scanned = 0        # offset of the first line not yet checked for a header
+        self._current = None     # (day, offset of its header)
+        self.seen = set()
+
+    def feed(self, text):
+        """Append streamed text; returns [(day, content)] for days that just completed"""
+        self._buffer += text
+        finished = []
+
+        # Only whole lines can be classified as headers
+        end = self._buffer.rfind("\n") + 1
+        for match in DAY_HEADER_RE.finditer(self._buffer, self._scanned, end):
+            day = match.group(1).capitalize()
+            if day in self.seen:
+                # Repeated header (e.g. a recap) stays part of the current day
+                continue
+            if self._current:
+                finished.append(self._section(match.start()))
+            self._current = (day, match.start())
+            self.seen.add(day)
+        self._scanned = max(self._scanned, end)
+
+        # 🔹 Keep only the open day in memory
+        cut = self._current[1] if self._current else self._scanned
+        if cut:
+            self._buffer = self._buffer[cut:]
+            self._scanned -= cut
+            if self._current:
+                self._current = (self._current[0], 0)
+
+        return finished
+
+    def close(self):
+        """Flush the last open day once the stream finished cleanly"""
+        if not self._current:
+            return []
+        finished = [self._section(len(self._buffer))]
+        self._current = None
+        return finished
+
+    def _section(self, stop):
+        day, start = self._current
+        content = remove_calories_from_response(self._buffer[start:stop])
+        return day, content.strip()
+
+
+def _iter_stream_content(res):
+    """Yields content deltas from an OpenAI-style server-sent-event stream"""
+    res.encoding = "utf-8"
+    for line in res.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        chunk = json.loads(data)
+        choices = chunk.get("choices") or [{}]
+        delta = choices[0].get("delta", {}).get("content")
+        if delta:
+            yield delta
+
+
+def stream_weekly_meals_batch(distribution, profile, weekly_cals, meal_budgets=None):
+    """
+    Streaming variant of generate_weekly_meals_batch. Yields
+    (day, plan, source) as soon as each day is complete, source being
+    "ai" or "fallback". Days lost to an error or a cut-off stream are
+    filled with fallbacks at the end, so all 7 days are always yielded.
+    """
+    payload = build_weekly_payload(distribution, profile, weekly_cals, meal_budgets)
+    payload["stream"] = True
+
+    parser = WeeklyPlanStreamParser()
+    delivered = set()
+    res = None
+
+    try:
+        # Read timeout bounds the silence between chunks, not the whole week
+        res = groq_post(payload, endpoint="meal_week_stream", stream=True)
+
+        if res.status_code == 200:
+            for delta in _iter_stream_content(res):
+                for day, content in parser.feed(delta):
+                    delivered.add(day)
+                    yield day, content, "ai"
+
+            # ✅ Stream ended normally: the last open day is complete
+            for day, content in parser.close():
+                delivered.add(day)
+                yield day, content, "ai"
+    except Exception:
+        # A partially streamed day is discarded and replaced below
+        pass
+    finally:
+        if res is not None:
+            res.close()
+
+    for i, day in enumerate(DAYS):
+        if day not in delivered:
+            yield day, fallback_day_plan(i, distribution, weekly_cals), "fallback"
+
+
 def generate_fallback_weekly_plan(distribution, weekly_cals):
     """Generate a complete fallback weekly plan"""
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    days = DAYS
     weekly_plan = {}
     
     meal_templates = {
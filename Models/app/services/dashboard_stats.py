@@ -0,0 +1,244 @@
+"""
+Admin dashboard statistics.
+
+ai_history is summarised by one $facet aggregation. The other collections
+use estimated (metadata) counts. Results are cached for DASHBOARD_STATS_TTL
+seconds. With DASHBOARD_COUNTERS=true, reads come from counter documents
+that save_history keeps up to date, so their cost does not grow with
+history. The counters are rebuilt from the aggregation every
+DASHBOARD_COUNTERS_RECONCILE seconds, which catches writes made
+elsewhere (e.g. the Node backend).
+
+Rebuild the counters from a shell (Models/ directory):
+    python -m app.services.dashboard_stats
+"""
+
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from pymongo import ReplaceOne, UpdateOne
+from app.utils.cache import LRUCache
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_STATS_TTL = float(os.getenv("DASHBOARD_STATS_TTL", 30))
+DASHBOARD_COUNTERS = os.getenv("DASHBOARD_COUNTERS", "false").lower() == "true"
+DASHBOARD_COUNTERS_RECONCILE = float(os.getenv("DASHBOARD_COUNTERS_RECONCILE", 3600))
+
+COUNTERS_COLLECTION = "ai_history_counters"
+RECENT_DAYS = 30
+
+# Kinds reported under byType. A record's kind is its `type`, else its `action`.
+TRACKED_KINDS = ("chat", "meal_analysis", "weekly_plan", "health_risk_report")
+
+_stats_cache = LRUCache(1, ttl=DASHBOARD_STATS_TTL)
+_compute_lock = threading.Lock()
+metrics.register("dashboard_stats_cache", _stats_cache.stats)
+
+
+# 🔹 Aggregation
+
+def aggregate_history_stats(history, now=None) -> dict:
+    """
+    One pass over ai_history: total, counts per tracked kind, and per-day
+    counts for the last RECENT_DAYS days. last7Days / last30Days are
+    calendar days (UTC, today included), the same as the counters give.
+    """
+    now = now or datetime.utcnow()
+    first_day = _day_start(now, RECENT_DAYS - 1)
+    pipeline = [{"$facet": {
+        "byKind": [
+            {"$group": {"_id": {"$ifNull": ["$type", "$action"]}, "n": {"$sum": 1}}}
+        ],
+        "days": [
+            {"$match": {"createdAt": {"$gte": first_day, "$type": "date"}}},
+            {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$createdAt"}}, "n": {"$sum": 1}}}
+        ],
+        "isoDays": [
+            {"$match": {"createdAt": {"$gte": first_day.isoformat(), "$type": "string"}}},
+            {"$group": {"_id": {"$substrBytes": ["$createdAt", 0, 10]}, "n": {"$sum": 1}}}
+        ]
+    }}]
+    facets = next(history.aggregate(pipeline), {})
+
+    by_kind = {row["_id"]: row["n"] for row in facets.get("byKind", [])}
+    days = {}
+    for row in facets.get("days", []) + facets.get("isoDays", []):
+        days[row["_id"]] = days.get(row["_id"], 0) + row["n"]
+    return {
+        "total": sum(by_kind.values()),
+        "byKind": {kind: by_kind.get(kind, 0) for kind in TRACKED_KINDS},
+        **_recent(days, now),
+        "days": days
+    }
+
+
+# 🔹 Counters
+
+def _day_start(now, days_ago):
+    day = (now - timedelta(days=days_ago)).date()
+    return datetime(day.year, day.month, day.day)
+
+
+def _day_key(day) -> str:
+    return f"day:{day.strftime('%Y-%m-%d')}"
+
+
+def _recent(days, now):
+    """last7Days / last30Days from {YYYY-MM-DD: count}: calendar days, today included"""
+    dates = [_day_start(now, i).strftime('%Y-%m-%d') for i in range(RECENT_DAYS)]
+    return {
+        "last7Days": sum(days.get(d, 0) for d in dates[:7]),
+        "last30Days": sum(days.get(d, 0) for d in dates)
+    }
+
+
+def record_history_saved(history, kind, created_at=None):
+    """Count a new ai_history record (no-op unless DASHBOARD_COUNTERS)"""
+    if not DASHBOARD_COUNTERS:
+        return
+    _bump(history, kind, created_at or datetime.utcnow(), 1)
+
+
+def record_history_deleted(history, doc):
+    """Uncount a deleted ai_history record (no-op unless DASHBOARD_COUNTERS)"""
+    if not DASHBOARD_COUNTERS or not doc:
+        return
+    created_at = doc.get("createdAt")
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at[:19])
+        except ValueError:
+            created_at = None
+    _bump(history, doc.get("type") or doc.get("action"), created_at, -1)
+
+
+def _bump(history, kind, created_at, delta):
+    total = {"total": delta}
+    if kind in TRACKED_KINDS:
+        total[f"byKind.{kind}"] = delta
+    ops = [UpdateOne({"_id": "total"}, {"$inc": total}, upsert=True)]
+    if isinstance(created_at, datetime):
+        ops.append(UpdateOne({"_id": _day_key(created_at)}, {"$inc": {"total": delta}}, upsert=True))
+    try:
+        history.database[COUNTERS_COLLECTION].bulk_write(ops, ordered=False)
+    except Exception as e:
+        # Never fail the write being counted; the next reconcile corrects drift
+        logger.warning(f"dashboard counters not updated: {e}")
+
+
+def rebuild_counters(history, now=None) -> dict:
+    """Replace the counter documents with a fresh aggregation"""
+    now = now or datetime.utcnow()
+    stats = aggregate_history_stats(history, now)
+    counters = history.database[COUNTERS_COLLECTION]
+
+    counters.replace_one(
+        {"_id": "total"},
+        {"total": stats["total"], "byKind": stats["byKind"], "reconciledAt": now},
+        upsert=True
+    )
+    # Upsert each day rather than delete + insert: concurrent _bump upserts
+    # would otherwise collide with the inserts (duplicate key)
+    day_ids = [f"day:{day}" for day in stats["days"]]
+    if day_ids:
+        counters.bulk_write(
+            [ReplaceOne({"_id": f"day:{day}"}, {"total": n}, upsert=True) for day, n in stats["days"].items()],
+            ordered=False
+        )
+    counters.delete_many({"_id": {"$regex": "^day:", "$nin": day_ids}})
+    return stats
+
+
+def read_counters(history, now=None):
+    """History stats from the counters; None if they need a rebuild"""
+    now = now or datetime.utcnow()
+    counters = history.database[COUNTERS_COLLECTION]
+
+    total = counters.find_one({"_id": "total"})
+    reconciled_at = (total or {}).get("reconciledAt")
+    if not reconciled_at or (now - reconciled_at).total_seconds() > DASHBOARD_COUNTERS_RECONCILE:
+        return None
+
+    day_keys = [_day_key(_day_start(now, i)) for i in range(RECENT_DAYS)]
+    days = {d["_id"][4:]: d.get("total", 0) for d in counters.find({"_id": {"$in": day_keys}})}
+    by_kind = total.get("byKind", {})
+    return {
+        "total": total.get("total", 0),
+        "byKind": {kind: by_kind.get(kind, 0) for kind in TRACKED_KINDS},
+        **_recent(days, now)
+    }
+
+
+# 🔹 Dashboard
+
+def compute_dashboard_stats(db) -> dict:
+    history = db["ai_history"]
+    now = datetime.utcnow()
+
+    history_stats = read_counters(history, now) if DASHBOARD_COUNTERS else None
+    source = "counters"
+    if history_stats is None:
+        if DASHBOARD_COUNTERS:
+            history_stats = rebuild_counters(history, now)
+        else:
+            history_stats = aggregate_history_stats(history, now)
+        source = "aggregation"
+
+    by_kind = history_stats["byKind"]
+    meal_analysis_count = db["meal_analysis"].estimated_document_count() + by_kind["meal_analysis"]
+    weekly_plans_count = db["weekly_plans"].estimated_document_count() + by_kind["weekly_plan"]
+    health_reports_count = db["health_risk_reports"].estimated_document_count() + by_kind["health_risk_report"]
+
+    return {
+        'aiInteractions': {
+            'total': history_stats["total"],
+            'byType': {
+                'chat': by_kind["chat"],
+                'meal_analysis': meal_analysis_count,
+                'weekly_plan': weekly_plans_count,
+                'health_risk_report': health_reports_count
+            },
+            'last7Days': history_stats["last7Days"],
+            'last30Days': history_stats["last30Days"]
+        },
+        'chatActivity': {
+            'totalMessages': by_kind["chat"],
+            'averageLength': 150  # Placeholder
+        },
+        'weeklyPlans': {
+            'total': weekly_plans_count
+        },
+        'healthReports': {
+            'total': health_reports_count
+        },
+        'userContext': {
+            'total': db["user_context"].estimated_document_count()
+        },
+        'source': source,
+        'generatedAt': now.isoformat()
+    }
+
+
+def get_dashboard_stats(db, refresh=False) -> dict:
+    """Cached for DASHBOARD_STATS_TTL; concurrent misses compute once"""
+    if not refresh:
+        cached = _stats_cache.get("stats")
+        if cached is not None:
+            return cached
+
+    with _compute_lock:
+        cached = None if refresh else _stats_cache.get("stats")
+        if cached is None:
+            cached = compute_dashboard_stats(db)
+            _stats_cache.set("stats", cached)
+        return cached
+
+
+if __name__ == "__main__":
+    import json
+    from app.db.mongo import db
+
+    print(json.dumps(rebuild_counters(db["ai_history"]), indent=2, default=str))
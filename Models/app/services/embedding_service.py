@@ -1,6 +1,212 @@
-from sentence_transformers import SentenceTransformer
+import os
+import math
+import sqlite3
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2; the loaded model's own size wins once loaded
+# torch: PyTorch weights | onnx: ONNX Runtime graph (int8 dynamically quantized by default)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+
+# 🔹 Large imports: encode across a process pool (0 = in-process)
+EMBEDDING_PROCESSES = int(os.getenv("EMBEDDING_PROCESSES", 0))
+EMBEDDING_POOL_MIN_TEXTS = int(os.getenv("EMBEDDING_POOL_MIN_TEXTS", 2000))
+
+# Content-hash → vector cache shared by workers and imports ("" disables)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "models/embedding_cache.sqlite")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def model_id() -> str:
+    """Identifies the vector space; cached vectors from another model/backend are never reused"""
+    if EMBEDDING_BACKEND == "onnx":
+        return f"{EMBEDDING_MODEL}:onnx:{EMBEDDING_ONNX_FILE}"
+    return f"{EMBEDDING_MODEL}:{EMBEDDING_BACKEND}"
+
+
+def load_model():
+    from sentence_transformers import SentenceTransformer
+
+    if EMBEDDING_BACKEND == "onnx":
+        return SentenceTransformer(
+            EMBEDDING_MODEL,
+            backend="onnx",
+            model_kwargs={"file_name": EMBEDDING_ONNX_FILE}
+        )
+    if EMBEDDING_BACKEND != "torch":
+        raise ValueError(f"unknown EMBEDDING_BACKEND {EMBEDDING_BACKEND!r}, expected torch or onnx")
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+def get_model():
+    """
+    Loaded on first use, not at import. With EMBEDDING_PRELOAD the
+    gunicorn master calls this before forking, so workers share the
+    weights copy-on-write.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model()
+                logger.info(f"embedding model loaded: {model_id()}")
+    return _model
+
+
+def dimension() -> int:
+    """Vector size, without loading the model just to ask"""
+    if _model is not None:
+        return _model.get_sentence_embedding_dimension() or EMBEDDING_DIM
+    return EMBEDDING_DIM
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
 
 def embed(texts):
-    return model.encode(texts)
+    """Encode texts as-is (no dedupe, no cache); float32 (n, dim)"""
+    return np.asarray(
+        get_model().encode(list(texts), batch_size=EMBEDDING_BATCH_SIZE),
+        dtype=np.float32
+    )
+
+
+class EmbeddingCache:
+    """
+    SQLite table of vectors keyed by sha1(model id + text). WAL mode lets
+    several workers and an import script share one file. Errors are
+    logged and treated as misses.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text) -> str:
+        return hashlib.sha1(f"{model_id()}\0{text}".encode("utf-8")).hexdigest()
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys) -> dict:
+        found = {}
+        if not self.path or not keys:
+            return found
+        try:
+            with self._lock:
+                conn = self._connection()
+                # Stay under SQLite's bound-parameter limit
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    found.update((k, np.frombuffer(v, dtype=np.float32)) for k, v in rows)
+        except sqlite3.Error as e:
+            logger.warning(f"embedding cache read failed: {e}")
+        return found
+
+    def put_many(self, items):
+        if not self.path or not items:
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items]
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"embedding cache write failed: {e}")
+
+
+embedding_cache = EmbeddingCache()
+
+_stats = {"texts": 0, "duplicates": 0, "cacheHits": 0, "encoded": 0, "poolRuns": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for name, value in deltas.items():
+            _stats[name] += value
+
+
+def _encode_in_pool(texts):
+    """Split across EMBEDDING_PROCESSES spawned workers; each loads the model once"""
+    chunk = math.ceil(len(texts) / EMBEDDING_PROCESSES)
+    chunks = [texts[i:i + chunk] for i in range(0, len(texts), chunk)]
+    # spawn, not fork: a forked copy of an initialised torch/ORT runtime can deadlock
+    with ProcessPoolExecutor(len(chunks), mp_context=multiprocessing.get_context("spawn")) as pool:
+        return np.vstack(list(pool.map(embed, chunks)))
+
+
+def embed_many(texts) -> np.ndarray:
+    """
+    Embeds texts in order. Identical texts are encoded once, vectors in
+    the content-hash cache are reused, and the rest are encoded in
+    EMBEDDING_BATCH_SIZE batches (across a process pool for large
+    imports when EMBEDDING_PROCESSES is set).
+    """
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, dimension()), dtype=np.float32)
+
+    unique = list(dict.fromkeys(texts))
+    keys = [EmbeddingCache.key(t) for t in unique]
+    cached = embedding_cache.get_many(keys)
+
+    missing = [(t, k) for t, k in zip(unique, keys) if k not in cached]
+    if missing:
+        missing_texts = [t for t, _ in missing]
+        if EMBEDDING_PROCESSES > 0 and len(missing_texts) >= EMBEDDING_POOL_MIN_TEXTS:
+            vectors = _encode_in_pool(missing_texts)
+            _count(poolRuns=1)
+        else:
+            vectors = embed(missing_texts)
+        fresh = [(k, v) for (_, k), v in zip(missing, vectors)]
+        embedding_cache.put_many(fresh)
+        cached.update(fresh)
+
+    _count(
+        texts=len(texts),
+        duplicates=len(texts) - len(unique),
+        cacheHits=len(unique) - len(missing),
+        encoded=len(missing)
+    )
+
+    by_text = {t: cached[k] for t, k in zip(unique, keys)}
+    return np.vstack([by_text[t] for t in texts]).astype(np.float32)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return {
+            **_stats,
+            "model": model_id(),
+            "loaded": _model is not None,
+            "batchSize": EMBEDDING_BATCH_SIZE
+        }
+
+
+metrics.register("embeddings", stats)
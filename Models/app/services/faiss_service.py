@@ -1,12 +1,677 @@
+import os
+import json
+import time
+import atexit
+import shutil
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
 import faiss
 import numpy as np
+from app.services.feature_encoder import normalize_token
+from app.utils import metrics
 
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: single process, no publish lock
+    fcntl = None
 
-index = faiss.IndexFlatL2(384)
+logger = logging.getLogger(__name__)
 
-def add_embeddings(vectors):
-    index.add(np.array(vectors).astype("float32"))
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
 
-def search(query_vector, k=5):
-    D, I = index.search(np.array([query_vector]).astype("float32"), k)
-    return I.tolist()
+MEAL_INDEX_PATH = os.getenv("MEAL_INDEX_PATH", "models/meal_index")
+MEAL_INDEX_SAVE_INTERVAL = int(os.getenv("MEAL_INDEX_SAVE_INTERVAL", 60))
+MEAL_INDEX_KEEP_SNAPSHOTS = 2
+
+# 🔹 ANN tiers: flat (exact) | ivf | hnsw | ivfpq. Built by ml/build_meal_index.py
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+MEAL_INDEX_TYPE = os.getenv("MEAL_INDEX_TYPE", "flat")
+MEAL_INDEX_MIN_ANN_SIZE = int(os.getenv("MEAL_INDEX_MIN_ANN_SIZE", 10000))  # smaller catalogs stay flat
+MEAL_INDEX_TRAIN_SAMPLE = int(os.getenv("MEAL_INDEX_TRAIN_SAMPLE", 50000))
+MEAL_INDEX_NLIST = int(os.getenv("MEAL_INDEX_NLIST", 0))  # 0 → 4·√N
+MEAL_INDEX_NPROBE = int(os.getenv("MEAL_INDEX_NPROBE", 16))
+MEAL_INDEX_HNSW_M = int(os.getenv("MEAL_INDEX_HNSW_M", 32))
+MEAL_INDEX_EF_CONSTRUCTION = int(os.getenv("MEAL_INDEX_EF_CONSTRUCTION", 80))
+MEAL_INDEX_EF_SEARCH = int(os.getenv("MEAL_INDEX_EF_SEARCH", 64))
+MEAL_INDEX_PQ_M = int(os.getenv("MEAL_INDEX_PQ_M", 48))  # sub-quantizers; must divide the dim
+MEAL_INDEX_PQ_NBITS = 8
+
+# 🔹 Filtered search
+FILTER_FIELDS = ("mealType", "cuisine", "costLevel")   # include-any
+MEAL_INDEX_FILTER_EXACT_MAX = int(os.getenv("MEAL_INDEX_FILTER_EXACT_MAX", 4096))  # allowed sets this small are scanned exactly
+MEAL_INDEX_FILTER_MAX_EXPANSIONS = 3
+MEAL_INDEX_FILTER_MAX_EF = 4096
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "LOCK"
+
+
+def meal_text(meal) -> str:
+    """Text embedded for a meal (name + ingredients)"""
+    return meal["name"] + " " + " ".join(meal["ingredients"])
+
+
+def content_hash(text) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def meal_attributes(meal) -> dict:
+    """Filterable attributes of a meal, normalised for lookup"""
+    return {
+        "allergens": sorted({normalize_token(a) for a in meal.get("allergens") or [] if a}),
+        **{field: normalize_token(meal[field]) for field in FILTER_FIELDS if meal.get(field)}
+    }
+
+
+def _tokens(value):
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    return {normalize_token(v) for v in values if v}
+
+
+def build_params(index_type, n, nlist=None, hnsw_m=None, pq_m=None) -> dict:
+    """Build-time parameters for `index_type` over `n` vectors"""
+    if index_type in ("ivf", "ivfpq"):
+        nlist = nlist or MEAL_INDEX_NLIST or int(4 * np.sqrt(n))
+        # k-means wants ~39 training points per centroid
+        params = {"nlist": max(1, min(nlist, n // 39))}
+        if index_type == "ivfpq":
+            params["pqM"] = pq_m or MEAL_INDEX_PQ_M
+            params["pqBits"] = MEAL_INDEX_PQ_NBITS
+        return params
+    if index_type == "hnsw":
+        return {"M": hnsw_m or MEAL_INDEX_HNSW_M, "efConstruction": MEAL_INDEX_EF_CONSTRUCTION}
+    return {}
+
+
+def build_index(vectors, ids, index_type=MEAL_INDEX_TYPE, dim=EMBEDDING_DIM, params=None, seed=0):
+    """
+    Builds a searchable index of `index_type` holding (vectors, ids).
+    IVF variants are trained on a random sample of at most
+    MEAL_INDEX_TRAIN_SAMPLE vectors. Catalogs below MEAL_INDEX_MIN_ANN_SIZE
+    get a flat index, which is exact and already fast at that size.
+
+    Returns (index, effective type, build params).
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"unknown meal index type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, dim)
+    ids = np.asarray(ids, dtype=np.int64)
+    if index_type != "flat" and len(vectors) < MEAL_INDEX_MIN_ANN_SIZE:
+        index_type = "flat"
+    params = params or build_params(index_type, len(vectors))
+
+    if index_type == "flat":
+        index = faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+    elif index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dim, params["M"])
+        hnsw.hnsw.efConstruction = params["efConstruction"]
+        index = faiss.IndexIDMap2(hnsw)
+    else:
+        # IVF stores ids natively; IndexIDMap's remove_ids assumes a flat sub-index
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf":
+            index = faiss.IndexIVFFlat(quantizer, dim, params["nlist"])
+        else:
+            if dim % params["pqM"]:
+                raise ValueError(f"MEAL_INDEX_PQ_M={params['pqM']} must divide the embedding dim {dim}")
+            index = faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["pqM"], params["pqBits"])
+
+        sample = vectors
+        if len(vectors) > MEAL_INDEX_TRAIN_SAMPLE:
+            rows = np.random.default_rng(seed).choice(len(vectors), MEAL_INDEX_TRAIN_SAMPLE, replace=False)
+            sample = vectors[np.sort(rows)]
+        index.train(sample)
+
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    set_search_params(index, index_type)
+    return index, index_type, params
+
+
+def set_search_params(index, index_type, nprobe=None, ef_search=None):
+    """Query-time knobs; read from env at load so they can change without a rebuild"""
+    if index_type in ("ivf", "ivfpq"):
+        faiss.extract_index_ivf(index).nprobe = nprobe or MEAL_INDEX_NPROBE
+    elif index_type == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efSearch = ef_search or MEAL_INDEX_EF_SEARCH
+
+
+class MealVectorIndex:
+    """
+    FAISS index of meal embeddings addressed by meal id (Meal.id).
+
+    FAISS only stores int64 ids, so meal ids are mapped to sequential
+    internal ids. Snapshots are written to a fresh directory and published
+    by atomically replacing the CURRENT pointer; startup loads the current
+    snapshot memory-mapped, and the first write makes a private in-memory
+    copy. Writes since the snapshot are journaled: if another process
+    published in the meantime (worker or rebuild), save loads its snapshot
+    and replays the journal instead of overwriting it.
+
+    The search index may be approximate (see INDEX_TYPES); exact vectors
+    are kept separately in vectors.npy so lossy (PQ) indexes can be
+    rebuilt and unchanged meals reuse their embedding. HNSW cannot remove
+    vectors, so replaced or deleted meals are left as tombstones that
+    search skips until the next rebuild.
+
+    Meal attributes (allergens, mealType, cuisine, costLevel) are kept as
+    one bitset over faiss ids per value, so a filter resolves to an
+    allowed-id bitmap that the ANN search is restricted to.
+    """
+
+    def __init__(self, path=MEAL_INDEX_PATH, dim=EMBEDDING_DIM):
+        self.path = path
+        self.dim = dim
+        self.index, self.index_type, self.build_params = build_index([], [], "flat", dim)
+
+        self._fids = {}          # meal id -> faiss id
+        self._meal_ids = {}      # faiss id -> meal id
+        self._hashes = {}        # meal id -> content hash of the embedded text
+        self._next_fid = 0
+        self._vectors = {}       # faiss id -> exact vector added since the snapshot
+        self._base = None        # exact vectors of the loaded snapshot (memory-mapped)
+        self._base_rows = {}     # faiss id -> row in _base
+        self._tombstones = 0
+        self._attrs = {}         # meal id -> meal_attributes()
+        self._bits = {}          # (field, value) -> bool array over faiss ids
+        self._live = np.zeros(0, dtype=bool)
+        self._lock = threading.RLock()
+        self._journal = {}       # meal id -> (vector, hash, attributes), None if deleted, since snapshot_version
+        self._mmapped = False
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self.snapshot_version = None
+
+        self.filtered_searches = 0
+        self.exact_scans = 0
+        self.expansions = 0
+
+    def __len__(self):
+        return len(self._fids)
+
+    def __contains__(self, meal_id):
+        return meal_id in self._fids
+
+    # 🔹 Updates
+
+    def _ensure_writable(self):
+        if self._mmapped:
+            index_file = self._snapshot_file("index.faiss")
+            if not os.path.exists(index_file):
+                # Another worker pruned our snapshot; take over the current one
+                # whole, so ids, vectors and attributes stay consistent
+                logger.info(f"meal index snapshot {self.snapshot_version} pruned, reloading CURRENT")
+                if not self.load(mmap=False):
+                    raise FileNotFoundError(index_file)
+                return
+            self.index = faiss.read_index(index_file)
+            set_search_params(self.index, self.index_type)
+            self._mmapped = False
+
+    def _raw_vector(self, fid):
+        vector = self._vectors.get(fid)
+        if vector is None and fid in self._base_rows:
+            vector = np.array(self._base[self._base_rows[fid]], dtype=np.float32)
+        return vector
+
+    def upsert_many(self, meal_ids, vectors, hashes=None, attributes=None):
+        """
+        Add or replace vectors for the given meal ids. `attributes` are
+        meal_attributes() per meal; when omitted a meal keeps its previous ones.
+        """
+        if not len(meal_ids):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(meal_ids), self.dim)
+
+        # A meal listed twice keeps its last entry; adding both would leave
+        # the first vector searchable under a stale id
+        last = {meal_id: i for i, meal_id in enumerate(meal_ids)}
+        if len(last) < len(meal_ids):
+            keep = sorted(last.values())
+            meal_ids = [meal_ids[i] for i in keep]
+            vectors = vectors[keep]
+            hashes = None if hashes is None else [hashes[i] for i in keep]
+            attributes = None if attributes is None else [attributes[i] for i in keep]
+
+        with self._lock:
+            self._ensure_writable()
+            self._apply_upserts(meal_ids, vectors, hashes, attributes)
+            self._maybe_save()
+
+    def _apply_upserts(self, meal_ids, vectors, hashes, attributes):
+        """upsert_many on a writable index; caller holds the lock"""
+        stale = [self._fids[m] for m in meal_ids if m in self._fids]
+        if stale:
+            self._remove_fids(stale)
+
+        fids = []
+        for meal_id in meal_ids:
+            fid = self._fids.get(meal_id)
+            if fid is None or self.index_type == "hnsw":
+                fid = self._next_fid
+                self._next_fid += 1
+                self._fids[meal_id] = fid
+            self._meal_ids[fid] = meal_id
+            fids.append(fid)
+
+        self.index.add_with_ids(vectors, np.asarray(fids, dtype=np.int64))
+        self._vectors.update(zip(fids, vectors))
+        if hashes is not None:
+            self._hashes.update(zip(meal_ids, hashes))
+        if attributes is not None:
+            self._attrs.update(zip(meal_ids, attributes))
+        for meal_id, fid, vector in zip(meal_ids, fids, vectors):
+            self._set_bits(fid, self._attrs.get(meal_id, {}))
+            self._journal[meal_id] = (vector, self._hashes.get(meal_id), self._attrs.get(meal_id))
+        self._dirty = True
+
+    def _remove_fids(self, fids):
+        if self.index_type == "hnsw":
+            self._tombstones += len(fids)
+        else:
+            self.index.remove_ids(np.asarray(fids, dtype=np.int64))
+        for fid in fids:
+            self._clear_bits(fid)
+            self._meal_ids.pop(fid, None)
+            self._vectors.pop(fid, None)
+            self._base_rows.pop(fid, None)
+
+    def upsert(self, meal_id, vector, text_hash=None, attributes=None):
+        self.upsert_many(
+            [meal_id], [vector],
+            None if text_hash is None else [text_hash],
+            None if attributes is None else [attributes]
+        )
+
+    def delete(self, meal_id) -> bool:
+        with self._lock:
+            # Before the lookup: reloading a pruned snapshot replaces the id map
+            self._ensure_writable()
+            if not self._apply_delete(meal_id):
+                return False
+            self._maybe_save()
+            return True
+
+    def _apply_delete(self, meal_id) -> bool:
+        """delete on a writable index; caller holds the lock"""
+        fid = self._fids.pop(meal_id, None)
+        if fid is None:
+            return False
+        self._remove_fids([fid])
+        self._hashes.pop(meal_id, None)
+        self._attrs.pop(meal_id, None)
+        self._journal[meal_id] = None
+        self._dirty = True
+        return True
+
+    # 🔹 Attribute bitsets
+
+    def _bit_keys(self, attrs):
+        keys = [("allergens", a) for a in attrs.get("allergens", [])]
+        keys += [(field, attrs[field]) for field in FILTER_FIELDS if field in attrs]
+        return keys
+
+    def _grow_bits(self, size):
+        if size <= len(self._live):
+            return
+        capacity = max(size, 2 * len(self._live), 1024)
+        for key, bits in self._bits.items():
+            self._bits[key] = np.concatenate([bits, np.zeros(capacity - len(bits), dtype=bool)])
+        self._live = np.concatenate([self._live, np.zeros(capacity - len(self._live), dtype=bool)])
+
+    def _set_bits(self, fid, attrs):
+        self._grow_bits(fid + 1)
+        self._live[fid] = True
+        for key in self._bit_keys(attrs):
+            bits = self._bits.get(key)
+            if bits is None:
+                bits = self._bits[key] = np.zeros(len(self._live), dtype=bool)
+            bits[fid] = True
+
+    def _clear_bits(self, fid):
+        if fid >= len(self._live):
+            return
+        self._live[fid] = False
+        meal_id = self._meal_ids.get(fid)
+        for key in self._bit_keys(self._attrs.get(meal_id, {})):
+            if key in self._bits:
+                self._bits[key][fid] = False
+
+    def allowed_mask(self, filters):
+        """
+        Bool array over faiss ids of live meals matching `filters`:
+        {"excludeAllergens": [...], "mealType": ..., "cuisine": ..., "costLevel": ...}.
+        Include fields accept a value or a list (any of).
+        """
+        n = self._next_fid
+        self._grow_bits(n)
+        mask = self._live[:n].copy()
+
+        for field in FILTER_FIELDS:
+            values = _tokens(filters.get(field))
+            if values:
+                include = np.zeros(n, dtype=bool)
+                for value in values:
+                    bits = self._bits.get((field, value))
+                    if bits is not None:
+                        include |= bits[:n]
+                mask &= include
+
+        for allergen in _tokens(filters.get("excludeAllergens")):
+            bits = self._bits.get(("allergens", allergen))
+            if bits is not None:
+                mask &= ~bits[:n]
+        return mask
+
+    # 🔹 Reads
+
+    def get_vector(self, meal_id, text_hash=None):
+        """Stored embedding, or None if absent or embedded from different text"""
+        with self._lock:
+            fid = self._fids.get(meal_id)
+            if fid is None:
+                return None
+            if text_hash is not None and self._hashes.get(meal_id) != text_hash:
+                return None
+            return self._raw_vector(fid)
+
+    def is_current(self, meal_id, text_hash, attributes) -> bool:
+        """True if the meal is indexed from the same text with the same attributes"""
+        with self._lock:
+            return (
+                meal_id in self._fids
+                and self._hashes.get(meal_id) == text_hash
+                and self._attrs.get(meal_id) == attributes
+            )
+
+    def export(self):
+        """(meal ids, faiss ids, exact vectors) of every live meal"""
+        with self._lock:
+            fids = sorted(self._meal_ids)
+            vectors = (
+                np.vstack([self._raw_vector(f) for f in fids]).astype(np.float32)
+                if fids else np.zeros((0, self.dim), dtype=np.float32)
+            )
+            return [self._meal_ids[f] for f in fids], fids, vectors
+
+    def search(self, query_vector, k=5, filters=None):
+        """[(meal_id, distance)] nearest first, restricted to `filters` (see allowed_mask)"""
+        with self._lock:
+            if self.index.ntotal == 0:
+                return []
+            query = np.asarray(query_vector, dtype=np.float32).reshape(1, self.dim)
+            if filters:
+                return self._filtered_search(query, k, filters)
+            distances, fids = self.index.search(query, min(k + self._tombstones, self.index.ntotal))
+            return [
+                (self._meal_ids[int(f)], float(d))
+                for d, f in zip(distances[0], fids[0])
+                if f != -1 and int(f) in self._meal_ids
+            ][:k]
+
+    def _filtered_search(self, query, k, filters):
+        self.filtered_searches += 1
+        allowed = np.flatnonzero(self.allowed_mask(filters))
+        if not len(allowed):
+            return []
+
+        # 🔹 Few candidates: exact distances over their stored vectors
+        if len(allowed) <= MEAL_INDEX_FILTER_EXACT_MAX:
+            self.exact_scans += 1
+            vectors = np.vstack([self._raw_vector(int(f)) for f in allowed])
+            distances = ((vectors - query) ** 2).sum(axis=1)
+            order = np.argsort(distances)[:k]
+            return [(self._meal_ids[int(allowed[i])], float(distances[i])) for i in order]
+
+        # 🔹 ANN restricted to the allowed ids. Search effort starts in
+        # proportion to how selective the filter is and widens while the
+        # result list is short.
+        mask = np.zeros(self._next_fid, dtype=bool)
+        mask[allowed] = True
+        packed = np.packbits(mask, bitorder="little")
+        selector = faiss.IDSelectorBitmap(len(packed), faiss.swig_ptr(packed))
+        wanted = min(k, len(allowed))
+        selectivity = len(allowed) / max(len(self._fids), 1)
+
+        if self.index_type in ("ivf", "ivfpq"):
+            limit = faiss.extract_index_ivf(self.index).nlist
+            knob = min(limit, int(np.ceil(MEAL_INDEX_NPROBE / selectivity)))
+            make_params = lambda knob: faiss.SearchParametersIVF(sel=selector, nprobe=knob)
+        elif self.index_type == "hnsw":
+            limit = MEAL_INDEX_FILTER_MAX_EF
+            knob = min(limit, max(MEAL_INDEX_EF_SEARCH, int(np.ceil(wanted / selectivity))))
+            make_params = lambda knob: faiss.SearchParametersHNSW(sel=selector, efSearch=knob)
+        else:
+            knob = limit = 0  # flat: the selector scan is already exact
+            make_params = lambda knob: faiss.SearchParameters(sel=selector)
+
+        for _ in range(MEAL_INDEX_FILTER_MAX_EXPANSIONS + 1):
+            distances, fids = self.index.search(query, wanted, params=make_params(knob))
+            results = [
+                (self._meal_ids[int(f)], float(d))
+                for d, f in zip(distances[0], fids[0])
+                if f != -1 and int(f) in self._meal_ids
+            ]
+            if len(results) >= wanted or knob >= limit:
+                break
+            knob = min(limit, knob * 4)
+            self.expansions += 1
+        return results
+
+    def rebuild(self, index_type=None, params=None):
+        """Re-create the search index from the exact vectors and snapshot it"""
+        with self._lock:
+            while True:
+                # Build from the latest published contents; if a worker
+                # publishes during the build, build again on top of it
+                self._catch_up()
+                built_on = self.snapshot_version
+                _, fids, vectors = self.export()
+                self.index, self.index_type, self.build_params = build_index(
+                    vectors, fids, index_type or MEAL_INDEX_TYPE, self.dim, params
+                )
+                self._mmapped = False
+                self._tombstones = 0
+                self._dirty = True
+                with self._publish_lock():
+                    if self._current_version() in (None, built_on):
+                        self._write_snapshot()
+                        return self.stats()
+
+    # 🔹 Snapshots
+
+    def _snapshot_file(self, name, version=None):
+        return os.path.join(self.path, version or self.snapshot_version, name)
+
+    def _maybe_save(self):
+        if self._dirty and time.monotonic() - self._last_save >= MEAL_INDEX_SAVE_INTERVAL:
+            self.save()
+
+    def _current_version(self):
+        pointer = os.path.join(self.path, CURRENT_FILE)
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            return f.read().strip()
+
+    def _catch_up(self):
+        """
+        If another process published since our snapshot (a worker's save or
+        a build_meal_index.py rebuild), load its snapshot and replay our
+        unsaved changes on top, so saving does not undo its work. Caller
+        holds the lock.
+        """
+        current = self._current_version()
+        if current is None or current == self.snapshot_version:
+            return
+        journal = self._journal
+        logger.info(f"meal index moved from {self.snapshot_version} to {current}; "
+                    f"replaying {len(journal)} local changes")
+        self.load(mmap=False)
+
+        upserts = [(meal_id, entry) for meal_id, entry in journal.items() if entry is not None]
+        if upserts:
+            self._apply_upserts(
+                [meal_id for meal_id, _ in upserts],
+                np.vstack([vector for _, (vector, _, _) in upserts]),
+                [text_hash for _, (_, text_hash, _) in upserts],
+                [attrs or {} for _, (_, _, attrs) in upserts]
+            )
+        for meal_id, entry in journal.items():
+            if entry is None:
+                self._apply_delete(meal_id)
+
+    @contextmanager
+    def _publish_lock(self):
+        """Serialises catch-up + publish across the processes sharing self.path"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, LOCK_FILE), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def save(self):
+        """
+        Write a new snapshot directory, then atomically repoint CURRENT.
+        Changes published by others since our snapshot are merged in first.
+        """
+        with self._lock, self._publish_lock():
+            self._catch_up()
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """Caller holds the lock and the publish lock"""
+        version = f"snap-{time.time_ns()}"
+        snap_dir = os.path.join(self.path, version)
+        os.makedirs(snap_dir, exist_ok=True)
+
+        _, fids, vectors = self.export()
+        fids = np.asarray(fids, dtype=np.int64)
+
+        faiss.write_index(self.index, os.path.join(snap_dir, "index.faiss"))
+        np.save(os.path.join(snap_dir, "vectors.npy"), vectors)
+        np.save(os.path.join(snap_dir, "ids.npy"), fids)
+        with open(os.path.join(snap_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": self.dim,
+                "indexType": self.index_type,
+                "buildParams": self.build_params,
+                "tombstones": self._tombstones,
+                "nextFid": self._next_fid,
+                "mealIds": {str(fid): self._meal_ids[int(fid)] for fid in fids},
+                "hashes": self._hashes,
+                "attributes": self._attrs
+            }, f)
+
+        # ✅ Publish: readers see either the old or the new snapshot
+        pointer = os.path.join(self.path, CURRENT_FILE)
+        with open(pointer + ".tmp", "w") as f:
+            f.write(version)
+        os.replace(pointer + ".tmp", pointer)
+
+        self.snapshot_version = version
+        self._journal = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._prune_snapshots()
+
+    def _prune_snapshots(self):
+        snapshots = sorted(d for d in os.listdir(self.path) if d.startswith("snap-"))
+        for old in snapshots[:-MEAL_INDEX_KEEP_SNAPSHOTS]:
+            shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+
+    def load(self, mmap=True) -> bool:
+        """Load the CURRENT snapshot (memory-mapped by default); False if none"""
+        pointer = os.path.join(self.path, CURRENT_FILE)
+        if not os.path.exists(pointer):
+            return False
+
+        with open(pointer) as f:
+            version = f.read().strip()
+
+        with open(os.path.join(self.path, version, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        snap_dir = os.path.join(self.path, version)
+        flags = faiss.IO_FLAG_MMAP if mmap else 0
+        index = faiss.read_index(os.path.join(snap_dir, "index.faiss"), flags)
+        index_type = meta.get("indexType", "flat")
+        set_search_params(index, index_type)
+        base = np.load(os.path.join(snap_dir, "vectors.npy"), mmap_mode="r" if mmap else None)
+        base_ids = np.load(os.path.join(snap_dir, "ids.npy"))
+
+        if index_type != MEAL_INDEX_TYPE:
+            logger.info(
+                f"meal index snapshot is {index_type}, MEAL_INDEX_TYPE={MEAL_INDEX_TYPE}; "
+                "run ml/build_meal_index.py --write to rebuild"
+            )
+
+        with self._lock:
+            self.index = index
+            self.index_type = index_type
+            self.build_params = meta.get("buildParams", {})
+            self._tombstones = meta.get("tombstones", 0)
+            self._base = base
+            self._base_rows = {int(fid): row for row, fid in enumerate(base_ids)}
+            self._vectors = {}
+            self.dim = meta["dim"]
+            self._meal_ids = {int(fid): meal_id for fid, meal_id in meta["mealIds"].items()}
+            self._fids = {meal_id: fid for fid, meal_id in self._meal_ids.items()}
+            self._hashes = dict(meta.get("hashes", {}))
+            self._attrs = dict(meta.get("attributes", {}))
+            self._next_fid = meta["nextFid"]
+            self._bits = {}
+            self._live = np.zeros(0, dtype=bool)
+            for fid, meal_id in self._meal_ids.items():
+                self._set_bits(fid, self._attrs.get(meal_id, {}))
+            self._journal = {}
+            self._mmapped = mmap
+            self._dirty = False
+            self.snapshot_version = version
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "meals": len(self._fids),
+            "indexType": self.index_type,
+            "buildParams": self.build_params,
+            "tombstones": self._tombstones,
+            "filterValues": len(self._bits),
+            "filteredSearches": self.filtered_searches,
+            "exactScans": self.exact_scans,
+            "expansions": self.expansions,
+            "snapshot": self.snapshot_version,
+            "mmapped": self._mmapped,
+            "dirty": self._dirty
+        }
+
+
+_meal_index = None
+_meal_index_lock = threading.Lock()
+
+
+def get_meal_index() -> MealVectorIndex:
+    """Process-wide meal index, loaded from the latest snapshot on first use"""
+    global _meal_index
+    with _meal_index_lock:
+        if _meal_index is None:
+            index = MealVectorIndex()
+            try:
+                index.load()
+            except Exception as e:
+                logger.warning(f"meal index snapshot not loaded, starting empty: {e}")
+            _meal_index = index
+            metrics.register("meal_index", index.stats)
+    return _meal_index
+
+
+@atexit.register
+def _flush_meal_index():
+    if _meal_index is not None and _meal_index._dirty:
+        try:
+            _meal_index.save()
+        except Exception as e:
+            logger.warning(f"meal index snapshot failed: {e}")
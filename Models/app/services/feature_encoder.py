@@ -0,0 +1,203 @@
+import json
+import numpy as np
+
+ENCODER_VERSION = 1
+
+# ✅ Must match training-time vocab
+DISEASES = [
+    "Diabetes",
+    "Hypertension",
+    "Heart Disease",
+    "Kidney Disease",
+    "Weight Gain"
+]
+
+GOALS = [
+    "Fat Loss",
+    "Muscle Gain",
+    "Muscle Retention",
+    "Weight Loss",
+    "Weight Gain"
+]
+
+ALLERGIES = [
+    "peanuts",
+    "gluten",
+    "dairy",
+    "soy",
+    "shellfish"
+]
+
+# Column name -> profile key
+NUMERIC_FEATURES = {
+    "Ages": "age",
+    "Height": "height",
+    "Weight": "weight"
+}
+
+# Column prefix -> profile key (one-hot, named like pd.get_dummies output)
+CATEGORICAL_FEATURES = {
+    "Activity Level": "activityLevel",
+    "Dietary Preference": "dietaryPreference"
+}
+
+# Column prefix -> (profile key, vocab)
+MULTI_HOT_FEATURES = {
+    "disease": ("diseases", DISEASES),
+    "goal": ("goals", GOALS),
+    "allergy": ("allergies", ALLERGIES)
+}
+
+
+def normalize_token(value) -> str:
+    """Case/whitespace-insensitive form used for all category lookups"""
+    return str(value).strip().casefold()
+
+
+class ProfileEncoder:
+    """
+    Frozen profile -> feature matrix encoder.
+
+    Built once at training time and saved next to the model, so training and
+    serving always agree on column order, vocabularies and dtype. Encoding is
+    plain dict lookups into a preallocated ndarray (no DataFrame work).
+    """
+
+    def __init__(self, columns, numeric, categorical, multi_hot, dtype="float32"):
+        self.columns = list(columns)
+        self.numeric = dict(numeric)
+        self.categorical = {k: dict(v) for k, v in categorical.items()}
+        self.multi_hot = {k: dict(v) for k, v in multi_hot.items()}
+        self.dtype = np.dtype(dtype)
+
+        index = {name: i for i, name in enumerate(self.columns)}
+
+        # 🔹 Precomputed column positions
+        self._numeric = [
+            (index[col], key)
+            for col, key in self.numeric.items()
+            if col in index
+        ]
+        self._categorical = [
+            (spec["key"], {
+                normalize_token(value): index[f"{col}_{value}"]
+                for value in spec["vocab"]
+                if f"{col}_{value}" in index
+            })
+            for col, spec in self.categorical.items()
+        ]
+        self._multi_hot = [
+            (spec["key"], {
+                normalize_token(value): index[f"{prefix}_{value}"]
+                for value in spec["vocab"]
+                if f"{prefix}_{value}" in index
+            })
+            for prefix, spec in self.multi_hot.items()
+        ]
+
+    @property
+    def n_features(self) -> int:
+        return len(self.columns)
+
+    def encode(self, profiles: list) -> np.ndarray:
+        """
+        Encodes N profiles into an (N, n_features) matrix.
+        Category matching ignores case; unseen values leave their one-hot row empty.
+        """
+        X = np.zeros((len(profiles), len(self.columns)), dtype=self.dtype)
+
+        for row, profile in enumerate(profiles):
+            for j, key in self._numeric:
+                X[row, j] = profile[key]
+
+            for key, positions in self._categorical:
+                j = positions.get(normalize_token(profile[key]))
+                if j is not None:
+                    X[row, j] = 1
+
+            for key, positions in self._multi_hot:
+                for value in profile.get(key) or []:
+                    j = positions.get(normalize_token(value))
+                    if j is not None:
+                        X[row, j] = 1
+
+        return X
+
+    def encode_one(self, profile: dict) -> np.ndarray:
+        return self.encode([profile])
+
+    @classmethod
+    def fit(cls, profiles: list, multi_hot_groups=("disease",), dtype="float32"):
+        """
+        Builds the encoder from training profiles. Category vocabularies are
+        the sorted observed values, matching pd.get_dummies column order.
+        """
+        columns = list(NUMERIC_FEATURES)
+
+        categorical = {}
+        for col, key in CATEGORICAL_FEATURES.items():
+            vocab = sorted({str(p[key]) for p in profiles if p.get(key) is not None})
+            categorical[col] = {"key": key, "vocab": vocab}
+            columns += [f"{col}_{value}" for value in vocab]
+
+        multi_hot = {}
+        for prefix in multi_hot_groups:
+            key, vocab = MULTI_HOT_FEATURES[prefix]
+            multi_hot[prefix] = {"key": key, "vocab": list(vocab)}
+            columns += [f"{prefix}_{value}" for value in vocab]
+
+        return cls(columns, NUMERIC_FEATURES, categorical, multi_hot, dtype)
+
+    @classmethod
+    def from_feature_names(cls, names, dtype="float32"):
+        """
+        Reconstructs an encoder from a fitted model's feature_names_in_
+        (used for model pickles trained before the encoder artifact existed).
+        """
+        names = list(names)
+
+        categorical = {
+            col: {
+                "key": key,
+                "vocab": [n[len(col) + 1:] for n in names if n.startswith(f"{col}_")]
+            }
+            for col, key in CATEGORICAL_FEATURES.items()
+        }
+        multi_hot = {
+            prefix: {"key": key, "vocab": list(vocab)}
+            for prefix, (key, vocab) in MULTI_HOT_FEATURES.items()
+        }
+
+        return cls(names, NUMERIC_FEATURES, categorical, multi_hot, dtype)
+
+    def to_dict(self) -> dict:
+        return {
+            "version": ENCODER_VERSION,
+            "dtype": self.dtype.name,
+            "columns": self.columns,
+            "numeric": self.numeric,
+            "categorical": self.categorical,
+            "multiHot": self.multi_hot
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        if data.get("version") != ENCODER_VERSION:
+            raise ValueError(f"Unsupported encoder version: {data.get('version')}")
+
+        return cls(
+            data["columns"],
+            data["numeric"],
+            data["categorical"],
+            data["multiHot"],
+            data.get("dtype", "float32")
+        )
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -1,7 +1,6 @@
-import requests
-import os
 import logging
 from app.constants.prompts import CHAT_SYSTEM_PROMPT
+from app.services.llm_client import groq_chat
 
 logger = logging.getLogger(__name__)
 
@@ -9,29 +8,19 @@ def chat_ai(payload):
     if "message" not in payload:
         raise ValueError("Missing 'message' in request body")
 
-    headers = {
-        "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}",
-        "Content-Type": "application/json"
-    }
-
     body = {
         "model": "llama-3.1-8b-instant",
         "messages": [
             {"role": "system", "content": CHAT_SYSTEM_PROMPT},
             {"role": "user", "content": payload["message"]}
-        ]
+        ],
+        # Low enough for the response cache (LLM_CACHE_MAX_TEMPERATURE)
+        "temperature": 0.3
     }
 
-    res = requests.post(
-        os.getenv("GROQ_API_URL"),
-        headers=headers,
-        json=body,
-        timeout=30
-    )
-
     try:
-        data = res.json()
-    except Exception:
+        data = groq_chat(body, endpoint="chat")
+    except ValueError:
         logger.error("Groq returned non-JSON response")
         raise RuntimeError("Invalid Groq response")
 
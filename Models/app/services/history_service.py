@@ -1,19 +1,92 @@
 from app.db.mongo import history_collection
+from app.services.dashboard_stats import record_history_saved
 from datetime import datetime
+from bson import ObjectId
+import base64
+import json
+import os
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 50))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", 200))
+
+# Newest first; _id breaks ties between entries saved in the same millisecond
+HISTORY_SORT = [("createdAt", -1), ("_id", -1)]
+
+
+class InvalidCursor(ValueError):
+    pass
+
 
 def save_history(username: str, action: str, data: dict):
+    created_at = datetime.utcnow()
     history_collection.insert_one({
         "username": username,     # ✅ username instead of userId
         "action": action,
         "data": data,
-        "createdAt": datetime.utcnow()
+        "createdAt": created_at
     })
+    record_history_saved(history_collection, action, created_at)
+
+
+def encode_cursor(doc) -> str:
+    """Opaque cursor pointing just after `doc` in HISTORY_SORT order"""
+    created = doc.get("createdAt")
+    payload = {"id": str(doc["_id"])}
+    if isinstance(created, datetime):
+        payload.update(t=created.isoformat(), d=1)
+    else:
+        payload["t"] = created
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
 
-def fetch_history(username: str):
-    return list(
-        history_collection.find(
-            {"username": username},
-            {"_id": 0}
-        ).sort("createdAt", -1)  # Sort by newest first
+def decode_cursor(cursor):
+    """(createdAt, _id) from encode_cursor; InvalidCursor if tampered or malformed"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(payload["id"], (str, int)) or not isinstance(payload["t"], (str, int, float)):
+            raise TypeError("cursor fields have the wrong type")
+        created = datetime.fromisoformat(payload["t"]) if payload.get("d") else payload["t"]
+        last_id = ObjectId(payload["id"]) if ObjectId.is_valid(payload["id"]) else payload["id"]
+        return created, last_id
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        # AttributeError: valid JSON that is not an object (list, number, ...)
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def fetch_history(username: str, action=None, cursor=None, limit=None, summary=False):
+    """
+    One page of a user's history, newest first, using keyset pagination
+    on (createdAt, _id). `summary` leaves out the `data` payload.
+    Returns (entries, pagination) where pagination carries the cursor of
+    the next page (None on the last one).
+    """
+    limit = max(1, min(int(limit or HISTORY_PAGE_SIZE), HISTORY_MAX_PAGE_SIZE))
+
+    query = {"username": username}
+    if action:
+        query["action"] = action
+    if cursor:
+        created, last_id = decode_cursor(cursor)
+        # Range on createdAt keeps the index bounds tight; the $or only settles ties
+        query["createdAt"] = {"$lte": created}
+        query["$or"] = [{"createdAt": {"$lt": created}}, {"_id": {"$lt": last_id}}]
+
+    projection = {"data": 0} if summary else None
+    entries = list(
+        history_collection.find(query, projection)
+        .sort(HISTORY_SORT)
+        .limit(limit + 1)  # one extra tells us whether another page exists
     )
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    next_cursor = encode_cursor(entries[-1]) if has_more else None
+    for entry in entries:
+        entry.pop("_id", None)
+
+    return entries, {
+        "limit": limit,
+        "nextCursor": next_cursor,
+        "hasMore": has_more
+    }
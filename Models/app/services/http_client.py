@@ -0,0 +1,153 @@
+import os
+import random
+import threading
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Pool sizing (per client; one pool per host)
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 4))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 16))
+
+
+class PooledHttpClient:
+    """
+    Keep-alive requests.Session with a sized connection pool, per-endpoint
+    (connect, read) timeouts, jittered exponential backoff on 429/5xx and
+    connection errors, and latency / connection-reuse counters. Read
+    timeouts are not retried: the read budget is already spent, and a
+    retry would multiply the worst-case latency.
+
+    `endpoint` is a logical name ("chat", "user_context", ...) used to pick
+    the timeout and to bucket latency stats.
+    """
+
+    def __init__(self, name, timeouts=None, default_timeout=(5, 30),
+                 retries=2, backoff=0.25, max_backoff=4.0,
+                 pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE):
+        self.name = name
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0,
+            pool_block=False
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._adapter = adapter
+
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.retried = 0
+        self.failures = 0
+
+    def timeout_for(self, endpoint):
+        return self.timeouts.get(endpoint, self.default_timeout)
+
+    def _sleep_before_retry(self, attempt, response=None):
+        # Full jitter; honour a short Retry-After from 429/503
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        if response is not None:
+            try:
+                delay = max(delay, min(float(response.headers.get("Retry-After", 0)), self.max_backoff))
+            except ValueError:
+                pass
+        time.sleep(delay)
+
+    def _record(self, endpoint, seconds, ok):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                "requests": 0, "errors": 0, "totalSeconds": 0.0, "maxSeconds": 0.0
+            })
+            stats["requests"] += 1
+            stats["totalSeconds"] += seconds
+            stats["maxSeconds"] = max(stats["maxSeconds"], seconds)
+            if not ok:
+                stats["errors"] += 1
+
+    def request(self, method, url, endpoint="default", timeout=None, retries=None, **kwargs):
+        """
+        Sends a request, retrying 429/5xx responses and connection errors
+        (including connect timeouts).
+        Returns the last response (any status); raises the last exception
+        if no response was ever received.
+        """
+        timeout = timeout if timeout is not None else self.timeout_for(endpoint)
+        retries = self.retries if retries is None else retries
+
+        for attempt in range(retries + 1):
+            start = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(endpoint, time.monotonic() - start, ok=False)
+                # ConnectTimeout is a ConnectionError; ReadTimeout is not retried
+                if attempt >= retries or not isinstance(e, requests.ConnectionError):
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                with self._lock:
+                    self.retried += 1
+                self._sleep_before_retry(attempt)
+                continue
+
+            retryable = response.status_code in RETRY_STATUSES
+            self._record(endpoint, time.monotonic() - start, ok=not retryable)
+            if not retryable or attempt >= retries:
+                return response
+
+            with self._lock:
+                self.retried += 1
+            logger.info(f"{self.name} {endpoint}: HTTP {response.status_code}, retrying")
+            response.close()
+            self._sleep_before_retry(attempt, response)
+
+    def get(self, url, endpoint="default", **kwargs):
+        return self.request("GET", url, endpoint=endpoint, **kwargs)
+
+    def post(self, url, endpoint="default", **kwargs):
+        return self.request("POST", url, endpoint=endpoint, **kwargs)
+
+    def _connection_counts(self):
+        """(connections opened, requests sent) across this client's urllib3 pools"""
+        opened = sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+        return opened, sent
+
+    def stats(self) -> dict:
+        opened, sent = self._connection_counts()
+        with self._lock:
+            endpoints = {
+                name: {
+                    "requests": s["requests"],
+                    "errors": s["errors"],
+                    "avgMs": round(s["totalSeconds"] / s["requests"] * 1000, 1) if s["requests"] else 0.0,
+                    "maxMs": round(s["maxSeconds"] * 1000, 1)
+                }
+                for name, s in self._endpoints.items()
+            }
+            return {
+                "endpoints": endpoints,
+                "retries": self.retried,
+                "failures": self.failures,
+                "connectionsOpened": opened,
+                "connectionsReused": max(sent - opened, 0),
+                "reuseRate": round((sent - opened) / sent, 4) if sent else 0.0
+            }
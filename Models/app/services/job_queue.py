@@ -0,0 +1,276 @@
+import os
+import json
+import uuid
+import socket
+import hashlib
+import logging
+import ipaddress
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.db.mongo import jobs_collection
+from app.db.indexes import ensure_indexes
+from app.services.http_client import PooledHttpClient
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+# Finished jobs (and their results) are dropped by Mongo after this long
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 86400))
+# A queued/running job not touched for this long is assumed lost (worker restart)
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", 600))
+# A finished job is returned to identical submissions for this long; after
+# that they run again (generations are not deterministic)
+JOB_DEDUPE_FINISHED_WINDOW = int(os.getenv("JOB_DEDUPE_FINISHED_WINDOW", 60))
+# Comma-separated URL prefixes webhooks may target (empty = webhooks disabled)
+JOB_WEBHOOK_ALLOWED_PREFIXES = [
+    p.strip() for p in os.getenv("JOB_WEBHOOK_ALLOWED_PREFIXES", "").split(",") if p.strip()
+]
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# task name -> fn(payload) returning a JSON-serialisable result
+_tasks = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_counters = {"submitted": 0, "deduplicated": 0, "succeeded": 0, "failed": 0, "webhookErrors": 0}
+_counter_lock = threading.Lock()
+
+webhook_client = PooledHttpClient("webhook", default_timeout=(3, 10), retries=2)
+
+
+def _count(name):
+    with _counter_lock:
+        _counters[name] += 1
+
+
+def register_task(name, fn):
+    """Make fn(payload) runnable as a background job named `name`"""
+    _tasks[name] = fn
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="ai-job")
+        return _executor
+
+
+def input_hash(task, payload) -> str:
+    """Stable hash of a task and its input (key order independent)"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{task}:{canonical}".encode()).hexdigest()
+
+
+def _public_host(host) -> bool:
+    """True if every address `host` resolves to is publicly routable"""
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        return False
+    for info in infos:
+        ip = ipaddress.ip_address(info[4][0].split("%")[0])
+        if (ip.is_loopback or ip.is_private or ip.is_link_local or ip.is_reserved
+                or ip.is_multicast or ip.is_unspecified):
+            return False
+    return bool(infos)
+
+
+def valid_webhook_url(url) -> bool:
+    """
+    Webhooks must match JOB_WEBHOOK_ALLOWED_PREFIXES (none configured =
+    webhooks refused) and resolve only to public addresses, so a client
+    cannot aim the worker at loopback, the internal network or cloud
+    metadata. Checked again right before sending.
+    """
+    if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+        return False
+    if not any(url.startswith(p) for p in JOB_WEBHOOK_ALLOWED_PREFIXES):
+        return False
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return False
+    return bool(host) and _public_host(host)
+
+
+def _upsert_job(digest, job_id, task, payload, webhook_url, now):
+    update = {"$setOnInsert": {
+        "_id": job_id,
+        "task": task,
+        "inputHash": digest,
+        "input": payload,
+        "status": "queued",
+        "createdAt": now,
+        "updatedAt": now,
+        "expiresAt": now + timedelta(seconds=JOB_RESULT_TTL)
+    }}
+    if webhook_url:
+        # Every caller sharing a job gets notified, not just the first
+        update["$addToSet"] = {"webhookUrls": webhook_url}
+    else:
+        update["$setOnInsert"]["webhookUrls"] = []
+    return jobs_collection.find_one_and_update(
+        {"inputHash": digest},
+        update,
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def _webhook_urls(job):
+    urls = list(job.get("webhookUrls") or [])
+    if job.get("webhookUrl") and job["webhookUrl"] not in urls:  # jobs stored before webhookUrls
+        urls.append(job["webhookUrl"])
+    return urls
+
+
+def submit_job(task, payload, webhook_url=None) -> dict:
+    """
+    Queues `task` with `payload` and returns its public view immediately.
+    An identical submission (same task + payload) joins the existing job
+    while it is queued or running, and gets its result if it finished
+    within JOB_DEDUPE_FINISHED_WINDOW; its webhook is added to the job's.
+    Failed, stale and older finished jobs are re-queued.
+    """
+    if task not in _tasks:
+        raise ValueError(f"Unknown job task: {task}")
+
+    # Dedupe relies on the unique inputHash index; startup may not have built it yet
+    ensure_indexes(jobs_collection.database, ["ai_jobs"])
+
+    now = datetime.utcnow()
+    job_id = uuid.uuid4().hex
+    digest = input_hash(task, payload)
+
+    try:
+        job = _upsert_job(digest, job_id, task, payload, webhook_url, now)
+    except DuplicateKeyError:
+        # Lost an insert race with an identical submission; take theirs
+        job = jobs_collection.find_one({"inputHash": digest})
+
+    start = job["_id"] == job_id
+    if not start:
+        # Retry failed jobs, jobs orphaned by a restarted worker, and
+        # finished jobs too old to hand out again
+        stale_before = now - timedelta(seconds=JOB_STALE_AFTER)
+        finished_before = now - timedelta(seconds=JOB_DEDUPE_FINISHED_WINDOW)
+        requeued = jobs_collection.find_one_and_update(
+            {"_id": job["_id"], "$or": [
+                {"status": "failed"},
+                {"status": "succeeded", "finishedAt": {"$lt": finished_before}},
+                {"status": {"$in": list(ACTIVE_STATUSES)}, "updatedAt": {"$lt": stale_before}}
+            ]},
+            {"$set": {
+                "status": "queued",
+                "result": None,
+                "error": None,
+                "startedAt": None,
+                "finishedAt": None,
+                # Earlier callers were already notified of the previous run
+                "webhookUrls": [webhook_url] if webhook_url else [],
+                "updatedAt": now,
+                "expiresAt": now + timedelta(seconds=JOB_RESULT_TTL)
+            }, "$unset": {"webhookUrl": ""}},
+            return_document=ReturnDocument.AFTER
+        )
+        if requeued:
+            job, start = requeued, True
+
+    if start:
+        _count("submitted")
+        _get_executor().submit(_run_job, job["_id"], task, payload)
+    else:
+        _count("deduplicated")
+        if webhook_url and job["status"] not in ACTIVE_STATUSES:
+            # Joined a job that already finished; its run will not call back
+            _get_executor().submit(_notify_webhook, job, [webhook_url])
+
+    view = job_view(job)
+    view["deduplicated"] = not start
+    return view
+
+
+def _run_job(job_id, task, payload):
+    jobs_collection.update_one(
+        {"_id": job_id},
+        {"$set": {"status": "running", "startedAt": datetime.utcnow(), "updatedAt": datetime.utcnow()}}
+    )
+
+    try:
+        result = _tasks[task](payload)
+        update = {"status": "succeeded", "result": result, "error": None}
+        _count("succeeded")
+    except Exception as e:
+        logger.exception(f"job {job_id} ({task}) failed")
+        update = {"status": "failed", "result": None, "error": str(e)}
+        _count("failed")
+
+    now = datetime.utcnow()
+    update.update({
+        "finishedAt": now,
+        "updatedAt": now,
+        "expiresAt": now + timedelta(seconds=JOB_RESULT_TTL)
+    })
+    job = jobs_collection.find_one_and_update(
+        {"_id": job_id},
+        {"$set": update},
+        return_document=ReturnDocument.AFTER
+    )
+
+    if job:
+        _notify_webhook(job, _webhook_urls(job))
+
+
+def _notify_webhook(job, urls):
+    for url in urls:
+        try:
+            # Re-validated: the host may resolve differently than at submit time
+            if not valid_webhook_url(url):
+                raise RuntimeError("webhook URL no longer allowed")
+            res = webhook_client.post(url, endpoint="job_webhook", json=job_view(job), allow_redirects=False)
+            if res.status_code >= 400:
+                raise RuntimeError(f"HTTP {res.status_code}")
+        except Exception as e:
+            _count("webhookErrors")
+            logger.warning(f"job {job['_id']} webhook failed: {e}")
+
+
+def _iso(value):
+    return value.isoformat() + "Z" if value else None
+
+
+def job_view(job) -> dict:
+    """Public representation of a job document"""
+    return {
+        "jobId": job["_id"],
+        "task": job["task"],
+        "status": job["status"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "createdAt": _iso(job.get("createdAt")),
+        "startedAt": _iso(job.get("startedAt")),
+        "finishedAt": _iso(job.get("finishedAt"))
+    }
+
+
+def get_job(job_id):
+    job = jobs_collection.find_one({"_id": job_id}, {"input": 0})
+    return job_view(job) if job else None
+
+
+def get_job_stats() -> dict:
+    with _counter_lock:
+        stats = dict(_counters)
+    stats["workers"] = JOB_WORKERS
+    return stats
+
+
+metrics.register("jobs", get_job_stats)
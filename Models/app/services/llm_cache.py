@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 512))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 86400))
+# Calls sampled hotter than this are not cached (Groq's default is 1.0)
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", 0.5))
+# Second tier in Mongo, shared across workers and restarts
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "true").lower() == "true"
+# After a Mongo error the persistent tier is skipped for this long, then retried
+LLM_CACHE_RETRY_SECONDS = float(os.getenv("LLM_CACHE_RETRY_SECONDS", 60))
+
+DEFAULT_TEMPERATURE = 1.0
+
+
+def cache_key(payload) -> str:
+    """sha256 over the fields that determine a completion"""
+    material = {
+        "model": payload.get("model"),
+        "messages": payload.get("messages"),
+        "temperature": payload.get("temperature", DEFAULT_TEMPERATURE),
+        "max_tokens": payload.get("max_tokens")
+    }
+    canonical = json.dumps(material, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def cacheable_response(data) -> bool:
+    """Only complete, non-empty completions are worth storing"""
+    try:
+        return bool(data["choices"][0]["message"]["content"]) and "error" not in data
+    except (KeyError, IndexError, TypeError):
+        return False
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of chat completion responses: an in-process LRU in
+    front of a Mongo collection with a TTL index. Entries remember how
+    long the original call took so hits can report latency saved.
+    """
+
+    def __init__(self, maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL,
+                 max_temperature=LLM_CACHE_MAX_TEMPERATURE, persist=LLM_CACHE_PERSIST):
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.persist = persist
+        self.memory = LRUCache(maxsize, ttl=ttl)
+
+        self._collection = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.latency_saved = 0.0
+
+    def should_cache(self, payload) -> bool:
+        if not LLM_CACHE_ENABLED or payload.get("stream"):
+            return False
+        return payload.get("temperature", DEFAULT_TEMPERATURE) <= self.max_temperature
+
+    def _get_collection(self):
+        """
+        llm_cache collection (TTL index on first use); None while Mongo is
+        unavailable, retried every LLM_CACHE_RETRY_SECONDS
+        """
+        if not self.persist:
+            return None
+        if self._collection is None:
+            if time.monotonic() < self._retry_at:
+                return None
+            try:
+                from app.db.mongo import db
+                from app.db.indexes import ensure_indexes
+                collection = db["llm_cache"]
+                ensure_indexes(db, ["llm_cache"])
+                self._collection = collection
+            except Exception as e:
+                logger.warning(f"LLM cache persistent tier unavailable, retrying in {LLM_CACHE_RETRY_SECONDS:.0f}s: {e}")
+                self._retry_at = time.monotonic() + LLM_CACHE_RETRY_SECONDS
+                return None
+        return self._collection
+
+    def _count(self, field, latency=0.0):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            self.latency_saved += latency
+
+    def record_bypass(self):
+        self._count("bypassed")
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._count("memory_hits", entry["latency"])
+            return entry["response"]
+
+        collection = self._get_collection()
+        if collection is not None:
+            try:
+                doc = collection.find_one({"_id": key, "expiresAt": {"$gt": datetime.utcnow()}})
+            except Exception:
+                doc = None
+            if doc:
+                entry = {"response": doc["response"], "latency": doc.get("latency", 0.0)}
+                remaining = (doc["expiresAt"] - datetime.utcnow()).total_seconds()
+                self.memory.set(key, entry, ttl=max(remaining, 1))
+                self._count("persistent_hits", entry["latency"])
+                return entry["response"]
+
+        self._count("misses")
+        return None
+
+    def set(self, key, response, latency, model=None):
+        self.memory.set(key, {"response": response, "latency": latency})
+        self._count("stores")
+
+        collection = self._get_collection()
+        if collection is not None:
+            now = datetime.utcnow()
+            try:
+                collection.replace_one(
+                    {"_id": key},
+                    {
+                        "_id": key,
+                        "model": model,
+                        "response": response,
+                        "latency": latency,
+                        "createdAt": now,
+                        "expiresAt": now + timedelta(seconds=self.ttl)
+                    },
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning(f"LLM cache write failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.persistent_hits
+            lookups = hits + self.misses
+            return {
+                "memoryHits": self.memory_hits,
+                "persistentHits": self.persistent_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "stores": self.stores,
+                "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+                "latencySavedSeconds": round(self.latency_saved, 2),
+                "memory": self.memory.stats(),
+                "persistent": self.persist,
+                "persistentConnected": self._collection is not None
+            }
@@ -0,0 +1,67 @@
+import os
+import time
+from app.services.http_client import PooledHttpClient
+from app.services.llm_cache import LLMResponseCache, cache_key, cacheable_response
+from app.utils import metrics
+
+# (connect, read) timeouts per call site; read timeouts match the old per-call values
+GROQ_TIMEOUTS = {
+    "chat": (5, 30),
+    "meal_day": (3, 5),
+    "meal_week": (5, 15),
+    "meal_week_stream": (
+        float(os.getenv("GROQ_STREAM_CONNECT_TIMEOUT", 5)),
+        float(os.getenv("GROQ_STREAM_READ_TIMEOUT", 15))
+    ),
+    "weekly_summary": (5, 45),
+    "nutrition_impact": (5, 40)
+}
+
+groq_client = PooledHttpClient(
+    "groq",
+    timeouts=GROQ_TIMEOUTS,
+    retries=int(os.getenv("GROQ_MAX_RETRIES", 2))
+)
+metrics.register("groq_http", groq_client.stats)
+
+response_cache = LLMResponseCache()
+metrics.register("llm_cache", response_cache.stats)
+
+
+def groq_post(payload, endpoint="chat", **kwargs):
+    """POST a chat completion payload to Groq over the shared keep-alive session"""
+    return groq_client.post(
+        os.getenv("GROQ_API_URL"),
+        endpoint=endpoint,
+        headers={
+            "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}",
+            "Content-Type": "application/json"
+        },
+        json=payload,
+        **kwargs
+    )
+
+
+def groq_chat(payload, endpoint="chat", cache=True, **kwargs):
+    """
+    Chat completion as parsed JSON. Low-temperature calls are answered
+    from the response cache when the same model / messages / temperature /
+    max_tokens were seen before; only complete responses are stored.
+    """
+    use_cache = cache and response_cache.should_cache(payload)
+    if not use_cache:
+        response_cache.record_bypass()
+        return groq_post(payload, endpoint=endpoint, **kwargs).json()
+
+    key = cache_key(payload)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    start = time.monotonic()
+    res = groq_post(payload, endpoint=endpoint, **kwargs)
+    data = res.json()
+
+    if res.status_code == 200 and cacheable_response(data):
+        response_cache.set(key, data, time.monotonic() - start, model=payload.get("model"))
+    return data
@@ -1,135 +1,171 @@
-try:
-    import joblib
-    JOBLIB_AVAILABLE = True
-except ImportError:
-    JOBLIB_AVAILABLE = False
-
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-    # Create a minimal pandas-like DataFrame class for fallback
-    class MockDataFrame:
-        def __init__(self, data):
-            self.data = data
-        def get_dummies(self, *args, **kwargs):
-            return self
-        def __getitem__(self, key):
-            return self
-        def to_dict(self):
-            return self.data
-    pd = type('MockPandas', (), {'DataFrame': MockDataFrame})()
-
 import os
+import warnings
+import numpy as np
+from app.services.tree_predictor import CompiledForest
+from app.services.feature_encoder import (
+    ProfileEncoder,
+    normalize_token,
+    DISEASES,
+    GOALS,
+    ALLERGIES
+)
+from app.utils.cache import LRUCache
+from app.utils import metrics
+
+# Batches are scored as plain ndarrays against a model fitted on a DataFrame
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
 
 MODEL_PATH = "models/meal_distribution_model.pkl"
+COMPILED_MODEL_PATH = "models/meal_distribution_trees.npz"
+ENCODER_PATH = "models/meal_distribution_encoder.json"
 
 # Lazy loading to prevent memory issues during startup
 _model = None
+_encoder = None
+_model_signature = None
 
-def get_model():
-    global _model
-    if not JOBLIB_AVAILABLE:
+# Memoized predictions keyed by canonical profile (0 disables)
+_prediction_cache = LRUCache(int(os.getenv("ML_PREDICTION_CACHE_SIZE", 4096)))
+
+def _load_pickled_model():
+    """Legacy path: pulls sklearn + xgboost into the worker"""
+    try:
+        import joblib
+    except ImportError:
         return None
+    return joblib.load(MODEL_PATH)
+
+
+def _artifact_signature():
+    """(path, mtime, size) of every model artifact; changes when retrained"""
+    signature = []
+    for path in (COMPILED_MODEL_PATH, MODEL_PATH, ENCODER_PATH):
+        try:
+            st = os.stat(path)
+            signature.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+def get_model():
+    global _model, _encoder, _model_signature
+
+    # 🔹 Reload model and drop memoized predictions when artifacts change
+    signature = _artifact_signature()
+    if signature != _model_signature:
+        _model = None
+        _encoder = None
+        _model_signature = signature
+        _prediction_cache.clear()
+
     if _model is None:
-        if os.path.exists(MODEL_PATH):
-            _model = joblib.load(MODEL_PATH)
+        # Prefer the compiled NumPy forest (no sklearn/xgboost import)
+        if os.path.exists(COMPILED_MODEL_PATH):
+            _model = CompiledForest.load(COMPILED_MODEL_PATH)
+        elif os.path.exists(MODEL_PATH):
+            _model = _load_pickled_model()
         else:
             # Return None if file doesn't exist (for deployment)
             _model = None
     return _model
 
 
-# ✅ Must match training-time vocab
-DISEASES = [
-    "Diabetes",
-    "Hypertension",
-    "Heart Disease",
-    "Kidney Disease",
-    "Weight Gain"
-]
-
-GOALS = [
-    "Fat Loss",
-    "Muscle Gain",
-    "Muscle Retention",
-    "Weight Loss",
-    "Weight Gain"
-]
-
-ALLERGIES = [
-    "peanuts",
-    "gluten",
-    "dairy",
-    "soy",
-    "shellfish"
-]
-
-
-def encode_profile(profile: dict) -> pd.DataFrame:
+def get_encoder(model) -> ProfileEncoder:
     """
-    Converts user profile into model-ready numeric dataframe
+    Loads the frozen encoder shipped next to the model (once per model).
+    Older pickles without the artifact fall back to feature_names_in_.
     """
+    global _encoder
+    if _encoder is None:
+        if os.path.exists(ENCODER_PATH):
+            _encoder = ProfileEncoder.load(ENCODER_PATH)
+        else:
+            _encoder = ProfileEncoder.from_feature_names(model.feature_names_in_)
+    return _encoder
+
+
+DEFAULT_DISTRIBUTION = {
+    "breakfast": 25.0,
+    "lunch": 30.0,
+    "dinner": 35.0,
+    "snacks": 10.0
+}
+
+
+def encode_profile(profile: dict) -> np.ndarray:
+    """
+    Converts user profile into a model-ready (1, n_features) matrix
+    """
+    return get_encoder(get_model()).encode_one(profile)
+
 
-    base = {
-        "Ages": profile["age"],
-        "Height": profile["height"],
-        "Weight": profile["weight"],
-        "Activity Level": profile["activityLevel"],
-        "Dietary Preference": profile["dietaryPreference"]
-    }
-
-    # 🔹 Disease multi-hot
-    for d in DISEASES:
-        base[f"disease_{d}"] = int(d in profile.get("diseases", []))
-
-    # 🔹 Goal multi-hot
-    for g in GOALS:
-        base[f"goal_{g}"] = int(g in profile.get("goals", []))
-
-    # 🔹 Allergy multi-hot (🔥 FIX)
-    for a in ALLERGIES:
-        base[f"allergy_{a}"] = int(a in profile.get("allergies", []))
-
-    df = pd.DataFrame([base])
-
-    # Only encode categorical STRING columns
-    df = pd.get_dummies(
-        df,
-        columns=["Activity Level", "Dietary Preference"],
-        dtype=int
+def canonical_profile_key(profile: dict) -> tuple:
+    """
+    Cache key holding only the fields the model sees: numbers as floats,
+    categories case-normalized, list fields deduplicated and sorted.
+    """
+    return (
+        float(profile["age"]),
+        float(profile["height"]),
+        float(profile["weight"]),
+        normalize_token(profile["activityLevel"]),
+        normalize_token(profile["dietaryPreference"]),
+        tuple(sorted({normalize_token(d) for d in profile.get("diseases") or []})),
+        tuple(sorted({normalize_token(g) for g in profile.get("goals") or []})),
+        tuple(sorted({normalize_token(a) for a in profile.get("allergies") or []}))
     )
 
-    return df
 
+def predict_distributions(profiles: list) -> list:
+    """
+    Predicts meal calorie distributions for a batch of profiles. Cached
+    profiles skip inference; the rest are scored with a single
+    model.predict call. Results are returned in input order.
+    """
+    if not profiles:
+        return []
 
-def predict_distribution(profile: dict) -> dict:
     model = get_model()
-    
+
     # Return default distribution if model is not available
     if model is None:
-        return {
-            "breakfast": 25.0,
-            "lunch": 30.0,
-            "dinner": 35.0,
-            "snacks": 10.0
-        }
-    
-    df = encode_profile(profile)
-
-    # 🔹 Align columns with training model
-    for col in model.feature_names_in_:
-        if col not in df.columns:
-            df[col] = 0
-
-    df = df[model.feature_names_in_]
-
-    preds = model.predict(df)[0]
-
-    return {
-        "breakfast": round(preds[0], 1),
-        "lunch": round(preds[1], 1),
-        "dinner": round(preds[2], 1),
-        "snacks": round(preds[3], 1)
-    }
+        return [dict(DEFAULT_DISTRIBUTION) for _ in profiles]
+
+    keys = [canonical_profile_key(p) for p in profiles]
+    results = [_prediction_cache.get(key) for key in keys]
+
+    # 🔹 Score each distinct uncached profile once
+    pending = {}
+    for i, key in enumerate(keys):
+        if results[i] is None and key not in pending:
+            pending[key] = i
+
+    if pending:
+        X = get_encoder(model).encode([profiles[i] for i in pending.values()])
+        preds = model.predict(X)
+
+        for key, p in zip(list(pending), preds):
+            pending[key] = {
+                "breakfast": round(float(p[0]), 1),
+                "lunch": round(float(p[1]), 1),
+                "dinner": round(float(p[2]), 1),
+                "snacks": round(float(p[3]), 1)
+            }
+            _prediction_cache.set(key, pending[key])
+
+    return [
+        dict(result if result is not None else pending[key])
+        for key, result in zip(keys, results)
+    ]
+
+
+def get_prediction_cache_stats() -> dict:
+    return _prediction_cache.stats()
+
+
+metrics.register("ml_prediction_cache", get_prediction_cache_stats)
+
+
+def predict_distribution(profile: dict) -> dict:
+    return predict_distributions([profile])[0]
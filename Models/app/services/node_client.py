@@ -1,21 +1,54 @@
-import requests
 import os
+from app.services.http_client import PooledHttpClient
+from app.utils import metrics
 
 NODE_BASE_URL = os.getenv("NODE_BACKEND_URL")
 NODE_KEY = os.getenv("NODE_INTERNAL_KEY")
 
+node_client = PooledHttpClient(
+    "node",
+    timeouts={"user_context": (3, 10)},
+    default_timeout=(3, 10),
+    retries=int(os.getenv("NODE_MAX_RETRIES", 1))
+)
+metrics.register("node_http", node_client.stats)
+
+
 def fetch_user_context_from_node(user_id: str):
     url = f"{NODE_BASE_URL}/internal/ai/user-context/{user_id}"
 
-    res = requests.get(
+    res = node_client.get(
         url,
+        endpoint="user_context",
         headers={
             "x-internal-key": NODE_KEY
-        },
-        timeout=10
+        }
     )
 
     if res.status_code != 200:
         return None
 
     return res.json().get("data")
+
+
+def fetch_ai_user_context(user_id: str):
+    """
+    User context from the public Node API used by the route fallbacks
+    (/api/v1/users/internal/ai/user-context). Returns None unless Node
+    answers success with data.
+    """
+    res = node_client.get(
+        f"{os.getenv('NODE_BACKEND_URL')}/api/v1/users/internal/ai/user-context/{user_id}",
+        endpoint="user_context",
+        headers={
+            "x-internal-key": os.getenv("INTERNAL_HMAC_SECRET")
+        }
+    )
+
+    if res.status_code != 200:
+        return None
+
+    node_data = res.json()
+    if node_data.get("success") and node_data.get("data"):
+        return node_data["data"]
+    return None
@@ -1,8 +1,34 @@
-from app.services.embedding_service import embed
+from app.services.embedding_service import embed_many
+from app.services.faiss_service import get_meal_index, meal_text, content_hash, meal_attributes
 
 def normalize_payload(payload):
+    """
+    Fills missing meal embeddings. Vectors already in the meal index for
+    the same text are reused; the rest go through embed_many (deduped,
+    disk-cached, batched) and are added to the index.
+    """
+    meal_index = get_meal_index()
+    pending = []
+
     for meal in payload["data"]:
         if not meal["embedding"]:
-            text = meal["name"] + " " + " ".join(meal["ingredients"])
-            meal["embedding"] = embed([text])[0].tolist()
+            text = meal_text(meal)
+            text_hash = content_hash(text)
+            stored = meal_index.get_vector(meal["id"], text_hash)
+            if stored is not None:
+                meal["embedding"] = stored.tolist()
+            else:
+                pending.append((meal, text, text_hash))
+
+    if pending:
+        vectors = embed_many([text for _, text, _ in pending])
+        for (meal, _, _), vector in zip(pending, vectors):
+            meal["embedding"] = vector.tolist()
+        meal_index.upsert_many(
+            [meal["id"] for meal, _, _ in pending],
+            vectors,
+            [text_hash for _, _, text_hash in pending],
+            [meal_attributes(meal) for meal, _, _ in pending]
+        )
+
     return payload
@@ -1,7 +1,6 @@
 import json
-import os
-import requests
 from app.constants.prompts import NUTRITION_IMPACT_PROMPT
+from app.services.llm_client import groq_chat
 
 def generate_nutrition_impact(user_ctx: dict, weekly_plan: dict, health_risk: dict) -> dict:
     prompt = f"""
@@ -31,13 +30,8 @@ TASK:
 5. Give practical advice (not medical diagnosis)
 """
 
-    response = requests.post(
-        os.getenv("GROQ_API_URL"),
-        headers={
-            "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}",
-            "Content-Type": "application/json"
-        },
-        json={
+    result = groq_chat(
+        {
             "model": "llama-3.1-8b-instant",
             "messages": [
                 {"role": "system", "content": prompt}
@@ -45,11 +39,9 @@ TASK:
             "temperature": 0.3,
             "max_tokens": 900
         },
-        timeout=40
+        endpoint="nutrition_impact"
     )
 
-    result = response.json()
-
     text = (
         result.get("choices", [{}])[0]
         .get("message", {})
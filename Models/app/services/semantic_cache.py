@@ -0,0 +1,297 @@
+import os
+import json
+import atexit
+import time
+import shutil
+import hashlib
+import logging
+import threading
+import faiss
+import numpy as np
+from app.services.feature_encoder import normalize_token
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+# Cosine similarity a past question needs to reuse its answer
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", 7 * 86400))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 5000))  # per partition
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "models/semantic_chat_cache")
+SEMANTIC_CACHE_SAVE_INTERVAL = int(os.getenv("SEMANTIC_CACHE_SAVE_INTERVAL", 60))
+
+METADATA_FILE = "entries.json"
+CURRENT_FILE = "CURRENT"
+SEMANTIC_CACHE_KEEP_SNAPSHOTS = 2
+
+# Everything the chat context block shows the model; answers personalised
+# from a different value of any of these must not be shared
+CONTEXT_FIELDS = (
+    "age", "goal", "dietaryPreferences", "allergies", "preferredCuisines",
+    "maxCookTime", "skippedMeals", "likedMeals"
+)
+
+
+def personalization_bucket(user_ctx) -> str:
+    """
+    Users whose answers would be personalised the same way share a
+    bucket: same value for every CONTEXT_FIELDS entry. No context → "generic".
+    """
+    if not user_ctx:
+        return "generic"
+
+    def tokens(value):
+        if value is None or value == "" or value == []:
+            return []
+        values = value if isinstance(value, (list, tuple)) else [value]
+        return sorted({
+            normalize_token(json.dumps(v, sort_keys=True, default=str) if isinstance(v, dict) else v)
+            for v in values if v is not None and v != ""
+        })
+
+    profile = {field: tokens(user_ctx.get(field)) for field in CONTEXT_FIELDS}
+    if not any(profile.values()):
+        return "generic"
+    material = json.dumps(profile, sort_keys=True)
+    return hashlib.sha1(material.encode()).hexdigest()[:16]
+
+
+def _normalize(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+    faiss.normalize_L2(v)
+    return v
+
+
+class _Partition:
+    """Inner-product index over unit vectors (= cosine) plus answer metadata"""
+
+    def __init__(self, dim, index=None):
+        self.index = index or faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+        self.entries = {}
+
+    def remove(self, ids):
+        if ids:
+            self.index.remove_ids(np.asarray(ids, dtype=np.int64))
+            for i in ids:
+                self.entries.pop(i, None)
+
+
+class SemanticChatCache:
+    """
+    Reuses chat answers for questions that are semantically close to one
+    already answered, within the same (language, personalisation bucket)
+    partition. Entries expire by age; full partitions evict the least
+    used. State is written to disk periodically and reloaded on start.
+    """
+
+    def __init__(self, path=SEMANTIC_CACHE_PATH, dim=EMBEDDING_DIM,
+                 threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.dim = dim
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._partitions = {}
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def partition_key(language, user_ctx) -> str:
+        return f"{language or 'en-US'}:{personalization_bucket(user_ctx)}"
+
+    def _partition(self, key, create=False):
+        part = self._partitions.get(key)
+        if part is None and create:
+            part = self._partitions[key] = _Partition(self.dim)
+        return part
+
+    def lookup(self, vector, key):
+        """Cached answer for the closest past question, or None"""
+        with self._lock:
+            self._ensure_loaded()
+            part = self._partition(key)
+            if part is None or part.index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            scores, ids = part.index.search(_normalize(vector), 1)
+            entry_id, score = int(ids[0][0]), float(scores[0][0])
+            entry = part.entries.get(entry_id)
+
+            now = time.time()
+            if entry is None or score < self.threshold:
+                self.misses += 1
+                return None
+            if now - entry["createdAt"] > self.ttl:
+                part.remove([entry_id])
+                self.evictions += 1
+                self.misses += 1
+                self._dirty = True
+                return None
+
+            entry["hits"] += 1
+            entry["lastHit"] = now
+            self.hits += 1
+            self._dirty = True
+            return entry["answer"]
+
+    def store(self, question, vector, answer, key):
+        with self._lock:
+            self._ensure_loaded()
+            part = self._partition(key, create=True)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            part.index.add_with_ids(_normalize(vector), np.asarray([entry_id], dtype=np.int64))
+            now = time.time()
+            part.entries[entry_id] = {
+                "question": question,
+                "answer": answer,
+                "createdAt": now,
+                "lastHit": now,
+                "hits": 0
+            }
+            self.stores += 1
+            self._dirty = True
+
+            self._evict(part)
+            self._maybe_save()
+
+    def _evict(self, part):
+        now = time.time()
+        expired = [i for i, e in part.entries.items() if now - e["createdAt"] > self.ttl]
+
+        # 🔹 Over capacity: drop least-hit, then least recently used
+        overflow = len(part.entries) - len(expired) - self.max_entries
+        if overflow > 0:
+            expired_set = set(expired)
+            ranked = sorted(
+                (i for i in part.entries if i not in expired_set),
+                key=lambda i: (part.entries[i]["hits"], part.entries[i]["lastHit"])
+            )
+            expired += ranked[:overflow]
+
+        if expired:
+            part.remove(expired)
+            self.evictions += len(expired)
+
+    # Persistence: each save writes a fresh snapshot directory (one FAISS
+    # file per partition + a JSON sidecar for answers) and atomically
+    # repoints CURRENT, so a reader never pairs one process's index with
+    # another's sidecar. Workers overwrite each other's snapshots whole;
+    # the last writer wins.
+
+    def _index_file(self, key, snap_dir):
+        return os.path.join(snap_dir, hashlib.sha1(key.encode()).hexdigest()[:16] + ".faiss")
+
+    def _maybe_save(self):
+        if self._dirty and time.monotonic() - self._last_save >= SEMANTIC_CACHE_SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            try:
+                version = f"snap-{time.time_ns()}-{os.getpid()}"
+                snap_dir = os.path.join(self.path, version)
+                os.makedirs(snap_dir, exist_ok=True)
+
+                metadata = {"nextId": self._next_id, "partitions": {}}
+                for key, part in self._partitions.items():
+                    faiss.write_index(part.index, self._index_file(key, snap_dir))
+                    metadata["partitions"][key] = {
+                        str(i): e for i, e in part.entries.items()
+                    }
+                with open(os.path.join(snap_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+                    json.dump(metadata, f)
+
+                # ✅ Publish: readers see either the old or the new snapshot
+                pointer = os.path.join(self.path, CURRENT_FILE)
+                with open(pointer + f".{os.getpid()}.tmp", "w") as f:
+                    f.write(version)
+                os.replace(pointer + f".{os.getpid()}.tmp", pointer)
+
+                self._dirty = False
+                self._prune_snapshots()
+            except Exception as e:
+                logger.warning(f"semantic cache save failed: {e}")
+            self._last_save = time.monotonic()
+
+    def _prune_snapshots(self):
+        snapshots = sorted(
+            (d for d in os.listdir(self.path) if d.startswith("snap-")),
+            key=lambda d: int(d.split("-")[1])
+        )
+        for old in snapshots[:-SEMANTIC_CACHE_KEEP_SNAPSHOTS]:
+            shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+
+    def _read_snapshot(self):
+        pointer = os.path.join(self.path, CURRENT_FILE)
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            snap_dir = os.path.join(self.path, f.read().strip())
+
+        with open(os.path.join(snap_dir, METADATA_FILE), encoding="utf-8") as f:
+            metadata = json.load(f)
+        partitions = {}
+        for key, entries in metadata["partitions"].items():
+            part = _Partition(self.dim, faiss.read_index(self._index_file(key, snap_dir)))
+            part.entries = {int(i): e for i, e in entries.items()}
+            partitions[key] = part
+        return partitions, metadata["nextId"]
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+
+        for attempt in range(2):
+            try:
+                snapshot = self._read_snapshot()
+                if snapshot:
+                    self._partitions, self._next_id = snapshot
+                return
+            except FileNotFoundError:
+                # Another worker pruned the snapshot between pointer and read; re-read CURRENT
+                continue
+            except Exception as e:
+                logger.warning(f"semantic cache load failed, starting empty: {e}")
+                return
+        logger.warning("semantic cache snapshot kept changing, starting empty")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "partitions": len(self._partitions),
+                "entries": sum(len(p.entries) for p in self._partitions.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "threshold": self.threshold
+            }
+
+
+semantic_chat_cache = SemanticChatCache()
+metrics.register("semantic_chat_cache", semantic_chat_cache.stats)
+
+
+@atexit.register
+def _flush_semantic_cache():
+    if semantic_chat_cache._dirty:
+        semantic_chat_cache.save()
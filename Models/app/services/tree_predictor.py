@@ -0,0 +1,156 @@
+import json
+import numpy as np
+
+
+class CompiledForest:
+    """
+    Pure-NumPy predictor for a flattened set of gradient boosted trees.
+
+    All trees of all outputs live in one node table. Leaves point to
+    themselves, so a batch is scored by walking every (row, tree) pair
+    max_depth times with flat gathers, then summing leaf values per output.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing, value,
+                 roots, tree_output, base_score, max_depth, feature_names):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.missing = np.asarray(missing, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.tree_output = np.asarray(tree_output, dtype=np.int32)
+        self.base_score = np.asarray(base_score, dtype=np.float32)
+        self.max_depth = int(max_depth)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+        # children[2 * node + went_right]: one gather per level instead of two
+        self._children = np.stack([self.left, self.right], axis=1).ravel()
+        self._default_right = self.missing == self.right
+
+        # (n_trees, n_outputs) routing matrix: leaf sums become one matmul
+        self._output_matrix = np.zeros(
+            (len(self.roots), len(self.base_score)), dtype=np.float32
+        )
+        self._output_matrix[np.arange(len(self.roots)), self.tree_output] = 1
+
+    @property
+    def n_outputs(self) -> int:
+        return len(self.base_score)
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+
+        X = np.ascontiguousarray(X)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        has_missing = bool(np.isnan(flat_X).any())
+
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+
+        for _ in range(self.max_depth):
+            x = flat_X.take(row_offset + self.feature.take(node))
+            went_right = x >= self.threshold.take(node)
+            if has_missing:
+                went_right = np.where(np.isnan(x), self._default_right.take(node), went_right)
+            node = self._children.take(2 * node + went_right)
+
+        return self.value.take(node) @ self._output_matrix + self.base_score
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            missing=self.missing,
+            value=self.value,
+            roots=self.roots,
+            tree_output=self.tree_output,
+            base_score=self.base_score,
+            max_depth=np.int32(self.max_depth),
+            feature_names=np.asarray(self.feature_names_in_, dtype=str)
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["feature"],
+                data["threshold"],
+                data["left"],
+                data["right"],
+                data["missing"],
+                data["value"],
+                data["roots"],
+                data["tree_output"],
+                data["base_score"],
+                data["max_depth"],
+                data["feature_names"].tolist()
+            )
+
+
+def _parse_base_score(booster) -> float:
+    config = json.loads(booster.save_config())
+    raw = config["learner"]["learner_model_param"]["base_score"]
+    # xgboost >= 3 stores a vector like "[3.1E2]"
+    return float(str(raw).strip("[]").split(",")[0])
+
+
+def compile_xgb_regressors(regressors, feature_names) -> CompiledForest:
+    """
+    Flattens fitted XGBRegressors (one per output, e.g. the estimators_ of a
+    MultiOutputRegressor) into a single CompiledForest. Only used at training
+    time; serving never imports xgboost.
+    """
+    index = {name: i for i, name in enumerate(feature_names)}
+
+    feature, threshold, left, right, missing, value = [], [], [], [], [], []
+    roots, tree_output, base_score = [], [], []
+    max_depth = 0
+
+    def add_node(node, depth):
+        nonlocal max_depth
+        max_depth = max(max_depth, depth)
+
+        pos = len(feature)
+        feature.append(0)
+        threshold.append(0.0)
+        left.append(pos)
+        right.append(pos)
+        missing.append(pos)
+        value.append(0.0)
+
+        if "leaf" in node:
+            value[pos] = node["leaf"]
+            return pos
+
+        children = {child["nodeid"]: child for child in node["children"]}
+        split = node["split"]
+        feature[pos] = index[split] if split in index else int(split.lstrip("f"))
+        threshold[pos] = node["split_condition"]
+
+        yes = add_node(children[node["yes"]], depth + 1)
+        no = add_node(children[node["no"]], depth + 1)
+        left[pos] = yes
+        right[pos] = no
+        missing[pos] = yes if node["missing"] == node["yes"] else no
+        return pos
+
+    for output, regressor in enumerate(regressors):
+        booster = regressor.get_booster()
+        base_score.append(_parse_base_score(booster))
+
+        for dump in booster.get_dump(dump_format="json"):
+            roots.append(add_node(json.loads(dump), 0))
+            tree_output.append(output)
+
+    return CompiledForest(
+        feature, threshold, left, right, missing, value,
+        roots, tree_output, base_score, max_depth, list(feature_names)
+    )
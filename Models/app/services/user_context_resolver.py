@@ -1,8 +1,32 @@
+import os
 from app.services.user_context_service import (
     get_user_context,
     upsert_user_context
 )
-from app.services.node_client import fetch_user_context_from_node
+from app.services.node_client import fetch_user_context_from_node, fetch_ai_user_context
+from app.utils.cache import LRUCache
+from app.utils.singleflight import SingleFlight, SingleFlightTimeout
+from app.utils.user_helpers import extract_username
+from app.utils import metrics
+
+# Resolved (raw_user_ctx, username) per userId; unknown users are cached
+# for a shorter time so a missing user does not cost a Node call per request
+USER_CONTEXT_CACHE_TTL = float(os.getenv("USER_CONTEXT_CACHE_TTL", 300))
+USER_CONTEXT_NEGATIVE_TTL = float(os.getenv("USER_CONTEXT_NEGATIVE_TTL", 60))
+
+_resolved_cache = LRUCache(
+    int(os.getenv("USER_CONTEXT_CACHE_SIZE", 2048)),
+    ttl=USER_CONTEXT_CACHE_TTL
+)
+metrics.register("user_context_cache", _resolved_cache.stats)
+
+# Concurrent misses for one userId share a single Node fetch + upsert.
+# Waiters give up after USER_CONTEXT_FETCH_TIMEOUT (Node read timeout + slack).
+USER_CONTEXT_FETCH_TIMEOUT = float(os.getenv("USER_CONTEXT_FETCH_TIMEOUT", 12))
+
+_inflight = SingleFlight()
+metrics.register("user_context_singleflight", _inflight.stats)
+
 
 def resolve_user_context(user_id: str):
     """
@@ -15,9 +39,84 @@ def resolve_user_context(user_id: str):
     if local:
         return local
 
+    return _inflight.do(
+        ("node", user_id),
+        lambda: _fetch_and_store(user_id),
+        timeout=USER_CONTEXT_FETCH_TIMEOUT
+    )
+
+
+def _fetch_and_store(user_id: str):
     node_data = fetch_user_context_from_node(user_id)
     if not node_data:
         return None
 
     upsert_user_context(user_id, node_data)
-    return node_data
+
+    # Same shape as the stored document, so callers see nodeData either way
+    return {
+        "userId": user_id,
+        "username": node_data.get("user", {}).get("username"),
+        "nodeData": node_data
+    }
+
+
+def _resolve_uncached(user_id: str):
+    raw_user_ctx = None
+    username = None
+
+    try:
+        # First try to resolve from stored context
+        raw_user_ctx = resolve_user_context(user_id)
+        if raw_user_ctx:
+            username = extract_username(raw_user_ctx)
+    except Exception:
+        pass
+
+    # If no username found, try the public Node user-context API
+    if not username:
+        try:
+            node_ctx = fetch_ai_user_context(user_id)
+            if node_ctx:
+                raw_user_ctx = node_ctx
+                username = extract_username(raw_user_ctx)
+        except Exception:
+            pass
+
+    return raw_user_ctx, username
+
+
+def resolve_user(user_id: str):
+    """
+    (raw_user_ctx, username) for a userId; either may be None.
+    Results are cached in-process, misses with a shorter TTL.
+    """
+    cached = _resolved_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    try:
+        return _inflight.do(
+            ("resolve", user_id),
+            lambda: _resolve_and_cache(user_id),
+            timeout=USER_CONTEXT_FETCH_TIMEOUT
+        )
+    except SingleFlightTimeout:
+        # Leader still busy; answer without context rather than stall
+        return None, None
+
+
+def _resolve_and_cache(user_id: str):
+    resolved = _resolve_uncached(user_id)
+    ttl = USER_CONTEXT_CACHE_TTL if resolved[1] else USER_CONTEXT_NEGATIVE_TTL
+    _resolved_cache.set(user_id, resolved, ttl=ttl)
+    return resolved
+
+
+def invalidate_user_context(user_id: str):
+    """Drop a cached resolution after the user's context changed in Node"""
+    _resolved_cache.pop(user_id)
+
+
+def get_user_context_cache_stats() -> dict:
+    return _resolved_cache.stats()
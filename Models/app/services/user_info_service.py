@@ -0,0 +1,106 @@
+import os
+import logging
+from bson import ObjectId
+from app.utils.cache import LRUCache
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Display info per userId for admin listings. Short TTL: renames in the
+# Node-owned users collection show up within a minute.
+USER_INFO_CACHE_TTL = float(os.getenv("USER_INFO_CACHE_TTL", 60))
+
+_info_cache = LRUCache(
+    int(os.getenv("USER_INFO_CACHE_SIZE", 4096)),
+    ttl=USER_INFO_CACHE_TTL
+)
+metrics.register("user_info_cache", _info_cache.stats)
+
+_USER_FIELDS = {"username": 1, "email": 1, "fullName": 1, "name": 1}
+
+
+def fallback_user_info(user_id) -> dict:
+    """Shown when no user matches: the raw userId stands in for the name"""
+    return {
+        'username': user_id if user_id else 'Unknown',
+        'email': '',
+        'fullName': '',
+        'name': user_id if user_id else 'Unknown User'
+    }
+
+
+def user_info(user: dict) -> dict:
+    username = user.get('username', '')
+    email = user.get('email', '')
+    full_name = user.get('fullName') or user.get('name') or ''
+
+    # Create display name priority: fullName > username > email > 'Unknown User'
+    display_name = full_name or username or email.split('@')[0] if email else 'Unknown User'
+
+    return {
+        'username': username,
+        'email': email,
+        'fullName': full_name,
+        'name': display_name
+    }
+
+
+def _id_candidates(user_ids):
+    """userIds as stored strings and, where they parse, as ObjectIds"""
+    candidates = list(user_ids)
+    candidates += [ObjectId(u) for u in user_ids if isinstance(u, str) and ObjectId.is_valid(u)]
+    return candidates
+
+
+def resolve_users_info(users_collection, user_ids) -> dict:
+    """
+    {userId: info} for a page of records. Cached ids are answered from
+    memory; the rest are matched in one query on _id, username or email
+    (same priority as a one-by-one lookup). Unknown ids get the fallback
+    and are cached too, so they are not looked up again on every page.
+    """
+    found = {}
+    missing = []
+    for user_id in dict.fromkeys(u for u in user_ids if u):
+        info = _info_cache.get(user_id)
+        if info is None:
+            missing.append(user_id)
+        else:
+            found[user_id] = info
+
+    if not missing:
+        return found
+
+    try:
+        users = list(users_collection.find(
+            {"$or": [
+                {"_id": {"$in": _id_candidates(missing)}},
+                {"username": {"$in": missing}},
+                {"email": {"$in": missing}}
+            ]},
+            _USER_FIELDS
+        ))
+    except Exception as e:
+        # Users collection unavailable: answer with fallbacks, cache nothing
+        logger.warning(f"user info lookup failed for {len(missing)} users: {e}")
+        found.update((u, fallback_user_info(u)) for u in missing)
+        return found
+
+    by_key = {}
+    for field in ("email", "username", "_id"):  # _id last so it wins, then username
+        for user in users:
+            key = str(user.get(field)) if user.get(field) is not None else None
+            if key:
+                by_key[key] = user
+
+    for user_id in missing:
+        user = by_key.get(str(user_id))
+        info = user_info(user) if user else fallback_user_info(user_id)
+        _info_cache.set(user_id, info)
+        found[user_id] = info
+
+    return found
+
+
+def invalidate_user_info(user_id):
+    _info_cache.pop(user_id)
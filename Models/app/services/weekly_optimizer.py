@@ -1,14 +1,128 @@
-from pulp import (
-    LpProblem,
-    LpMinimize,
-    LpVariable,
-    lpSum
-)
-
-def optimize_week(calorie_target: float):
-    
-    prob = LpProblem("WeeklyCalories", LpMinimize)
+import logging
+import math
+import os
+import threading
+import numpy as np
+from app.utils.cache import LRUCache
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Safety bounds around each day's target (±5%)
+TOLERANCE = 0.05
+
+# Cached LP models keyed by problem shape; targets are re-bound per solve
+_lp_models = {}
+_lp_lock = threading.Lock()
+_solver = None
+
+
+class InvalidTargets(ValueError):
+    pass
+
+
+def _day_index(day) -> int:
+    """Day name (any case) or 0-6 with Monday = 0, as an int or numeric string"""
+    if isinstance(day, str):
+        name = day.strip().lower()
+        names = [d.lower() for d in DAYS]
+        if name in names:
+            return names.index(name)
+        if not name.isdigit():
+            raise InvalidTargets(f"Unknown day {day!r}")
+        day = int(name)
+    if isinstance(day, int) and not isinstance(day, bool) and 0 <= day < 7:
+        return day
+    raise InvalidTargets(f"Day must be a day name or 0-6 (Monday = 0), got {day!r}")
+
+
+def _calories(value, field) -> float:
+    try:
+        calories = float(value)
+    except (TypeError, ValueError):
+        calories = None
+    if isinstance(value, bool) or calories is None or not math.isfinite(calories) or calories <= 0:
+        raise InvalidTargets(f"{field} must be a positive number, got {value!r}")
+    return calories
+
+
+def validate_targets(targets):
+    """
+    Raises InvalidTargets for request targets optimize_week cannot use:
+    dailyCalorieTarget, dayTargets values and weeklyCalorieBudget must be
+    positive numbers, dayTargets keys and cookingDays valid days.
+    """
+    if not isinstance(targets, dict):
+        raise InvalidTargets("targets must be an object")
+    _calories(targets.get("dailyCalorieTarget"), "dailyCalorieTarget")
+
+    day_targets = targets.get("dayTargets")
+    if day_targets is not None:
+        if not isinstance(day_targets, dict):
+            raise InvalidTargets("dayTargets must map days to calories")
+        for day, value in day_targets.items():
+            _day_index(day)
+            _calories(value, f"dayTargets[{day!r}]")
+
+    cooking_days = targets.get("cookingDays")
+    if cooking_days is not None:
+        if not isinstance(cooking_days, list):
+            raise InvalidTargets("cookingDays must be a list of days")
+        for day in cooking_days:
+            _day_index(day)
+
+    if targets.get("weeklyCalorieBudget") is not None:
+        _calories(targets["weeklyCalorieBudget"], "weeklyCalorieBudget")
+
+
+def _day_targets(calorie_target: float, day_targets=None) -> list:
+    """7 daily targets: the flat target with optional per-day overrides"""
+    targets = [float(calorie_target)] * 7
+    for day, value in (day_targets or {}).items():
+        targets[_day_index(day)] = float(value)
+    return targets
+
+
+def _leftover_groups(cooking_days=None):
+    """
+    Cooking days link the week: a non-cooking day eats leftovers from the
+    most recent cooking day, so it gets that day's calories. Returns one
+    tuple of day indexes per cooking day, or None when nothing is linked.
+    """
+    cooking = sorted({_day_index(d) for d in cooking_days or []})
+    if not cooking or len(cooking) == 7:
+        return None
+
+    groups = {c: [c] for c in cooking}
+    for d in range(7):
+        if d in groups:
+            continue
+        # Most recent cooking day, wrapping around to last week's
+        previous = max((c for c in cooking if c < d), default=cooking[-1])
+        groups[previous].append(d)
+
+    return tuple(tuple(sorted(g)) for g in groups.values())
+
+
+def _closed_form(targets: list) -> list:
+    # Every target sits inside its own ±5% band, so zero deviation is optimal
+    return [round(t, 1) for t in targets]
+
+
+def _get_solver():
+    global _solver
+    if _solver is None:
+        from pulp import PULP_CBC_CMD
+        _solver = PULP_CBC_CMD(msg=False)
+    return _solver
+
+
+def _build_lp(groups, has_budget):
+    from pulp import LpProblem, LpMinimize, LpVariable, lpSum
 
+    prob = LpProblem("WeeklyCalories", LpMinimize)
     days = range(7)
 
     # Calories per day
@@ -22,13 +136,352 @@ def optimize_week(calorie_target: float):
     prob += lpSum(dev_pos[d] + dev_neg[d] for d in days)
 
     for d in days:
-        # cal[d] - target = dev_pos - dev_neg
-        prob += cal[d] - calorie_target == dev_pos[d] - dev_neg[d]
+        # cal[d] - target = dev_pos - dev_neg (target bound per solve)
+        prob += cal[d] - dev_pos[d] + dev_neg[d] == 0, f"deviation_{d}"
+
+    for group in groups or ():
+        for d in group[1:]:
+            prob += cal[d] == cal[group[0]], f"leftovers_{d}"
+
+    if has_budget:
+        prob += lpSum(cal[d] for d in days) <= 0, "weekly_budget"
+
+    return prob, cal
+
+
+def _solve_lp(targets: list, groups, weekly_budget) -> list:
+    key = (groups, weekly_budget is not None)
+
+    with _lp_lock:
+        if key not in _lp_models:
+            _lp_models[key] = _build_lp(groups, weekly_budget is not None)
+        prob, cal = _lp_models[key]
+
+        # Leftover days follow their cooking day; only cooking days keep the band
+        followers = {d for group in groups or () for d in group[1:]}
+
+        # 🔹 Re-bind this request's numbers onto the cached model
+        for d, target in enumerate(targets):
+            prob.constraints[f"deviation_{d}"].constant = -target
+            if d not in followers:
+                cal[d].lowBound = target * (1 - TOLERANCE)
+                cal[d].upBound = target * (1 + TOLERANCE)
+
+        if weekly_budget is not None:
+            prob.constraints["weekly_budget"].constant = -float(weekly_budget)
+
+        prob.solve(_get_solver())
+
+        if prob.status != 1:
+            logger.warning("Weekly optimizer LP not optimal (status %s); using targets", prob.status)
+            return _closed_form(targets)
+
+        return [round(cal[d].value(), 1) for d in range(7)]
+
+
+def optimize_week(calorie_target: float, day_targets=None, cooking_days=None, weekly_budget=None):
+    """
+    Distributes calories over the 7 days of the week.
+
+    Unconstrained shapes (one flat target, or per-day overrides) have an
+    analytic answer and never touch the solver. Only problems that couple
+    days — leftovers between cooking days, or a weekly calorie budget —
+    go to the LP, which is built once per shape and reused.
+    """
+    targets = _day_targets(calorie_target, day_targets)
+    groups = _leftover_groups(cooking_days)
+
+    if groups is None and weekly_budget is None:
+        return _closed_form(targets)
+
+    return _solve_lp(targets, groups, weekly_budget)
+
+
+# Users per packed LP solve (bounds model size / CBC memory)
+LP_BATCH_SIZE = int(os.getenv("WEEKLY_LP_BATCH_SIZE", 500))
+
+
+def _week_spec(item):
+    """Accepts a bare calorie target or a request-style targets dict"""
+    if isinstance(item, dict):
+        return (
+            item["dailyCalorieTarget"],
+            item.get("dayTargets"),
+            item.get("cookingDays"),
+            item.get("weeklyCalorieBudget")
+        )
+    return item, None, None, None
+
+
+def _solve_packed_lp(problems: list) -> list:
+    """
+    Solves many independent weekly problems as one LP (disjoint blocks,
+    summed objective) so the whole cohort pays for a single CBC run.
+    problems: [(targets, groups, weekly_budget)]
+    """
+    from pulp import LpProblem, LpMinimize, LpVariable, lpSum
+
+    prob = LpProblem("WeeklyCaloriesBatch", LpMinimize)
+    objective = []
+    cals = []
+
+    for u, (targets, groups, weekly_budget) in enumerate(problems):
+        followers = {d for group in groups or () for d in group[1:]}
+        cal = {}
+        for d, target in enumerate(targets):
+            bounded = d not in followers
+            cal[d] = LpVariable(
+                f"cal_{u}_{d}",
+                lowBound=target * (1 - TOLERANCE) if bounded else 0,
+                upBound=target * (1 + TOLERANCE) if bounded else None
+            )
+            dev_pos = LpVariable(f"dev_pos_{u}_{d}", lowBound=0)
+            dev_neg = LpVariable(f"dev_neg_{u}_{d}", lowBound=0)
+            prob += cal[d] - dev_pos + dev_neg == target, f"deviation_{u}_{d}"
+            objective += [dev_pos, dev_neg]
+
+        for group in groups or ():
+            for d in group[1:]:
+                prob += cal[d] == cal[group[0]], f"leftovers_{u}_{d}"
+
+        if weekly_budget is not None:
+            prob += lpSum(cal.values()) <= float(weekly_budget), f"weekly_budget_{u}"
+
+        cals.append(cal)
+
+    prob += lpSum(objective)
+    prob.solve(_get_solver())
+
+    if prob.status != 1:
+        # One infeasible block sinks the whole batch; fall back per user
+        return [_solve_lp(*p) for p in problems]
+
+    return [[round(cal[d].value(), 1) for d in range(7)] for cal in cals]
+
+
+def optimize_weeks(targets: list) -> list:
+    """
+    Batch optimize_week for a cohort, results in input order.
+
+    Each item is a calorie target or a targets dict (dailyCalorieTarget,
+    dayTargets, cookingDays, weeklyCalorieBudget). Closed-form weeks are
+    computed together as one NumPy array; coupled weeks are packed into
+    LP_BATCH_SIZE-user LPs.
+    """
+    specs = [_week_spec(item) for item in targets]
+    results = [None] * len(specs)
+
+    analytic, coupled = [], []
+    for i, (calorie_target, day_targets, cooking_days, weekly_budget) in enumerate(specs):
+        groups = _leftover_groups(cooking_days)
+        if groups is None and weekly_budget is None:
+            analytic.append(i)
+        else:
+            coupled.append((i, (_day_targets(calorie_target, day_targets), groups, weekly_budget)))
+
+    # 🔹 Analytic cases: one (n, 7) array
+    if analytic:
+        weeks = np.repeat(
+            np.array([float(specs[i][0]) for i in analytic])[:, None], 7, axis=1
+        )
+        for row, i in enumerate(analytic):
+            for day, value in (specs[i][1] or {}).items():
+                weeks[row, _day_index(day)] = float(value)
+        for i, week in zip(analytic, np.round(weeks, 1).tolist()):
+            results[i] = week
+
+    # 🔹 Coupled cases: packed LPs
+    for start in range(0, len(coupled), LP_BATCH_SIZE):
+        chunk = coupled[start:start + LP_BATCH_SIZE]
+        solved = _solve_packed_lp([problem for _, problem in chunk])
+        for (i, _), week in zip(chunk, solved):
+            results[i] = week
+
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Per-meal multi-nutrient budgets
+# ---------------------------------------------------------------------------
+
+NUTRIENTS = ["calories", "protein", "carbs", "fats", "sodium", "sugar"]
+MEAL_SLOTS = ["breakfast", "lunch", "dinner", "snacks"]
+
+# Upper limits only (no lower band)
+CAPPED_NUTRIENTS = {"sodium", "sugar"}
+
+# Used when the request has no explicit macro targets
+DEFAULT_MACRO_SPLIT = {"protein": 0.20, "carbs": 0.50, "fats": 0.30}
+KCAL_PER_GRAM = {"protein": 4, "carbs": 4, "fats": 9}
+DEFAULT_DAILY_LIMITS = {"sodium": 2300, "sugar": 50}
+
+# On no-cook days (or very short cook times) lunch/dinner become quick meals
+COOKED_SLOTS = ("lunch", "dinner")
+NO_COOK_SLOT_SHARE = 0.30
+QUICK_COOK_MINUTES = 20
+
+# No single meal may carry more than this share of a capped nutrient
+CAPPED_MEAL_SHARE = 0.40
+
+_BANDED = np.array([n not in CAPPED_NUTRIENTS for n in NUTRIENTS])
+_CAPPED = ~_BANDED
+
+
+def daily_nutrient_targets(targets: dict) -> dict:
+    """
+    Daily target per nutrient from the request's targets
+    (dailyCalorieTarget, protein, carbs, fat/fats, sodium, sugar).
+    """
+    calories = float(targets["dailyCalorieTarget"])
+    daily = {"calories": calories}
+
+    for nutrient, share in DEFAULT_MACRO_SPLIT.items():
+        value = targets.get(nutrient)
+        if value is None and nutrient == "fats":
+            value = targets.get("fat")
+        daily[nutrient] = float(value) if value else calories * share / KCAL_PER_GRAM[nutrient]
+
+    for nutrient, limit in DEFAULT_DAILY_LIMITS.items():
+        daily[nutrient] = float(targets.get(nutrient) or limit)
+
+    return daily
+
+
+def _meal_shares(distribution: dict) -> np.ndarray:
+    # Accepts percentages or per-meal calories; only the ratios matter
+    raw = np.array([max(float(distribution.get(m, 0)), 0.0) for m in MEAL_SLOTS])
+    total = raw.sum()
+    if total <= 0:
+        return np.full(len(MEAL_SLOTS), 1 / len(MEAL_SLOTS))
+    return raw / total
+
+
+def _slot_caps(cooking_days=None, max_cook_time=None) -> np.ndarray:
+    """(7, n_slots) max share of the day each slot may carry"""
+    caps = np.ones((7, len(MEAL_SLOTS)))
+    cooked = [MEAL_SLOTS.index(s) for s in COOKED_SLOTS]
+
+    if max_cook_time is not None and float(max_cook_time) < QUICK_COOK_MINUTES:
+        no_cook_days = list(range(7))
+    elif cooking_days:
+        cooking = {_day_index(d) for d in cooking_days}
+        no_cook_days = [d for d in range(7) if d not in cooking]
+    else:
+        no_cook_days = []
+
+    for d in no_cook_days:
+        caps[d, cooked] = NO_COOK_SLOT_SHARE
+    return caps
+
+
+def _solve_days(day_targets: np.ndarray, shares: np.ndarray, caps: np.ndarray) -> np.ndarray:
+    """
+    Vectorized exact solve of, for every (day, nutrient):
+
+        min  sum_m |x_m - share_m * T|
+        s.t. x_m <= cap_m,  lo <= sum_m x_m <= hi,  x >= 0
+
+    with lo/hi = ±TOLERANCE of T for banded nutrients and [0, T] for capped
+    ones. Clipping to the caps and topping up the shortfall (only down to
+    lo) into remaining headroom is optimal for this L1 objective.
+
+    day_targets: (k, n_nutrients), caps: (k, n_slots) -> (k, n_nutrients, n_slots)
+    """
+    T = day_targets[:, :, None]
+    target = T * shares[None, None, :]
+
+    cap = T * caps[:, None, :]
+    cap = np.where(_CAPPED[None, :, None], np.minimum(cap, T * CAPPED_MEAL_SHARE), cap)
+
+    x = np.minimum(target, cap)
+
+    lo = np.where(_BANDED[None, :], day_targets * (1 - TOLERANCE), 0.0)
+    deficit = np.clip(lo - x.sum(axis=-1), 0, None)
+
+    headroom = cap - x
+    room = headroom.sum(axis=-1)
+    fill = np.divide(deficit, room, out=np.zeros_like(deficit), where=room > 0)
+
+    return x + headroom * np.minimum(fill, 1.0)[:, :, None]
+
+
+class WeeklyMacroPlanner:
+    """
+    Warm per-user planner. Keeps the last per-day inputs and solution and
+    re-solves only the days whose inputs changed. Instances are shared
+    across requests for the same user, so solve() holds a per-planner lock.
+    """
+
+    def __init__(self):
+        self._day_keys = [None] * 7
+        self._solution = np.zeros((7, len(NUTRIENTS), len(MEAL_SLOTS)))
+        self._lock = threading.Lock()
+        self.days_solved = 0
+
+    def solve(self, day_targets: np.ndarray, shares: np.ndarray, caps: np.ndarray) -> np.ndarray:
+        keys = [
+            (tuple(day_targets[d]), tuple(shares), tuple(caps[d]))
+            for d in range(7)
+        ]
+        with self._lock:
+            changed = [d for d in range(7) if keys[d] != self._day_keys[d]]
+
+            if changed:
+                self._solution[changed] = _solve_days(day_targets[changed], shares, caps[changed])
+                for d in changed:
+                    self._day_keys[d] = keys[d]
+                self.days_solved += len(changed)
+
+            return self._solution.copy()
+
+
+_planners = LRUCache(int(os.getenv("MACRO_PLANNER_CACHE_SIZE", 1024)))
+metrics.register("macro_planner_cache", _planners.stats)
+
+
+def get_planner(user_id=None) -> WeeklyMacroPlanner:
+    if user_id is None:
+        return WeeklyMacroPlanner()
+
+    planner = _planners.get(user_id)
+    if planner is None:
+        planner = WeeklyMacroPlanner()
+        _planners.set(user_id, planner)
+    return planner
+
+
+def plan_week_macros(distribution: dict, targets: dict, weekly_cals=None,
+                     cooking_days=None, max_cook_time=None, user_id=None) -> dict:
+    """
+    Per-day, per-meal budgets for calories, protein, carbs, fats, sodium and
+    sugar. Day totals follow weekly_cals (from optimize_week); each meal gets
+    its predicted share, moved off lunch/dinner on no-cook days.
+
+    Returns {"Monday": {"breakfast": {"calories": ..., ...}, ...}, ...}
+    """
+    daily = daily_nutrient_targets(targets)
+    base = np.array([daily[n] for n in NUTRIENTS])
 
-        # Safety bounds (±5%)
-        prob += cal[d] >= calorie_target * 0.95
-        prob += cal[d] <= calorie_target * 1.05
+    # 🔹 Scale every nutrient with that day's calories
+    scale = np.ones(7)
+    if weekly_cals:
+        scale = np.array([float(weekly_cals[d]) for d in range(7)]) / daily["calories"]
+    day_targets = np.outer(scale, base)
+    day_targets[:, _CAPPED] = base[_CAPPED]  # daily limits do not scale up
 
-    prob.solve()
+    solution = get_planner(user_id).solve(
+        day_targets,
+        _meal_shares(distribution),
+        _slot_caps(cooking_days, max_cook_time)
+    )
 
-    return [round(cal[d].value(), 1) for d in days]
+    return {
+        day: {
+            slot: {
+                nutrient: round(float(solution[d, n, m]), 1)
+                for n, nutrient in enumerate(NUTRIENTS)
+            }
+            for m, slot in enumerate(MEAL_SLOTS)
+        }
+        for d, day in enumerate(DAYS)
+    }
@@ -1,8 +1,7 @@
-import os
 import json
-import requests
 from datetime import datetime
 from app.constants.prompts import WEEKLY_MEAL_SUMMARY_PROMPT
+from app.services.llm_client import groq_chat
 from app.db.mongo import meal_analysis_collection
 
 
@@ -10,11 +9,6 @@ def generate_weekly_summary(user_id, weekly_plan):
     # ✅ Convert to readable JSON (critical)
     weekly_plan_text = json.dumps(weekly_plan, indent=2)[:12000]
 
-    headers = {
-        "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}",
-        "Content-Type": "application/json"
-    }
-
     body = {
         "model": "llama-3.1-8b-instant",
         "messages": [
@@ -27,14 +21,8 @@ def generate_weekly_summary(user_id, weekly_plan):
         "temperature": 0.3
     }
 
-    res = requests.post(
-        os.getenv("GROQ_API_URL"),
-        headers=headers,
-        json=body,
-        timeout=45
-    )
-
-    data = res.json()
+    # Same plan → same summary: served from the LLM response cache
+    data = groq_chat(body, endpoint="weekly_summary")
 
     # ✅ Graceful handling (NO hard crash)
     summary_text = (
@@ -0,0 +1,24 @@
+# app/utils/metrics.py
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# name -> zero-arg callable returning a JSON-serialisable dict
+_sources = {}
+
+
+def register(name, stats_fn):
+    """Expose a component's stats() under /metrics"""
+    _sources[name] = stats_fn
+
+
+def snapshot() -> dict:
+    data = {}
+    for name, stats_fn in list(_sources.items()):
+        try:
+            data[name] = stats_fn()
+        except Exception as e:
+            logger.warning(f"metrics source {name} failed: {e}")
+            data[name] = None
+    return data
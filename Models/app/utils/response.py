@@ -14,3 +14,11 @@ def failure(message="Error", status=400):
         "message": message,
         "data": None
     }, status
+
+
+def accepted(data=None, message="Accepted"):
+    return {
+        "success": True,
+        "message": message,
+        "data": data
+    }, 202
@@ -50,3 +50,15 @@ def normalize_user_context(node_payload: dict) -> dict:
         "likedMeals": [f["meal"] for f in feedback if f["type"] == "liked"],
         "skippedMeals": [a["meal"] for a in adherence if a["status"] == "skipped"]
     }
+
+
+def node_payload(raw_user_ctx):
+    """
+    The Node payload inside a resolved context: stored contexts wrap it as
+    {userId, username, nodeData}, the public Node API returns it bare.
+    """
+    if not isinstance(raw_user_ctx, dict):
+        return None
+    if isinstance(raw_user_ctx.get("nodeData"), dict):
+        return raw_user_ctx["nodeData"]
+    return raw_user_ctx
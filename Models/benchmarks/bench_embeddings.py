@@ -0,0 +1,180 @@
+"""
+Embedding backend benchmarks: sentences/sec and memory per backend, what
+EMBEDDING_PRELOAD saves across forked workers, and how closely each
+backend's vectors (and nearest neighbours) match the torch baseline.
+
+Run from the Models/ directory:
+    python benchmarks/bench_embeddings.py
+    python benchmarks/bench_embeddings.py --backends torch,onnx --workers 4
+
+Each measurement runs in a fresh process so RSS is not shared between
+backends. Memory figures come from /proc (Linux only). Needs the real
+sentence-transformers / onnxruntime packages and the model weights.
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SUGGESTION_COLUMNS = ["Breakfast Suggestion", "Lunch Suggestion", "Dinner Suggestion", "Snack Suggestion"]
+
+
+def sentences(n):
+    df = pd.read_csv("datasets/detailed_meals_macros_CLEANED.csv")
+    texts = [str(t) for col in SUGGESTION_COLUMNS if col in df for t in df[col].dropna()]
+    # Vary them so nothing is deduplicated away
+    return [f"{texts[i % len(texts)]} #{i}" for i in range(n)]
+
+
+def memory_mb():
+    """(RSS, private, shared) in MB for this process"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    return fields.get("Rss", 0), private, shared
+
+
+def _throughput(backend, n, batch_size, out):
+    os.environ["EMBEDDING_BACKEND"] = backend
+    os.environ["EMBEDDING_BATCH_SIZE"] = str(batch_size)
+    from app.services import embedding_service
+
+    texts = sentences(n)
+    rss_start = memory_mb()[0]
+
+    start = time.perf_counter()
+    embedding_service.get_model()
+    load_seconds = time.perf_counter() - start
+    rss_loaded = memory_mb()[0]
+
+    embedding_service.embed(texts[:batch_size])  # warm-up
+    start = time.perf_counter()
+    embedding_service.embed(texts)
+    encode_seconds = time.perf_counter() - start
+
+    out.put({
+        "backend": backend,
+        "load_s": load_seconds,
+        "sent_per_s": n / encode_seconds,
+        "model_mb": rss_loaded - rss_start,
+        "rss_mb": memory_mb()[0]
+    })
+
+
+def _vectors(backend, n, out):
+    """Unit-normalised embeddings of the first n benchmark sentences"""
+    os.environ["EMBEDDING_BACKEND"] = backend
+    from app.services import embedding_service
+
+    vectors = embedding_service.embed(sentences(n))
+    out.put(vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+
+
+def neighbour_recall(found, truth, k):
+    """Share of each text's k nearest neighbours (by cosine) that both spaces agree on"""
+    def top_k(v):
+        scores = v @ v.T
+        np.fill_diagonal(scores, -np.inf)
+        return np.argsort(-scores, axis=1)[:, :k]
+
+    a, b = top_k(found), top_k(truth)
+    return float(np.mean([len(set(x) & set(y)) / k for x, y in zip(a, b)]))
+
+
+def _worker_memory(backend, workers, preload, out):
+    """Forks `workers` children that each encode, like gunicorn workers"""
+    os.environ["EMBEDDING_BACKEND"] = backend
+    from app.services import embedding_service
+
+    if preload:
+        embedding_service.get_model()
+    texts = sentences(256)
+
+    children = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            embedding_service.embed(texts)
+            rss, private, shared = memory_mb()
+            os.write(write_fd, f"{rss} {private} {shared}".encode())
+            os._exit(0)
+        os.close(write_fd)
+        children.append((pid, read_fd))
+
+    private_total = rss_total = 0.0
+    for pid, read_fd in children:
+        rss, private, _ = map(float, os.read(read_fd, 128).decode().split())
+        os.waitpid(pid, 0)
+        rss_total += rss
+        private_total += private
+
+    out.put({
+        "backend": backend,
+        "preload": preload,
+        "private_mb": private_total / workers,
+        "rss_mb": rss_total / workers
+    })
+
+
+def run_isolated(target, *args):
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=target, args=(*args, out))
+    proc.start()
+    result = out.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", default="torch,onnx")
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--quality-sentences", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+
+    print(f"{'backend':<8} {'load s':>8} {'sent/s':>10} {'model MB':>10} {'RSS MB':>8}")
+    for backend in backends:
+        r = run_isolated(_throughput, backend, args.sentences, args.batch_size)
+        print(f"{r['backend']:<8} {r['load_s']:>8.2f} {r['sent_per_s']:>10.1f} {r['model_mb']:>10.1f} {r['rss_mb']:>8.1f}")
+
+    # Retrieval quality against torch: per-text cosine between the two
+    # embeddings, and neighbour recall@k over the sentence set
+    others = [b for b in backends if b != "torch"]
+    if others:
+        baseline = run_isolated(_vectors, "torch", args.quality_sentences)
+        print(f"\nvs torch, {args.quality_sentences} sentences:")
+        print(f"{'backend':<8} {'mean cos':>9} {'min cos':>8} {'recall@' + str(args.k):>10}")
+        for backend in others:
+            vectors = run_isolated(_vectors, backend, args.quality_sentences)
+            cosine = np.sum(vectors * baseline, axis=1)
+            recall = neighbour_recall(vectors, baseline, args.k)
+            print(f"{backend:<8} {cosine.mean():>9.4f} {cosine.min():>8.4f} {recall:>10.4f}")
+
+    print(f"\n{args.workers} forked workers, per worker:")
+    print(f"{'backend':<8} {'preload':>8} {'private MB':>11} {'RSS MB':>8}")
+    for backend in backends:
+        for preload in (False, True):
+            r = run_isolated(_worker_memory, backend, args.workers, preload)
+            print(f"{r['backend']:<8} {str(r['preload']):>8} {r['private_mb']:>11.1f} {r['rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
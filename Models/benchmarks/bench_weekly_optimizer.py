@@ -0,0 +1,143 @@
+"""
+Weekly optimizer benchmarks.
+
+Run from the Models/ directory:
+    python benchmarks/bench_weekly_optimizer.py
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.weekly_optimizer import (
+    NUTRIENTS,
+    MEAL_SLOTS,
+    WeeklyMacroPlanner,
+    _meal_shares,
+    _slot_caps,
+    _week_spec,
+    _day_targets,
+    optimize_week,
+    optimize_weeks,
+    plan_week_macros
+)
+
+ITERATIONS = 2000
+COHORT_SIZE = 2000
+
+DISTRIBUTION = {"breakfast": 25, "lunch": 30, "dinner": 35, "snacks": 10}
+TARGETS = {"dailyCalorieTarget": 2000, "protein": 120, "carbs": 230, "fat": 65, "sodium": 2000, "sugar": 40}
+COOKING_DAYS = ["monday", "wednesday", "saturday"]
+
+
+def report(name, samples):
+    samples = np.array(samples) * 1000
+    print(
+        f"{name:<38} mean {samples.mean():.4f} ms   "
+        f"p50 {np.percentile(samples, 50):.4f} ms   "
+        f"p99 {np.percentile(samples, 99):.4f} ms"
+    )
+
+
+def bench_cold_solve():
+    """Full 7-day x 4-meal x 6-nutrient solve on a fresh planner"""
+    rng = np.random.default_rng(0)
+    shares = _meal_shares(DISTRIBUTION)
+    caps = _slot_caps(COOKING_DAYS, 30)
+    samples = []
+    for _ in range(ITERATIONS):
+        day_targets = rng.uniform(0.9, 1.1, (7, len(NUTRIENTS))) * [2000, 120, 230, 65, 2000, 40]
+        planner = WeeklyMacroPlanner()
+        start = time.perf_counter()
+        planner.solve(day_targets, shares, caps)
+        samples.append(time.perf_counter() - start)
+    report("cold solve (7x4x6)", samples)
+
+
+def bench_delta_solve():
+    """Warm planner where the user changed a single day"""
+    rng = np.random.default_rng(1)
+    shares = _meal_shares(DISTRIBUTION)
+    caps = _slot_caps(COOKING_DAYS, 30)
+    day_targets = np.tile([2000.0, 120, 230, 65, 2000, 40], (7, 1))
+    planner = WeeklyMacroPlanner()
+    planner.solve(day_targets, shares, caps)
+    samples = []
+    for i in range(ITERATIONS):
+        day_targets = day_targets.copy()
+        day_targets[i % 7, 0] = rng.uniform(1800, 2200)
+        start = time.perf_counter()
+        planner.solve(day_targets, shares, caps)
+        samples.append(time.perf_counter() - start)
+    report("warm delta solve (1 day changed)", samples)
+
+
+def bench_plan_week_macros():
+    """End-to-end API call including dict rendering"""
+    samples = []
+    for i in range(ITERATIONS):
+        weekly_cals = [2000 + (i % 7) * 10] * 7
+        start = time.perf_counter()
+        plan_week_macros(DISTRIBUTION, TARGETS, weekly_cals, COOKING_DAYS, 30, user_id="bench")
+        samples.append(time.perf_counter() - start)
+    report("plan_week_macros (end to end)", samples)
+
+
+def make_cohort(coupled_share):
+    """Nightly-regeneration style cohort; coupled_share of users need the LP"""
+    rng = np.random.default_rng(2)
+    cohort = []
+    for i in range(COHORT_SIZE):
+        target = float(rng.integers(1400, 3000))
+        if rng.random() < coupled_share:
+            cohort.append({
+                "dailyCalorieTarget": target,
+                "cookingDays": ["monday", "thursday"],
+                "weeklyCalorieBudget": target * 7 * 0.97
+            })
+        elif i % 3 == 0:
+            cohort.append({"dailyCalorieTarget": target, "dayTargets": {"saturday": target * 1.1}})
+        else:
+            cohort.append(target)
+    return cohort
+
+
+def bench_cohort(coupled_share):
+    cohort = make_cohort(coupled_share)
+
+    start = time.perf_counter()
+    looped = [optimize_week(*_week_spec(item)) for item in cohort]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = optimize_weeks(cohort)
+    batch_time = time.perf_counter() - start
+
+    # LPs can have several optimal weeks; compare the objective (total deviation)
+    def deviation(week, item):
+        calorie_target, day_targets, _, _ = _week_spec(item)
+        return sum(abs(c - t) for c, t in zip(week, _day_targets(calorie_target, day_targets)))
+
+    mismatches = sum(
+        1 for a, b, item in zip(looped, batched, cohort)
+        if abs(deviation(a, item) - deviation(b, item)) > 1.0
+    )
+    print(
+        f"cohort {COHORT_SIZE} users, {coupled_share:.0%} coupled: "
+        f"per-user loop {COHORT_SIZE / loop_time:,.0f} users/s   "
+        f"optimize_weeks {COHORT_SIZE / batch_time:,.0f} users/s   "
+        f"({loop_time / batch_time:.1f}x, {mismatches} objective mismatches)"
+    )
+
+
+if __name__ == "__main__":
+    print(f"{len(NUTRIENTS)} nutrients x {len(MEAL_SLOTS)} meals x 7 days, {ITERATIONS} iterations\n")
+    bench_cold_solve()
+    bench_delta_solve()
+    bench_plan_week_macros()
+    print()
+    bench_cohort(0.0)
+    bench_cohort(0.2)
@@ -0,0 +1,220 @@
+"""
+Load test: concurrent LLM-bound requests under each gunicorn serving mode.
+
+Starts a stub Groq endpoint with a fixed latency, runs gunicorn with
+gunicorn.conf.py in each SERVING_MODE, and fires requests at a tiny WSGI
+app that makes one llm_client.groq_post call per request (the shape of
+every AI endpoint, minus Mongo). /health is probed during the load to
+show whether slow LLM calls block it.
+
+Run from the Models/ directory:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --modes gevent --concurrency 300 --requests 1500
+
+Against a running deployment instead (no stub, no gunicorn):
+    python benchmarks/load_test.py --url http://localhost:5000/chat/generateResponse \
+        --body '{"userId": "u1", "message": "high protein breakfast?"}'
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# 🔹 WSGI app served by gunicorn in the benchmark
+def bench_app(environ, start_response):
+    if environ["PATH_INFO"] == "/health":
+        body = b'{"status": "healthy"}'
+    else:
+        from app.services.llm_client import groq_post
+        res = groq_post({
+            "model": "llama-3.1-8b-instant",
+            "messages": [{"role": "user", "content": "ping"}]
+        }, endpoint="chat")
+        body = res.content
+
+    start_response("200 OK", [
+        ("Content-Type", "application/json"),
+        ("Content-Length", str(len(body)))
+    ])
+    return [body]
+
+
+def start_stub_groq(latency):
+    """Chat-completions stand-in that answers after `latency` seconds"""
+    reply = json.dumps({
+        "choices": [{"message": {"role": "assistant", "content": "pong"}}]
+    }).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_gunicorn(mode, port, groq_url):
+    env = dict(os.environ)
+    env.update({
+        "SERVING_MODE": mode,
+        "PORT": str(port),
+        "GROQ_API_URL": groq_url,
+        "GROQ_API_KEY": "bench",
+        "PYTHONPATH": ROOT
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "--log-level", "warning", "benchmarks.load_test:bench_app"],
+        cwd=ROOT, env=env
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"gunicorn ({mode}) did not start")
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def run_load(url, total, concurrency, body=None, health_url=None):
+    local = threading.local()
+
+    def one(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            if body is None:
+                ok = session.get(url, timeout=120).ok
+            else:
+                ok = session.post(url, json=body, timeout=120).ok
+        except requests.RequestException:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    # Probe /health while the load runs
+    health = []
+    stop = threading.Event()
+
+    def probe():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                requests.get(health_url, timeout=120)
+            except requests.RequestException:
+                pass
+            health.append(time.perf_counter() - start)
+            stop.wait(0.25)
+
+    prober = threading.Thread(target=probe, daemon=True) if health_url else None
+    if prober:
+        prober.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    if prober:
+        prober.join()
+
+    latencies = [t for ok, t in results if ok]
+    return {
+        "requests": total,
+        "errors": sum(1 for ok, _ in results if not ok),
+        "seconds": elapsed,
+        "throughput": total / elapsed,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "healthP95": percentile(health, 0.95)
+    }
+
+
+def report(label, r):
+    print(f"{label:<10} {r['throughput']:>8.1f} req/s  "
+          f"p50 {r['p50'] * 1000:>7.0f}ms  p95 {r['p95'] * 1000:>7.0f}ms  "
+          f"/health p95 {r['healthP95'] * 1000:>7.0f}ms  "
+          f"errors {r['errors']}/{r['requests']}  ({r['seconds']:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default="sync,gevent")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub Groq latency (s)")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--url", help="load an already running endpoint instead")
+    parser.add_argument("--body", help="JSON body to POST with --url")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+
+    if args.url:
+        body = json.loads(args.body) if args.body else None
+        health_url = args.url.split("/", 3)
+        health_url = "/".join(health_url[:3]) + "/health"
+        report("target", run_load(args.url, args.requests, args.concurrency, body, health_url))
+        return
+
+    stub = start_stub_groq(args.latency)
+    groq_url = f"http://127.0.0.1:{stub.server_port}/openai/v1/chat/completions"
+    print(f"stub Groq latency {args.latency * 1000:.0f}ms")
+
+    # Sync mode serializes requests; cap its run so it finishes in reasonable time
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        total = args.requests
+        if mode == "sync":
+            total = min(total, max(int(20 / args.latency), 10))
+        proc = start_gunicorn(mode, args.port, groq_url)
+        try:
+            base = f"http://127.0.0.1:{args.port}"
+            report(mode, run_load(f"{base}/llm", total, args.concurrency,
+                                  health_url=f"{base}/health"))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for the AI service.
+
+SERVING_MODE=gevent (default): one gevent worker multiplexes many
+requests on an event loop. Sockets, SSL, DNS, subprocess and threading
+are monkey-patched by the worker, so every Groq / Node call (requests)
+and every Mongo call (pymongo) yields while it waits on the network.
+A 45s weekly summary no longer blocks /health.
+
+SERVING_MODE=sync: the previous one-request-at-a-time worker.
+"""
+
+import os
+
+SERVING_MODE = os.getenv("SERVING_MODE", "gevent")
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+timeout = 180
+max_requests = 500
+max_requests_jitter = 50
+
+if SERVING_MODE == "gevent":
+    worker_class = "gevent"
+    # Concurrent requests per worker (mostly parked on LLM / Node / Mongo I/O)
+    worker_connections = int(os.getenv("GEVENT_WORKER_CONNECTIONS", 500))
+
+    # Let the shared HTTP clients keep enough keep-alive sockets for that
+    # concurrency; read by app.services.http_client at import time
+    os.environ.setdefault("HTTP_POOL_MAXSIZE", str(min(worker_connections, 256)))
+else:
+    worker_class = "sync"
+    threads = int(os.getenv("GUNICORN_THREADS", 1))
+
+# EMBEDDING_PRELOAD=true: load the sentence-transformer in the master
+# before workers fork, so they share its weights copy-on-write instead of
+# each loading a copy. No warm-up encode here: a runtime thread pool
+# started before fork is not safe to use in the children.
+if os.getenv("EMBEDDING_PRELOAD", "false").lower() == "true":
+    def when_ready(server):
+        from app.services.embedding_service import get_model
+        get_model()
@@ -0,0 +1,140 @@
+"""
+Build / rebuild the meal vector index and compare ANN tiers against the
+exact flat baseline.
+
+Run from the Models/ directory:
+    python ml/build_meal_index.py                      # evaluate every tier on the current snapshot
+    python ml/build_meal_index.py --synthetic 200000   # evaluate on a clustered synthetic catalog
+    python ml/build_meal_index.py --type ivfpq --write # rebuild the snapshot as IVF-PQ
+
+Workers pick up a rebuilt snapshot on their next start (or --max-requests recycle).
+A worker with unsaved changes replays them onto the rebuilt snapshot when it
+next saves, so running workers never undo a rebuild.
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import faiss
+
+# Allow `python ml/build_meal_index.py` from the Models/ directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import faiss_service
+from app.services.faiss_service import (
+    EMBEDDING_DIM,
+    INDEX_TYPES,
+    MealVectorIndex,
+    build_index,
+    set_search_params
+)
+
+# Query-time knobs swept per tier (nprobe for IVF, efSearch for HNSW)
+SWEEPS = {
+    "flat": [None],
+    "ivf": [4, 16, 64],
+    "ivfpq": [4, 16, 64],
+    "hnsw": [16, 64, 256]
+}
+
+
+def synthetic_catalog(n, dim=EMBEDDING_DIM, clusters=256, seed=0):
+    """Unit vectors around random centres, roughly how sentence embeddings cluster"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def make_queries(vectors, n, seed=1):
+    """Perturbed catalog vectors, so queries are near but not on indexed points"""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(len(vectors), min(n, len(vectors)), replace=False)].copy()
+    queries += 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(f[:k]) & set(t[:k]) - {-1}) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def latency_ms(index, queries, k):
+    """Per-query latency, one query at a time like the API does"""
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q.reshape(1, -1), k)
+        samples.append(time.perf_counter() - start)
+    samples = np.array(samples) * 1000
+    return np.percentile(samples, 50), np.percentile(samples, 95)
+
+
+def evaluate(vectors, types, k, n_queries):
+    ids = np.arange(len(vectors), dtype=np.int64)
+    queries = make_queries(vectors, n_queries)
+
+    flat, _, _ = build_index(vectors, ids, "flat")
+    _, truth = flat.search(queries, k)
+
+    print(f"{len(vectors)} vectors, {len(queries)} queries, k={k}")
+    print(f"{'index':<8} {'params':<40} {'knob':>6} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'size MB':>8} {'build s':>8}")
+
+    for index_type in types:
+        start = time.perf_counter()
+        index, effective, params = build_index(vectors, ids, index_type)
+        build_seconds = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+
+        if effective != index_type:
+            print(f"{index_type:<8} below MEAL_INDEX_MIN_ANN_SIZE, built as {effective}")
+
+        for knob in SWEEPS[effective]:
+            if effective in ("ivf", "ivfpq"):
+                set_search_params(index, effective, nprobe=knob)
+            elif effective == "hnsw":
+                set_search_params(index, effective, ef_search=knob)
+            _, found = index.search(queries, k)
+            p50, p95 = latency_ms(index, queries, k)
+            print(
+                f"{effective:<8} {str(params):<40} {str(knob or '-'):>6} "
+                f"{recall_at_k(found, truth, k):>9.4f} {p50:>8.3f} {p95:>8.3f} "
+                f"{size_mb:>8.1f} {build_seconds:>8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--type", choices=INDEX_TYPES, help="tier to build with --write (default MEAL_INDEX_TYPE)")
+    parser.add_argument("--write", action="store_true", help="rebuild the current snapshot instead of evaluating")
+    parser.add_argument("--synthetic", type=int, default=0, help="evaluate on N synthetic vectors")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES), help="tiers to evaluate")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    if args.write:
+        meal_index = MealVectorIndex()
+        if not meal_index.load(mmap=False):
+            sys.exit(f"no meal index snapshot under {meal_index.path}")
+        stats = meal_index.rebuild(args.type or faiss_service.MEAL_INDEX_TYPE)
+        print(f"rebuilt {stats['meals']} meals as {stats['indexType']} {stats['buildParams']} → {stats['snapshot']}")
+        return
+
+    if args.synthetic:
+        vectors = synthetic_catalog(args.synthetic)
+    else:
+        meal_index = MealVectorIndex()
+        if not meal_index.load():
+            sys.exit(f"no meal index snapshot under {meal_index.path}; try --synthetic N")
+        _, _, vectors = meal_index.export()
+
+    evaluate(vectors, [t.strip() for t in args.types.split(",") if t.strip()], args.k, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,41 @@
+import os
+import sys
 import pandas as pd
 import joblib
 from sklearn.multioutput import MultiOutputRegressor
 from xgboost import XGBRegressor
 
+# Allow `python ml/train_model.py` from the Models/ directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.feature_encoder import ProfileEncoder
+from app.services.tree_predictor import compile_xgb_regressors
+
+MODEL_PATH = "models/meal_distribution_model.pkl"
+ENCODER_PATH = "models/meal_distribution_encoder.json"
+COMPILED_MODEL_PATH = "models/meal_distribution_trees.npz"
+
 df = pd.read_csv("datasets/detailed_meals_macros_CLEANED.csv")
 
-X = df[[
-    "Ages", "Height", "Weight",
-    "Activity Level", "Dietary Preference"
-]]
+
+def split_diseases(value):
+    if pd.isna(value):
+        return []
+    return [d.strip() for d in str(value).split(",") if d.strip()]
+
+
+# 🔹 Same profile shape the API receives
+profiles = [
+    {
+        "age": row["Ages"],
+        "height": row["Height"],
+        "weight": row["Weight"],
+        "activityLevel": row["Activity Level"],
+        "dietaryPreference": row["Dietary Preference"],
+        "diseases": split_diseases(row["Disease"])
+    }
+    for row in df.to_dict("records")
+]
 
 y = df[[
     "Breakfast Calories",
@@ -17,10 +44,10 @@ y = df[[
     "Snacks Calories"
 ]]
 
-X = pd.get_dummies(df[[
-    "Ages", "Height", "Weight",
-    "Activity Level", "Dietary Preference"
-]])
+# 🔹 Frozen encoder: serving loads this instead of rebuilding get_dummies
+encoder = ProfileEncoder.fit(profiles, multi_hot_groups=("disease",))
+
+X = pd.DataFrame(encoder.encode(profiles), columns=encoder.columns)
 
 model = MultiOutputRegressor(
     XGBRegressor(
@@ -33,4 +60,10 @@ model = MultiOutputRegressor(
 
 model.fit(X, y)
 
-joblib.dump(model, "models/meal_distribution_model.pkl")
+os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+joblib.dump(model, MODEL_PATH)
+encoder.save(ENCODER_PATH)
+
+# 🔹 Export: flatten the 4 x 300 trees into one NumPy node table for serving
+forest = compile_xgb_regressors(model.estimators_, encoder.columns)
+forest.save(COMPILED_MODEL_PATH)
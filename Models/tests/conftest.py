@@ -0,0 +1,9 @@
+import os
+import sys
+
+# app.db.mongo needs a URI at import time; MongoClient connects lazily, so
+# tests that never touch Mongo run without a server
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_ENSURE_INDEXES", "false")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,44 @@
+from app.api import routes
+from app.services import batch_meal_generator
+
+DISTRIBUTION = {"breakfast": 25, "lunch": 35, "dinner": 30, "snacks": 10}
+
+
+class _Response:
+    status_code = 503
+
+
+def test_batch_returns_none_when_groq_fails(monkeypatch):
+    monkeypatch.setattr(batch_meal_generator, "groq_post", lambda *a, **k: _Response())
+    assert batch_meal_generator.generate_weekly_meals_batch(
+        DISTRIBUTION, {"dietaryPreference": "veg"}, [2000] * 7
+    ) is None
+
+    def boom(*args, **kwargs):
+        raise ConnectionError("groq down")
+
+    monkeypatch.setattr(batch_meal_generator, "groq_post", boom)
+    assert batch_meal_generator.generate_weekly_meals_batch(
+        DISTRIBUTION, {"dietaryPreference": "veg"}, [2000] * 7
+    ) is None
+
+
+def test_weekly_plan_falls_back_to_concurrent_days(monkeypatch):
+    calls = []
+
+    def concurrent(day_requests, profile):
+        calls.append(day_requests)
+        return {ctx["day"]: f"plan for {ctx['day']}" for _, ctx in day_requests}
+
+    monkeypatch.setattr(routes, "_prepare_weekly_plan",
+                        lambda body: (DISTRIBUTION, [2000] * 7, "alice", None))
+    monkeypatch.setattr(batch_meal_generator, "groq_post", lambda *a, **k: _Response())
+    monkeypatch.setattr(routes, "generate_meals_concurrently", concurrent)
+    monkeypatch.setattr(routes, "save_history", lambda *a, **k: None)
+
+    result = routes._weekly_plan_result({"userId": "u1", "profile": {"dietaryPreference": "veg"}})
+
+    assert len(calls) == 1
+    assert [ctx["day"] for _, ctx in calls[0]] == batch_meal_generator.DAYS
+    assert calls[0][0][0] == {"breakfast": 500, "lunch": 700, "dinner": 600, "snacks": 200}
+    assert result["weeklyPlan"]["Sunday"] == "plan for Sunday"
@@ -0,0 +1,47 @@
+import pytest
+
+from app.services.weekly_optimizer import InvalidTargets, optimize_week, validate_targets
+
+
+@pytest.mark.parametrize("day_targets, expected", [
+    ({"Saturday": 2400}, 5),
+    ({" sunday ": 2400}, 6),
+    ({"0": 2400}, 0),
+    ({6: 2400}, 6),
+])
+def test_day_target_keys(day_targets, expected):
+    targets = {"dailyCalorieTarget": 2000, "dayTargets": day_targets}
+    validate_targets(targets)
+    week = optimize_week(2000, day_targets=day_targets)
+    assert week[expected] == 2400
+    assert sum(week) == 2000 * 6 + 2400
+
+
+@pytest.mark.parametrize("targets", [
+    None,
+    {"dailyCalorieTarget": 2000, "dayTargets": {"7": 2400}},
+    {"dailyCalorieTarget": 2000, "dayTargets": {-1: 2400}},
+    {"dailyCalorieTarget": 2000, "dayTargets": {"Funday": 2400}},
+    {"dailyCalorieTarget": 2000, "dayTargets": {"Monday": -5}},
+    {"dailyCalorieTarget": 2000, "dayTargets": {"Monday": "lots"}},
+    {"dailyCalorieTarget": 2000, "dayTargets": [2400]},
+    {"dailyCalorieTarget": 2000, "cookingDays": ["Monday", 9]},
+    {"dailyCalorieTarget": 0},
+    {"dailyCalorieTarget": 2000, "weeklyCalorieBudget": float("nan")},
+])
+def test_invalid_targets(targets):
+    with pytest.raises(InvalidTargets):
+        validate_targets(targets)
+
+
+def test_weekly_plan_rejects_bad_day_targets():
+    from app.main import app
+
+    res = app.test_client().post("/generate-weekly-plan", json={
+        "userId": "u1",
+        "profile": {"dietaryPreference": "veg"},
+        "targets": {"dailyCalorieTarget": 2000, "dayTargets": {"7": 2400}}
+    })
+    assert res.status_code == 400
+    assert res.get_json()["success"] is False
+    assert "0-6" in res.get_json()["message"]
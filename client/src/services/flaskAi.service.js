@@ -35,6 +35,25 @@ flaskAi.interceptors.response.use(
   }
 )
 
+// Max page size the history endpoints accept (HISTORY_MAX_PAGE_SIZE)
+const HISTORY_PAGE_LIMIT = 200
+
+// History endpoints return one page at a time (newest first); follow
+// pagination.nextCursor until the last page so callers get every entry
+const fetchAllPages = async (url) => {
+  const entries = []
+  let cursor = null
+  let response
+  do {
+    response = await flaskAi.get(url, {
+      params: { limit: HISTORY_PAGE_LIMIT, ...(cursor && { cursor }) }
+    })
+    entries.push(...(response.data || []))
+    cursor = response.pagination?.nextCursor
+  } while (cursor)
+  return { ...response, data: entries }
+}
+
 // Flask AI Service
 export const flaskAiService = {
   // Health check
@@ -61,7 +80,7 @@ export const flaskAiService = {
 
   // Get Weekly Plans
   async getWeeklyPlans(userId) {
-    return await flaskAi.get(`/weekly-plans/${userId}`)
+    return await fetchAllPages(`/weekly-plans/${userId}`)
   },
 
   // Health Risk Report
@@ -74,7 +93,7 @@ export const flaskAiService = {
 
   // Get Health Risk Reports
   async getHealthRiskReports(userId) {
-    return await flaskAi.get(`/health-risk-reports/${userId}`)
+    return await fetchAllPages(`/health-risk-reports/${userId}`)
   },
 
   // AI Chat
@@ -88,8 +107,7 @@ export const flaskAiService = {
 
   // Get AI History
   async getHistory(userId) {
-    const response = await flaskAi.get(`/history/${userId}`)
-    return response
+    return await fetchAllPages(`/history/${userId}`)
   },
 
   // Weekly Meal Summary